@@ -1,9 +1,12 @@
 from fastapi import APIRouter
-from app.api.routes import health, auth, users, telegram, admin
+from app.api.routes import health, auth, jwks, users, telegram, admin, internal, metrics
 
 api_router = APIRouter()
 api_router.include_router(health.router, tags=["health"])
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
+api_router.include_router(jwks.router, tags=["auth"])
 api_router.include_router(users.router, tags=["users"])
 api_router.include_router(telegram.router, prefix="/telegram", tags=["telegram"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
+api_router.include_router(internal.router, prefix="/internal", tags=["internal"])
+api_router.include_router(metrics.router, tags=["metrics"])
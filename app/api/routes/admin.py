@@ -1,16 +1,34 @@
 from __future__ import annotations
 
+import base64
+import codecs
+import csv
+import io
+import json
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Literal
+from typing import AsyncIterator, Optional, Literal
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr, Field
 
-from app.deps.auth import require_admin
+from app.deps.auth import client_ip, require_admin
 from app.schemas.user import PlanUpdateIn
-from app.db.mongo import get_db
+from app.db.mongo import get_db, mongo_pool_stats
 from app.core.config import settings
+from app.core.ratelimit import rate_limit_stats
+from app.core.security import password_pool_stats, token_cache_stats
+from app.services.access_state import access_state_cache_stats
+from app.services.audit import audit, audit_stats
+from app.services.expiry_sweeper import expiry_sweeper_stats
+from app.services.outbox import outbox_backlog, outbox_enabled, outbox_stats
+from app.services.renewal_reminders import renewal_reminder_stats
+from app.services.sessions import refresh_enabled, revoke_user_sessions, session_stats
+from app.services.token_claims import token_claims_stats
+from app.services.user_cache import user_cache_stats
+from app.services.user_repo import UserBanned, UserNotFound, ban_user, set_plan, set_plan_many, unban_user
 
 router = APIRouter()
 
@@ -90,31 +108,28 @@ class BanIn(BaseModel):
 async def admin_set_plan(
     user_id: str,
     payload: PlanUpdateIn,
+    request: Request,
     admin: dict = Depends(require_admin),
 ):
     # Admin SOLO maneja plus/premium
     if payload.plan not in ("plus", "premium"):
         raise HTTPException(status_code=400, detail="Admin can only set plus or premium")
 
-    db = get_db()
     oid = _oid(user_id)
 
-    user = await db.users.find_one({"_id": oid})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    if _is_banned(user):
-        raise HTTPException(status_code=409, detail="User is banned. Unban first.")
-
     # Duración SIEMPRE 30 días (o lo que diga settings)
     paid_days = int(getattr(settings, "paid_plan_days", 30) or 30)
     expires_at = _now() + timedelta(days=paid_days)
 
-    await db.users.update_one(
-        {"_id": oid},
-        {"$set": {"plan": payload.plan, "plan_expires_at": expires_at, "status": "active"}},
-    )
+    # Un solo round trip: el filtro ya excluye baneados
+    try:
+        await set_plan({"_id": oid}, payload.plan, expires_at)
+    except UserNotFound:
+        raise HTTPException(status_code=404, detail="User not found")
+    except UserBanned:
+        raise HTTPException(status_code=409, detail="User is banned. Unban first.")
 
+    await audit("admin.set_plan", actor=admin, target_id=oid, ip=client_ip(request), plan=payload.plan, plan_expires_at=expires_at)
     return {"ok": True, "user_id": str(oid), "plan": payload.plan, "plan_expires_at": expires_at}
 
 
@@ -161,6 +176,182 @@ async def admin_lookup_user(
     }
 
 
+# -----------------------
+# Admin: listado paginado (keyset) + export en streaming
+# Nada de skip/limit: el cursor es (_id) o (plan_expires_at, _id) del último item.
+# -----------------------
+LIST_PROJECTION = {
+    "email": 1,
+    "plan": 1,
+    "plan_expires_at": 1,
+    "status": 1,
+    "banned_until": 1,
+    "is_admin": 1,
+    "telegram_id": 1,
+    "telegram_username": 1,
+    "telegram_linked": 1,
+    "created_at": 1,
+}
+
+EXPORT_COLUMNS = [
+    "user_id", "email", "plan", "plan_expires_at", "status", "banned_until",
+    "is_admin", "telegram_id", "telegram_username", "telegram_linked", "created_at",
+]
+
+
+def _public_user(user: dict) -> dict:
+    out = {"user_id": str(user["_id"])}
+    for key in EXPORT_COLUMNS[1:]:
+        val = user.get(key)
+        if isinstance(val, datetime):
+            val = _as_aware_utc(val).isoformat()
+        out[key] = val
+    out["status"] = out["status"] or "active"
+    return out
+
+
+def _list_filter(
+    plan: Optional[str],
+    status: Optional[str],
+    expires_after: Optional[datetime],
+    expires_before: Optional[datetime],
+    telegram_linked: Optional[bool],
+) -> dict:
+    q: dict = {}
+    if plan:
+        q["plan"] = plan
+    if status:
+        q["status"] = status
+    if expires_after or expires_before:
+        rng: dict = {}
+        if expires_after:
+            rng["$gte"] = _as_aware_utc(expires_after)
+        if expires_before:
+            rng["$lt"] = _as_aware_utc(expires_before)
+        q["plan_expires_at"] = rng
+    if telegram_linked is not None:
+        q["telegram_linked"] = True if telegram_linked else {"$ne": True}
+    return q
+
+
+def _encode_cursor(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: Optional[str] = None) -> dict:
+    # sort: el cursor lleva el modo con el que se generó ("s"); uno de otro
+    # orden (o sin "e" para expires) es inválido, no un 500
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        data["i"] = ObjectId(data["i"])
+        if sort is not None and data.get("s") != sort:
+            raise ValueError("cursor sort mismatch")
+        if sort == "expires":
+            data["e"] = _as_aware_utc(datetime.fromisoformat(data["e"]))
+        return data
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/users")
+async def admin_list_users(
+    plan: Optional[PlanName] = None,
+    status: Optional[Literal["active", "inactive", "banned"]] = None,
+    expires_after: Optional[datetime] = None,
+    expires_before: Optional[datetime] = None,
+    telegram_linked: Optional[bool] = None,
+    sort: Literal["id", "expires"] = "id",
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(require_admin),
+):
+    """
+    sort=id      -> más nuevos primero (_id desc)
+    sort=expires -> vencen antes primero (plan_expires_at asc, _id asc);
+                    excluye usuarios sin fecha de expiración.
+    """
+    db = get_db()
+    q = _list_filter(plan, status, expires_after, expires_before, telegram_linked)
+    after = _decode_cursor(cursor, sort) if cursor else None
+
+    if sort == "expires":
+        q.setdefault("plan_expires_at", {})["$type"] = "date"
+        order = [("plan_expires_at", 1), ("_id", 1)]
+        if after:
+            q["$or"] = [
+                {"plan_expires_at": {"$gt": after["e"]}},
+                {"plan_expires_at": after["e"], "_id": {"$gt": after["i"]}},
+            ]
+    else:
+        order = [("_id", -1)]
+        if after:
+            q["_id"] = {"$lt": after["i"]}
+
+    docs = await db.users.find(q, LIST_PROJECTION).sort(order).limit(limit + 1).to_list(limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    next_cursor = None
+    if has_more and docs:
+        last = docs[-1]
+        data = {"s": sort, "i": str(last["_id"])}
+        if sort == "expires":
+            data["e"] = _as_aware_utc(last["plan_expires_at"]).isoformat()
+        next_cursor = _encode_cursor(data)
+
+    return {"ok": True, "items": [_public_user(u) for u in docs], "next_cursor": next_cursor}
+
+
+@router.get("/users/export")
+async def admin_export_users(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    plan: Optional[PlanName] = None,
+    status: Optional[Literal["active", "inactive", "banned"]] = None,
+    expires_after: Optional[datetime] = None,
+    expires_before: Optional[datetime] = None,
+    telegram_linked: Optional[bool] = None,
+    admin: dict = Depends(require_admin),
+):
+    """
+    Export completo en streaming: un cursor de Motor con batch_size fijo,
+    memoria constante sin importar cuántos usuarios haya.
+    """
+    db = get_db()
+    q = _list_filter(plan, status, expires_after, expires_before, telegram_linked)
+    batch_size = max(1, int(settings.export_batch_size))
+
+    async def rows() -> AsyncIterator[bytes]:
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+
+        n = 0
+        cursor = db.users.find(q, LIST_PROJECTION).sort("_id", 1).batch_size(batch_size)
+        async for user in cursor:
+            row = _public_user(user)
+            if writer:
+                writer.writerow(row)
+            else:
+                buf.write(json.dumps(row) + "\n")
+            n += 1
+            if n % batch_size == 0:
+                yield buf.getvalue().encode()
+                buf.seek(0)
+                buf.truncate()
+
+        if buf.tell():
+            yield buf.getvalue().encode()
+
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"users.{'csv' if fmt == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 # -----------------------
 # Admin: activate plan (plus/premium) by email or telegram_id
 # (duración fija: settings.paid_plan_days)
@@ -168,6 +359,7 @@ async def admin_lookup_user(
 @router.post("/plan/activate")
 async def admin_activate_plan(
     payload: PlanActivateIn,
+    request: Request,
     admin: dict = Depends(require_admin),
 ):
     if not payload.email and payload.telegram_id is None:
@@ -176,31 +368,204 @@ async def admin_activate_plan(
     if payload.plan not in ("plus", "premium"):
         raise HTTPException(status_code=400, detail="Use plus or premium")
 
-    db = get_db()
     q = {}
     if payload.email:
         q["email"] = payload.email.strip().lower()
     else:
         q["telegram_id"] = int(payload.telegram_id)
 
-    user = await db.users.find_one(q)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    if _is_banned(user):
-        raise HTTPException(status_code=409, detail="User is banned. Unban first.")
-
     paid_days = int(getattr(settings, "paid_plan_days", 30) or 30)
     expires_at = _now() + timedelta(days=paid_days)
 
-    await db.users.update_one(
-        {"_id": user["_id"]},
-        {"$set": {"plan": payload.plan, "plan_expires_at": expires_at, "status": "active"}},
-    )
+    try:
+        user = await set_plan(q, payload.plan, expires_at)
+    except UserNotFound:
+        raise HTTPException(status_code=404, detail="User not found")
+    except UserBanned:
+        raise HTTPException(status_code=409, detail="User is banned. Unban first.")
 
+    await audit("admin.activate_plan", actor=admin, target_id=user["_id"], ip=client_ip(request), plan=payload.plan, plan_expires_at=expires_at)
     return {"ok": True, "user_id": str(user["_id"]), "plan": payload.plan, "plan_expires_at": expires_at}
 
 
+# -----------------------
+# Admin: bulk activate (CSV o NDJSON en streaming)
+# Filas: (email|telegram_id, plan). Respuesta: NDJSON, una línea por fila
+# + una línea final {"summary": ...}.
+# -----------------------
+def _bulk_format(request: Request, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    ctype = (request.headers.get("content-type") or "").lower()
+    return "csv" if "csv" in ctype else "ndjson"
+
+
+async def _iter_body_lines(request: Request) -> AsyncIterator[str]:
+    # Leemos el body por chunks; nunca armamos el string completo
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _parse_bulk_line(line: str, fmt: str) -> dict | None:
+    """
+    -> {"email"| "telegram_id", "plan"} o {"error": "..."}; None = línea a ignorar.
+    """
+    if not line.strip():
+        return None
+
+    if fmt == "csv":
+        fields = next(csv.reader([line]), [])
+        if len(fields) < 2:
+            return {"error": "Expected: email_or_telegram_id,plan"}
+        ident, plan = fields[0].strip(), fields[1].strip().lower()
+        if plan == "plan":
+            return None  # header
+        row: dict = {"plan": plan}
+        if "@" in ident:
+            row["email"] = ident.lower()
+        elif ident.lstrip("-").isdigit():
+            row["telegram_id"] = int(ident)
+        else:
+            return {"error": "Invalid email or telegram_id"}
+    else:
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return {"error": "Invalid JSON"}
+        if not isinstance(data, dict):
+            return {"error": "Invalid JSON"}
+        row = {"plan": str(data.get("plan") or "").strip().lower()}
+        if data.get("email"):
+            row["email"] = str(data["email"]).strip().lower()
+        elif data.get("telegram_id") is not None:
+            try:
+                row["telegram_id"] = int(data["telegram_id"])
+            except (TypeError, ValueError):
+                return {"error": "Invalid telegram_id"}
+        else:
+            return {"error": "Provide email or telegram_id"}
+
+    if row["plan"] not in ("plus", "premium"):
+        return {"error": "Use plus or premium"}
+    return row
+
+
+async def _activate_chunk(rows: list[tuple[int, dict]], expires_at: datetime) -> list[dict]:
+    db = get_db()
+    emails = [r["email"] for _, r in rows if "email" in r]
+    tg_ids = [r["telegram_id"] for _, r in rows if "telegram_id" in r]
+
+    by_email: dict = {}
+    by_tg: dict = {}
+    if emails or tg_ids:
+        ors = []
+        if emails:
+            ors.append({"email": {"$in": emails}})
+        if tg_ids:
+            ors.append({"telegram_id": {"$in": tg_ids}})
+        cursor = db.users.find(
+            {"$or": ors} if len(ors) > 1 else ors[0],
+            {"email": 1, "telegram_id": 1, "status": 1, "banned_until": 1, "token_version": 1},
+        ).batch_size(len(rows))
+        async for user in cursor:
+            if user.get("email"):
+                by_email.setdefault(user["email"], user)
+            if user.get("telegram_id") is not None:
+                by_tg.setdefault(user["telegram_id"], user)
+
+    results: list[dict] = []
+    to_apply: list[tuple[int, dict, str]] = []
+    for n, row in rows:
+        user = by_email.get(row["email"]) if "email" in row else by_tg.get(row["telegram_id"])
+        if not user:
+            results.append({"row": n, "ok": False, "status": 404, "error": "User not found"})
+        elif _is_banned(user):
+            results.append({"row": n, "ok": False, "status": 409, "error": "User is banned. Unban first."})
+        else:
+            to_apply.append((n, user, row["plan"]))
+
+    applied = await set_plan_many([(user, plan) for _, user, plan in to_apply], expires_at)
+    for n, user, plan in to_apply:
+        if user["_id"] not in applied:
+            # Baneado entre la resolución y la escritura
+            results.append({"row": n, "ok": False, "status": 409, "error": "User is banned. Unban first."})
+            continue
+        results.append({
+            "row": n,
+            "ok": True,
+            "user_id": str(user["_id"]),
+            "plan": plan,
+            "plan_expires_at": expires_at.isoformat(),
+        })
+    return results
+
+
+@router.post("/plan/activate/bulk")
+async def admin_activate_plan_bulk(
+    request: Request,
+    fmt: Optional[Literal["csv", "ndjson"]] = Query(None, alias="format"),
+    admin: dict = Depends(require_admin),
+):
+    fmt = _bulk_format(request, fmt)
+    max_rows = int(settings.bulk_activate_max_rows)
+    chunk_size = max(1, int(settings.bulk_activate_chunk_size))
+
+    # El body se parsea por líneas antes de responder: Starlette escucha el
+    # disconnect sobre el mismo canal mientras hace streaming de la respuesta.
+    # Guardamos solo filas ya parseadas (compactas), no el body.
+    parsed: list[tuple[int, dict]] = []
+    n = 0
+    async for line in _iter_body_lines(request):
+        row = _parse_bulk_line(line, fmt)
+        if row is None:
+            continue
+        n += 1
+        if n > max_rows:
+            raise HTTPException(status_code=413, detail=f"Too many rows (max {max_rows})")
+        parsed.append((n, row))
+
+    paid_days = int(getattr(settings, "paid_plan_days", 30) or 30)
+    expires_at = _now() + timedelta(days=paid_days)
+    ip = client_ip(request)
+
+    async def results() -> AsyncIterator[bytes]:
+        summary = {"rows": len(parsed), "activated": 0, "failed": 0}
+        for i in range(0, len(parsed), chunk_size):
+            chunk = parsed[i:i + chunk_size]
+            out = [
+                {"row": k, "ok": False, "status": 400, "error": r["error"]}
+                for k, r in chunk if "error" in r
+            ]
+            valid = [(k, r) for k, r in chunk if "error" not in r]
+            if valid:
+                out.extend(await _activate_chunk(valid, expires_at))
+            out.sort(key=lambda r: r["row"])
+
+            for r in out:
+                summary["activated" if r["ok"] else "failed"] += 1
+
+            # Un evento por chunk (no por fila): la cola del audit es acotada
+            activated = [r for r in out if r["ok"]]
+            if activated:
+                await audit(
+                    "admin.activate_plan_bulk", actor=admin, ip=ip, plan_expires_at=expires_at,
+                    user_ids=[r["user_id"] for r in activated], plans=[r["plan"] for r in activated],
+                )
+            yield "".join(json.dumps(r) + "\n" for r in out).encode()
+
+        yield (json.dumps({"summary": summary}) + "\n").encode()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 # -----------------------
 # Admin: ban user (temporal o permanente)
 # -----------------------
@@ -208,34 +573,28 @@ async def admin_activate_plan(
 async def admin_ban_user(
     user_id: str,
     payload: BanIn,
+    request: Request,
     admin: dict = Depends(require_admin),
 ):
-    db = get_db()
     oid = _oid(user_id)
 
-    user = await db.users.find_one({"_id": oid})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    now = _now()
-
     if payload.permanent:
         banned_until = None
     else:
         if payload.days is None:
             raise HTTPException(status_code=400, detail="days is required unless permanent=true")
-        banned_until = now + timedelta(days=int(payload.days))
-
-    await db.users.update_one(
-        {"_id": oid},
-        {"$set": {
-            "status": "banned",
-            "banned_until": banned_until,
-            "ban_reason": payload.reason,
-            "banned_at": now,
-        }},
-    )
+        banned_until = _now() + timedelta(days=int(payload.days))
+
+    try:
+        await ban_user(oid, banned_until, payload.reason)
+    except UserNotFound:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Sin esto el baneado podría seguir renovando su access token
+    if refresh_enabled():
+        await revoke_user_sessions(oid)
 
+    await audit("admin.ban", actor=admin, target_id=oid, ip=client_ip(request), banned_until=banned_until, reason=payload.reason)
     return {"ok": True, "user_id": str(oid), "status": "banned", "banned_until": banned_until, "reason": payload.reason}
 
 
@@ -245,21 +604,86 @@ async def admin_ban_user(
 @router.post("/users/{user_id}/unban")
 async def admin_unban_user(
     user_id: str,
+    request: Request,
     admin: dict = Depends(require_admin),
 ):
-    db = get_db()
     oid = _oid(user_id)
 
-    user = await db.users.find_one({"_id": oid})
-    if not user:
+    try:
+        user = await unban_user(oid)
+    except UserNotFound:
         raise HTTPException(status_code=404, detail="User not found")
 
-    new_status = "active" if _has_active_plan(user) else "inactive"
+    await audit("admin.unban", actor=admin, target_id=oid, ip=client_ip(request))
+    return {"ok": True, "user_id": str(oid), "status": user.get("status")}
+
+
+# -----------------------
+# Admin: audit log (más nuevos primero, paginación keyset por _id)
+# -----------------------
+def _public_audit(event: dict) -> dict:
+    out = {
+        "id": str(event["_id"]),
+        "at": _as_aware_utc(event["at"]).isoformat(),
+        "action": event.get("action"),
+        "actor_id": str(event["actor_id"]) if event.get("actor_id") else None,
+        "actor_email": event.get("actor_email"),
+        "target_id": str(event["target_id"]) if event.get("target_id") else None,
+        "ip": event.get("ip"),
+        "details": event.get("details"),
+    }
+    return jsonable_encoder(out)
 
-    await db.users.update_one(
-        {"_id": oid},
-        {"$set": {"status": new_status},
-         "$unset": {"banned_until": "", "ban_reason": "", "banned_at": ""}},
-    )
 
-    return {"ok": True, "user_id": str(oid), "status": new_status}
+@router.get("/audit")
+async def admin_audit_log(
+    action: Optional[str] = None,
+    actor_id: Optional[str] = None,
+    target_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(require_admin),
+):
+    """
+    Filtros por action / actor_id / target_id (índices compuestos con _id)
+    y since (fecha mínima). El cursor es el último _id de la página.
+    """
+    q: dict = {}
+    if action:
+        q["action"] = action
+    if actor_id:
+        q["actor_id"] = _oid(actor_id)
+    if target_id:
+        q["target_id"] = _oid(target_id)
+    if since:
+        # _id es cronológico: la fecha se traduce a un límite sobre _id
+        q["_id"] = {"$gte": ObjectId.from_datetime(_as_aware_utc(since))}
+    if cursor:
+        q.setdefault("_id", {})["$lt"] = _decode_cursor(cursor)["i"]
+
+    docs = await get_db().audit_log.find(q).sort("_id", -1).limit(limit).to_list(limit)
+    next_cursor = _encode_cursor({"i": str(docs[-1]["_id"])}) if len(docs) == limit else None
+    return {"ok": True, "items": [_public_audit(d) for d in docs], "next_cursor": next_cursor}
+
+
+# -----------------------
+# Admin: stats internas (caches / pools)
+# -----------------------
+@router.get("/stats")
+async def admin_stats(admin: dict = Depends(require_admin)):
+    return {
+        "ok": True,
+        "password_pool": password_pool_stats(),
+        "mongo_pool": mongo_pool_stats(),
+        "token_cache": token_cache_stats(),
+        "user_cache": user_cache_stats(),
+        "token_claims": token_claims_stats(),
+        "expiry_sweeper": expiry_sweeper_stats(),
+        "access_state_cache": access_state_cache_stats(),
+        "login_rate_limit": rate_limit_stats(),
+        "outbox": {**outbox_stats(), **(await outbox_backlog() if outbox_enabled() else {})},
+        "renewal_reminders": renewal_reminder_stats(),
+        "audit": audit_stats(),
+        "sessions": session_stats(),
+    }
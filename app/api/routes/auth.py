@@ -1,16 +1,29 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials
 from pymongo.errors import DuplicateKeyError
 
-from app.core.config import settings
-from app.core.security import create_access_token
-from app.db.mongo import get_db
-from app.schemas.auth import RegisterIn, LoginIn, TokenOut
-from app.services.users import create_user, authenticate
-from app.deps.auth import get_current_user
+from app.core.ratelimit import check_login_attempt
+from app.core.security import PasswordHasherBusy, access_token_minutes, decode_token
+from app.schemas.auth import RegisterIn, LoginIn, LogoutIn, RefreshIn, TokenOut
+from app.schemas.user import AuthMeOut
+from app.services.users import create_user_doc, authenticate
+from app.deps.auth import bearer, client_ip, get_current_user, get_current_user_doc
+from app.services.audit import audit
+from app.services.sessions import (
+    InvalidRefreshToken,
+    create_session,
+    refresh_enabled,
+    revoke_session,
+    revoke_user_sessions,
+    rotate_refresh_token,
+    session_id_for,
+)
+from app.services.token_claims import issue_access_token
+from app.services.user_cache import get_user
 
 router = APIRouter()
 
@@ -19,63 +32,138 @@ def _now():
     return datetime.now(timezone.utc)
 
 
-@router.post("/register", response_model=TokenOut)
-async def register(payload: RegisterIn):
+def _hasher_busy() -> HTTPException:
+    # Pool de bcrypt saturado: mejor 503 rápido que apilar requests en el loop
+    return HTTPException(
+        status_code=503,
+        detail="Server busy, try again",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _token_response(user: dict, request: Request) -> dict:
     """
-    Registro = Plan FREE (trial) por settings.trial_days (default 7).
+    Sin refresh tokens: solo el access token de siempre (JWT_EXPIRE_MINUTES).
+    Con REFRESH_TOKENS_ENABLED: access corto + refresh de una sesión nueva.
     """
-    db = get_db()
+    if not refresh_enabled():
+        return {"access_token": issue_access_token(user)}
 
-    existing = await db.users.find_one({"email": payload.email.strip().lower()})
-    if existing:
-        raise HTTPException(status_code=409, detail="Email already registered")
+    sid, refresh_token = await create_session(
+        user["_id"], ip=client_ip(request), user_agent=request.headers.get("user-agent"),
+    )
+    return {
+        "access_token": issue_access_token(user, sid=sid),
+        "refresh_token": refresh_token,
+        "expires_in": access_token_minutes() * 60,
+    }
 
+
+@router.post("/register", response_model=TokenOut, response_model_exclude_none=True)
+async def register(payload: RegisterIn, request: Request):
+    """
+    Registro = Plan FREE (trial) por settings.trial_days (default 7).
+    """
+    # Un solo insert_one: el índice único de email resuelve los duplicados
     try:
-        user_id = await create_user(payload.email, payload.password, is_admin=False)
+        user = await create_user_doc(payload.email, payload.password, is_admin=False)
     except DuplicateKeyError:
         raise HTTPException(status_code=409, detail="Email already registered")
+    except PasswordHasherBusy:
+        raise _hasher_busy()
 
-    trial_days = int(getattr(settings, "trial_days", 7) or 7)
-    expires_at = _now() + timedelta(days=trial_days)
-
-    await db.users.update_one(
-        {"_id": user_id},
-        {"$set": {
-            "plan": "free",
-            "plan_expires_at": expires_at,
-            "status": "active",
-            "trial_used": True,
-        }},
-    )
+    return await _token_response(user, request)
 
-    token = create_access_token(str(user_id))
-    return {"access_token": token}
 
+@router.post("/login", response_model=TokenOut, response_model_exclude_none=True)
+async def login(payload: LoginIn, request: Request):
+    # Antes de tocar Mongo o bcrypt
+    ip = client_ip(request)
+    retry_after = await check_login_attempt(ip, payload.email)
+    if retry_after is not None:
+        await audit("auth.login_throttled", ip=ip, email=payload.email.strip().lower())
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(int(retry_after))},
+        )
 
-@router.post("/login", response_model=TokenOut)
-async def login(payload: LoginIn):
-    user = await authenticate(payload.email, payload.password)
+    try:
+        user = await authenticate(payload.email, payload.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     if not user:
+        await audit("auth.login_failed", ip=ip, email=payload.email.strip().lower())
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    token = create_access_token(str(user["_id"]))
-    return {"access_token": token}
+    await audit("auth.login", actor=user, target_id=user["_id"], ip=ip)
+    return await _token_response(user, request)
 
 
-@router.get("/me")
-async def me(user: dict = get_current_user):
+@router.post("/refresh", response_model=TokenOut, response_model_exclude_none=True)
+async def refresh(payload: RefreshIn):
     """
-    NOTA: Este endpoint depende de tu deps/auth.py; como ya lo tienes funcionando,
-    lo dejamos simple: retorna datos seguros del usuario.
+    Canjea el refresh token por un access token nuevo y rota el refresh.
+    El refresh anterior deja de servir (reusarlo revoca la sesión).
     """
-    # Si FastAPI no resuelve esto así en tu repo, dime y lo ajusto al patrón Depends.
-    user = await user  # compat por si viene como coroutine (según tu deps)
+    if not refresh_enabled():
+        raise HTTPException(status_code=404, detail="Refresh tokens disabled")
+
+    try:
+        user_id, sid, refresh_token = await rotate_refresh_token(payload.refresh_token)
+    except InvalidRefreshToken:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    # Estado actual del usuario (claims frescos); ban/plan lo valida get_current_user
+    user = await get_user(user_id)
+    if not user:
+        await revoke_session(sid)
+        raise HTTPException(status_code=401, detail="User not found")
+
     return {
-        "id": str(user.get("_id")),
-        "email": user.get("email"),
-        "plan": user.get("plan", "free"),
-        "plan_expires_at": user.get("plan_expires_at"),
-        "status": user.get("status", "active"),
-        "is_admin": bool(user.get("is_admin", False)),
-        "telegram_id": user.get("telegram_id"),
-        "telegram_username": user.get("telegram_username"),
-}
+        "access_token": issue_access_token(user, sid=sid),
+        "refresh_token": refresh_token,
+        "expires_in": access_token_minutes() * 60,
+    }
+
+
+@router.post("/logout")
+async def logout(
+    payload: LogoutIn | None = None,
+    creds: HTTPAuthorizationCredentials | None = Depends(bearer),
+):
+    """
+    Cierra la sesión actual: por refresh token (body) o por el sid del access
+    token. Idempotente: siempre {"ok": true}.
+    """
+    if not refresh_enabled():
+        return {"ok": True}
+
+    sid = None
+    if payload and payload.refresh_token:
+        sid = await session_id_for(payload.refresh_token)
+    if sid is None and creds is not None and creds.credentials:
+        try:
+            sid = decode_token(creds.credentials).get("sid")
+        except Exception:
+            sid = None
+    if sid:
+        await revoke_session(sid)
+    return {"ok": True}
+
+
+@router.post("/logout-all")
+async def logout_all(request: Request, user: dict = Depends(get_current_user)):
+    """
+    Cierra todas las sesiones del usuario (todos los dispositivos).
+    """
+    revoked = await revoke_user_sessions(user["_id"]) if refresh_enabled() else 0
+    await audit("auth.logout_all", actor=user, target_id=user["_id"], ip=client_ip(request), sessions=revoked)
+    return {"ok": True, "revoked": revoked}
+
+
+@router.get("/me", response_model=AuthMeOut)
+async def me(user: dict = Depends(get_current_user_doc)):
+    """
+    Datos seguros del usuario (lo usa la web en app.js).
+    """
+    return {**user, "id": str(user["_id"])}
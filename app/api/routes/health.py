@@ -1,5 +1,10 @@
 from fastapi import APIRouter
-from app.db.mongo import get_db
+from fastapi.responses import JSONResponse
+
+from app.core.metrics import HTTP_IN_FLIGHT
+from app.core.security import password_pool_stats
+from app.db.health import mongo_health
+from app.db.mongo import mongo_pool_stats
 
 router = APIRouter()
 
@@ -7,12 +12,43 @@ router = APIRouter()
 async def api_root():
     return {"name": "Chronos API", "status": "ok"}
 
+# Probes: nunca consultan Mongo en el request, leen el ping cacheado
+# (app/db/health.py, refrescado en segundo plano).
 @router.get("/health")
 async def health():
-    db = get_db()
-    await db.command("ping")
+    ok = mongo_health()["ready"]
+    return JSONResponse({"ok": ok}, status_code=200 if ok else 503)
+
+
+@router.get("/health/live")
+async def health_live():
+    # El proceso responde: sin I/O
     return {"ok": True}
 
+
+@router.get("/health/ready")
+async def health_ready():
+    mongo = mongo_health()
+    pool = mongo_pool_stats()
+    pw = password_pool_stats()
+    body = {
+        "ready": mongo["ready"],
+        "mongo": mongo,
+        "mongo_pool": {
+            "checked_out": pool["checked_out"],
+            "connections_open": pool["connections_open"],
+            "max_pool_size": pool["max_pool_size"],
+            "checkout_failed": pool["checkout_failed"],
+        },
+        "backlog": {
+            "http_in_flight": int(HTTP_IN_FLIGHT.value()),
+            "password_queued": pw["queued"],
+            "password_in_flight": pw["in_flight"],
+            "password_rejected": pw["rejected_queue_full"] + pw["rejected_timeout"],
+        },
+    }
+    return JSONResponse(body, status_code=200 if mongo["ready"] else 503)
+
 @router.get("/api/whatsapp")
 async def whatsapp():
     # Devuelve url si está configurado
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+
+from app.api.routes.users import compute_account_state
+from app.deps.auth import require_internal_key
+from app.schemas.internal import AccessStateIn, AccessStateOut
+from app.services.access_state import get_users_by_telegram_ids
+from app.services.entitlement_feed import build_snapshot, changes_since, current_version
+
+router = APIRouter()
+
+
+# -----------------------
+# Bot: estado de acceso en batch por telegram_id
+# -----------------------
+@router.post("/access-state", response_model=AccessStateOut)
+async def internal_access_state(
+    payload: AccessStateIn,
+    _: None = Depends(require_internal_key),
+):
+    telegram_ids = list(dict.fromkeys(payload.telegram_ids))  # sin duplicados, mismo orden
+    users = await get_users_by_telegram_ids(telegram_ids)
+
+    results = []
+    for tid in telegram_ids:
+        user = users.get(tid)
+        if user is None:
+            results.append({"telegram_id": tid, "found": False, "account_state": "unknown"})
+            continue
+
+        exp = user.get("plan_expires_at")
+        if isinstance(exp, datetime) and exp.tzinfo is None:
+            exp = exp.replace(tzinfo=timezone.utc)
+        results.append({
+            "telegram_id": tid,
+            "found": True,
+            "account_state": compute_account_state(user),
+            "plan": user.get("plan", "free"),
+            "plan_expires_at": exp,
+        })
+
+    return {"results": results}
+
+
+# -----------------------
+# Scanner: snapshot de entitlements + delta por versión
+# -----------------------
+@router.get("/entitlements/snapshot")
+async def internal_entitlements_snapshot(
+    compress: bool = False,
+    if_none_match: str | None = Header(default=None),
+    _: None = Depends(require_internal_key),
+):
+    """
+    telegram_ids con acceso vigente por plan, como arrays int64 LE ordenados
+    (base64; zlib con compress=true). ETag = versión del contador de cambios.
+    """
+    version = await current_version()
+    etag = f'"ent-{version}{"-z" if compress else ""}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    body = await build_snapshot(version, compress)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/entitlements/delta")
+async def internal_entitlements_delta(
+    since: int = Query(..., ge=0),
+    limit: int = Query(5000, ge=1, le=50000),
+    _: None = Depends(require_internal_key),
+):
+    """
+    Cambios posteriores a `since` (última versión aplicada por el scanner).
+    plan=null => ese telegram_id perdió el acceso. 410 => pedir snapshot de nuevo.
+    """
+    res = await changes_since(since, limit)
+    if res is None:
+        raise HTTPException(status_code=410, detail="Version too old, fetch a new snapshot")
+
+    version, changes, more = res
+    return {"version": version, "changes": changes, "more": more}
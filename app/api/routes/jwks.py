@@ -0,0 +1,35 @@
+import hashlib
+import json
+
+from fastapi import APIRouter, Header
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.core.jwt_keys import jwks
+
+router = APIRouter()
+
+# JWKS público: el bot / scanner verifican los JWT localmente con estas claves.
+# Las claves solo cambian con un redeploy, así que el body se arma una vez.
+_cached: tuple[bytes, str] | None = None
+
+
+def _body() -> tuple[bytes, str]:
+    global _cached
+    if _cached is None:
+        body = json.dumps(jwks(), separators=(",", ":"), sort_keys=True).encode()
+        _cached = (body, '"' + hashlib.sha256(body).hexdigest()[:16] + '"')
+    return _cached
+
+
+@router.get("/.well-known/jwks.json")
+async def jwks_json(if_none_match: str | None = Header(default=None)):
+    body, etag = _body()
+    headers = {
+        "ETag": etag,
+        # Corto: un cliente ve una clave nueva (rotación) a lo sumo en max_age
+        "Cache-Control": f"public, max-age={int(settings.jwks_max_age_seconds)}",
+    }
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
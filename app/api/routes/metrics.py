@@ -0,0 +1,42 @@
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import password_pool_stats
+from app.db.mongo import mongo_pool_stats
+from app.services.user_cache import user_cache_stats
+
+router = APIRouter()
+
+
+def _runtime_gauges() -> list[str]:
+    # Gauges calculados al scrapear (no cuestan nada por request)
+    pw = password_pool_stats()
+    pool = mongo_pool_stats()
+    cache = user_cache_stats()
+    return (
+        metrics.gauge_lines("chronos_password_queue_depth", "bcrypt jobs waiting for a worker.", pw["queued"])
+        + metrics.gauge_lines("chronos_password_in_flight", "bcrypt jobs running.", pw["in_flight"])
+        + metrics.gauge_lines("chronos_mongo_pool_checked_out", "Mongo connections checked out.", pool["checked_out"])
+        + metrics.gauge_lines("chronos_mongo_pool_open", "Mongo connections open.", pool["connections_open"])
+        + metrics.gauge_lines("chronos_user_cache_size", "Entries in the user document cache.", cache["size"])
+    )
+
+
+metrics.register_collector(_runtime_gauges)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics(authorization: str | None = Header(default=None)):
+    # METRICS_ENABLED=false: ni middleware ni endpoint (no exponemos internals)
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Si METRICS_TOKEN está configurado, Prometheus debe mandar "Bearer <token>"
+    if settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}"
+        if not authorization or not hmac.compare_digest(authorization, expected):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
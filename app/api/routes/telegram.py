@@ -8,7 +8,7 @@ from app.core.config import settings
 from app.deps.auth import get_current_user
 from app.schemas.telegram import LinkCodeOut, LinkConfirmIn
 from app.services.telegram_link import create_link_code, consume_link_code
-from app.db.mongo import get_db
+from app.services.user_repo import link_telegram
 
 router = APIRouter()
 
@@ -53,14 +53,5 @@ async def telegram_link_confirm(
 
     user_id = link_doc["user_id"]
 
-    db = get_db()
-    await db.users.update_one(
-        {"_id": user_id},
-        {"$set": {
-            "telegram_id": payload.telegram_id,
-            "telegram_username": payload.telegram_username,
-            "telegram_linked": True,
-            "telegram_linked_at": datetime.now(timezone.utc),
-        }},
-    )
+    await link_telegram(user_id, payload.telegram_id, payload.telegram_username)
     return {"ok": True, "user_id": str(user_id)}
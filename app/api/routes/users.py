@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends
-from app.deps.auth import get_current_user
+from app.deps.auth import get_current_user_doc
+from app.schemas.user import MeOut
 
 router = APIRouter()
 
@@ -16,15 +17,6 @@ def _as_aware_utc(dt: datetime) -> datetime:
     return dt
 
 
-def _normalize_user_datetimes(user: dict) -> dict:
-    # Normaliza campos datetime comunes para evitar líos de serialización/comparación
-    for key in ("plan_expires_at", "banned_until", "created_at", "banned_at", "telegram_linked_at"):
-        val = user.get(key)
-        if isinstance(val, datetime):
-            user[key] = _as_aware_utc(val)
-    return user
-
-
 def compute_account_state(user: dict) -> str:
     now = _now()
 
@@ -54,11 +46,7 @@ def compute_account_state(user: dict) -> str:
     return "inactive"
 
 
-@router.get("/me")
-async def me(user=Depends(get_current_user)):
-    user["_id"] = str(user["_id"])
-    user.pop("password_hash", None)
-
-    user = _normalize_user_datetimes(user)
-
+@router.get("/me", response_model=MeOut)
+async def me(user=Depends(get_current_user_doc)):
+    # MeOut filtra campos internos y serializa fechas en UTC (pydantic-core)
     return {**user, "account_state": compute_account_state(user)}
@@ -0,0 +1,108 @@
+"""
+Comandos de mantenimiento.
+
+Uso (con las mismas variables de entorno que la app, p.ej. en el shell de Railway):
+    python -m app.cli calibrate-bcrypt [--target-ms 250] [--json]
+    python -m app.cli generate-jwt-key [--alg RS256|ES256] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from app.core.config import settings
+from app.core.jwt_keys import thumbprint
+from app.core.security import bcrypt_rounds, calibrate_bcrypt_rounds
+
+
+def _calibrate_bcrypt(args) -> None:
+    target = args.target_ms if args.target_ms is not None else float(settings.bcrypt_target_ms)
+    result = calibrate_bcrypt_rounds(target)
+    result["current_rounds"] = bcrypt_rounds()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"bcrypt: {result['base_rounds']} rounds = {result['base_ms']}ms en este hardware")
+    print(f"objetivo {result['target_ms']:.0f}ms -> {result['rounds']} rounds ({result['measured_ms']}ms medido)")
+    print(f"actual: {result['current_rounds']} rounds")
+    print(f"\nConfigurar: BCRYPT_ROUNDS={result['rounds']}")
+    print("(los usuarios existentes se rehashean solos en su próximo login)")
+
+
+_EC_CURVES = {"ES256": "P-256", "ES384": "P-384", "ES512": "P-521"}
+
+
+def _generate_private_pem(alg: str) -> str:
+    # cryptography si está (python-jose[cryptography]); si no, los backends puros de jose
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+        if alg.startswith("RS"):
+            key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        else:
+            curve = {"P-256": ec.SECP256R1, "P-384": ec.SECP384R1, "P-521": ec.SECP521R1}[_EC_CURVES[alg]]
+            key = ec.generate_private_key(curve())
+        return key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+        ).decode()
+    except ImportError:
+        pass
+
+    if alg.startswith("RS"):
+        import rsa as pyrsa
+
+        _, private = pyrsa.newkeys(2048)
+        return private.save_pkcs1().decode()
+
+    import ecdsa
+
+    curve = {"P-256": ecdsa.NIST256p, "P-384": ecdsa.NIST384p, "P-521": ecdsa.NIST521p}[_EC_CURVES[alg]]
+    return ecdsa.SigningKey.generate(curve=curve).to_pem().decode()
+
+
+def _generate_jwt_key(args) -> None:
+    from jose import jwk
+
+    private_pem = _generate_private_pem(args.alg)
+    public = jwk.construct(private_pem, args.alg).public_key()
+    result = {
+        "alg": args.alg,
+        "kid": thumbprint(public.to_dict()),
+        "private_key": private_pem,
+        "public_key": public.to_pem().decode(),
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"# kid {result['kid']} ({args.alg})")
+    print(f"JWT_ALGORITHM={args.alg}")
+    print("JWT_PRIVATE_KEY=" + private_pem.strip().replace("\n", "\\n"))
+    print("\n# Pública (para JWT_EXTRA_PUBLIC_KEYS durante una rotación):")
+    print(result["public_key"].strip())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("calibrate-bcrypt", help="mide bcrypt y sugiere BCRYPT_ROUNDS")
+    p.add_argument("--target-ms", type=float, default=None, help="default: BCRYPT_TARGET_MS")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=_calibrate_bcrypt)
+
+    p = sub.add_parser("generate-jwt-key", help="genera una clave RS*/ES* para JWT_PRIVATE_KEY")
+    p.add_argument("--alg", default="RS256", choices=["RS256", "RS384", "RS512", *_EC_CURVES])
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=_generate_jwt_key)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
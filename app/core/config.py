@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -8,15 +10,93 @@ class Settings(BaseSettings):
     # Mongo
     mongodb_uri: str = Field(..., alias="MONGODB_URI")
     mongodb_db: str = Field("chronos", alias="MONGODB_DB")
+    # Pool (por worker). wait_queue_timeout_ms = 0 => sin límite (default del driver)
+    mongodb_max_pool_size: int = Field(100, alias="MONGODB_MAX_POOL_SIZE")
+    mongodb_min_pool_size: int = Field(0, alias="MONGODB_MIN_POOL_SIZE")
+    mongodb_wait_queue_timeout_ms: int = Field(0, alias="MONGODB_WAIT_QUEUE_TIMEOUT_MS")
+    mongodb_server_selection_timeout_ms: int = Field(30000, alias="MONGODB_SERVER_SELECTION_TIMEOUT_MS")
+    # Ej: "zstd,snappy,zlib" (zstd/snappy requieren sus paquetes)
+    mongodb_compressors: str = Field("", alias="MONGODB_COMPRESSORS")
+    mongodb_retry_writes: bool = Field(True, alias="MONGODB_RETRY_WRITES")
+    mongodb_retry_reads: bool = Field(True, alias="MONGODB_RETRY_READS")
+    # Abrir min_pool_size conexiones en el startup
+    mongodb_warmup: bool = Field(True, alias="MONGODB_WARMUP")
 
     # Auth/JWT
     jwt_secret: str = Field(..., alias="JWT_SECRET")
     jwt_algorithm: str = Field("HS256", alias="JWT_ALGORITHM")
     jwt_expire_minutes: int = Field(43200, alias="JWT_EXPIRE_MINUTES")  # 30 días
+    # "jose" (default) | "native" (HMAC stdlib, solo HS256/384/512)
+    jwt_backend: str = Field("jose", alias="JWT_BACKEND")
+    # RS*/ES*: firma asimétrica con kid + JWKS público (ver app/core/jwt_keys.py)
+    # - private_key: PEM actual; extra_public_keys: PEMs de la próxima/anterior (rotación)
+    # - accept_legacy_hs: seguir aceptando tokens HS* (JWT_SECRET) durante la migración,
+    #   hasta la hora fija legacy_hs_until (obligatoria; UTC si no trae zona). Pasada
+    #   esa hora se rechaza todo token HS*, sin importar su iat
+    jwt_private_key: str = Field("", alias="JWT_PRIVATE_KEY")
+    jwt_extra_public_keys: str = Field("", alias="JWT_EXTRA_PUBLIC_KEYS")
+    jwt_accept_legacy_hs: bool = Field(False, alias="JWT_ACCEPT_LEGACY_HS")
+    jwt_legacy_hs_until: datetime | None = Field(None, alias="JWT_LEGACY_HS_UNTIL")
+    jwks_max_age_seconds: int = Field(300, alias="JWKS_MAX_AGE_SECONDS")
+    # Cache de tokens ya decodificados (0 = desactivado)
+    token_cache_max_entries: int = Field(10000, alias="TOKEN_CACHE_MAX_ENTRIES")
+
+    # Claims de plan/estado dentro del JWT: get_current_user no va a Mongo
+    # mientras la token_version del token siga vigente.
+    jwt_embed_claims: bool = Field(False, alias="JWT_EMBED_CLAIMS")
+    token_revocation_sync_seconds: float = Field(15.0, alias="TOKEN_REVOCATION_SYNC_SECONDS")
+
+    # Access token corto + refresh token rotativo (colección sessions)
+    # - reuse_grace: un refresh viejo reusado dentro de esta ventana es una carrera
+    #   entre pestañas (401); después se toma como robo y se revoca la sesión
+    refresh_tokens_enabled: bool = Field(False, alias="REFRESH_TOKENS_ENABLED")
+    access_token_expire_minutes: int = Field(15, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    refresh_token_expire_days: float = Field(30.0, alias="REFRESH_TOKEN_EXPIRE_DAYS")
+    refresh_reuse_grace_seconds: float = Field(30.0, alias="REFRESH_REUSE_GRACE_SECONDS")
+    session_revocation_sync_seconds: float = Field(5.0, alias="SESSION_REVOCATION_SYNC_SECONDS")
+
+    # Password hashing (bcrypt fuera del event loop)
+    # - executor: "thread" | "process" | "inline"
+    # - workers: 0 = auto (min(4, CPUs))
+    password_hash_executor: str = Field("thread", alias="PASSWORD_HASH_EXECUTOR")
+    password_hash_workers: int = Field(0, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_queue: int = Field(64, alias="PASSWORD_HASH_MAX_QUEUE")
+    password_hash_max_wait_seconds: float = Field(5.0, alias="PASSWORD_HASH_MAX_WAIT_SECONDS")
+
+    # Costo de bcrypt: rounds fijos (0 = default 12) o calibrados al arrancar
+    # para que un hash tarde ~bcrypt_target_ms en este hardware.
+    # Los hashes con menos costo se rehashean en el próximo login exitoso (nunca se baja).
+    bcrypt_rounds: int = Field(0, alias="BCRYPT_ROUNDS")
+    bcrypt_target_ms: float = Field(250.0, alias="BCRYPT_TARGET_MS")
+    bcrypt_calibrate_on_startup: bool = Field(False, alias="BCRYPT_CALIBRATE_ON_STARTUP")
+
+    # Rate limit de /auth/login (ventana deslizante por IP y por email)
+    # - backend: "memory" (por worker) | "sqlite" (compartido entre workers del host)
+    # - trust_forwarded_for: usar X-Forwarded-For (solo detrás de un proxy confiable)
+    login_rate_limit_enabled: bool = Field(True, alias="LOGIN_RATE_LIMIT_ENABLED")
+    login_rate_ip_limit: int = Field(30, alias="LOGIN_RATE_IP_LIMIT")
+    login_rate_ip_window_seconds: float = Field(60.0, alias="LOGIN_RATE_IP_WINDOW_SECONDS")
+    login_rate_email_limit: int = Field(10, alias="LOGIN_RATE_EMAIL_LIMIT")
+    login_rate_email_window_seconds: float = Field(300.0, alias="LOGIN_RATE_EMAIL_WINDOW_SECONDS")
+    rate_limit_backend: str = Field("memory", alias="RATE_LIMIT_BACKEND")
+    rate_limit_sqlite_path: str = Field("/tmp/chronos-ratelimit.sqlite3", alias="RATE_LIMIT_SQLITE_PATH")
+    trust_forwarded_for: bool = Field(False, alias="TRUST_FORWARDED_FOR")
+
+    # Cache de usuarios para get_current_user (por proceso, LRU + TTL)
+    user_cache_enabled: bool = Field(True, alias="USER_CACHE_ENABLED")
+    user_cache_max_entries: int = Field(10000, alias="USER_CACHE_MAX_ENTRIES")
+    user_cache_ttl_seconds: float = Field(30.0, alias="USER_CACHE_TTL_SECONDS")
 
     # Telegram linking
     telegram_bot_username: str = Field("CRNAssistant_bot", alias="TELEGRAM_BOT_USERNAME")
     telegram_link_secret: str = Field("", alias="TELEGRAM_LINK_SECRET")
+    # Códigos de vinculación: "stored" (documento en Mongo) | "signed" (HMAC, sin escritura)
+    telegram_link_code_mode: str = Field("stored", alias="TELEGRAM_LINK_CODE_MODE")
+    telegram_link_code_secret: str = Field("", alias="TELEGRAM_LINK_CODE_SECRET")
+
+    # Bot API (recordatorios de renovación). TELEGRAM_API_BASE se puede apuntar a un stub local
+    telegram_bot_token: str = Field("", alias="TELEGRAM_BOT_TOKEN")
+    telegram_api_base: str = Field("https://api.telegram.org", alias="TELEGRAM_API_BASE")
 
     # Optional admin bootstrap
     admin_email: str | None = Field(None, alias="ADMIN_EMAIL")
@@ -26,16 +106,85 @@ class Settings(BaseSettings):
     trial_days: int = Field(7, alias="TRIAL_DAYS")
     paid_plan_days: int = Field(30, alias="PAID_PLAN_DAYS")
 
+    # Barrido de planes vencidos / bans temporales vencidos (tarea de fondo)
+    expiry_sweep_enabled: bool = Field(True, alias="EXPIRY_SWEEP_ENABLED")
+    expiry_sweep_interval_seconds: float = Field(60.0, alias="EXPIRY_SWEEP_INTERVAL_SECONDS")
+    expiry_sweep_batch_size: int = Field(500, alias="EXPIRY_SWEEP_BATCH_SIZE")
+
+    # Activación masiva (/admin/plan/activate/bulk)
+    bulk_activate_chunk_size: int = Field(500, alias="BULK_ACTIVATE_CHUNK_SIZE")
+    bulk_activate_max_rows: int = Field(50000, alias="BULK_ACTIVATE_MAX_ROWS")
+
+    # Export de usuarios (/admin/users/export): docs por batch del cursor
+    export_batch_size: int = Field(1000, alias="EXPORT_BATCH_SIZE")
+
+    # Métricas Prometheus (/metrics). Con token => Authorization: Bearer <token>
+    metrics_enabled: bool = Field(True, alias="METRICS_ENABLED")
+    metrics_token: str = Field("", alias="METRICS_TOKEN")
+
+    # Probes: ping a Mongo en segundo plano (los endpoints leen el resultado cacheado)
+    # - max_age: si el último ping OK es más viejo, /health/ready responde 503
+    health_ping_interval_seconds: float = Field(5.0, alias="HEALTH_PING_INTERVAL_SECONDS")
+    health_ping_timeout_seconds: float = Field(2.0, alias="HEALTH_PING_TIMEOUT_SECONDS")
+    health_ping_max_age_seconds: float = Field(30.0, alias="HEALTH_PING_MAX_AGE_SECONDS")
+
+    # UI web: "memory" (assets en memoria, gzip/br, ETag, 304) | "files" (StaticFiles)
+    web_static_mode: str = Field("memory", alias="WEB_STATIC_MODE")
+
     # ===== COMUNICACIÓN INTERNA (SCANNER → API) =====
     # Por ahora NO obligatoria para no crashear el server.
     # Cuando montemos el scanner, la configuras en Railway.
     internal_api_key: str = Field("", alias="INTERNAL_API_KEY")
 
+    # Cache corto por telegram_id para /internal/access-state (bot)
+    access_state_cache_ttl_seconds: float = Field(5.0, alias="ACCESS_STATE_CACHE_TTL_SECONDS")
+    access_state_cache_max_entries: int = Field(50000, alias="ACCESS_STATE_CACHE_MAX_ENTRIES")
+
+    # Feed de entitlements para el scanner: cuánto se guardan los cambios (delta)
+    entitlement_changes_ttl_hours: float = Field(72.0, alias="ENTITLEMENT_CHANGES_TTL_HOURS")
+
+    # Outbox de eventos de usuario -> webhook del bot (vacío = desactivado)
+    # - transactions: evento y escritura en la misma transacción (requiere replica set / Atlas)
+    # - backoff: base * 2^(intentos-1), tope max; después de max_attempts queda "dead"
+    outbox_webhook_url: str = Field("", alias="OUTBOX_WEBHOOK_URL")
+    outbox_webhook_secret: str = Field("", alias="OUTBOX_WEBHOOK_SECRET")
+    outbox_transactions: bool = Field(True, alias="OUTBOX_TRANSACTIONS")
+    outbox_batch_size: int = Field(100, alias="OUTBOX_BATCH_SIZE")
+    outbox_poll_interval_seconds: float = Field(2.0, alias="OUTBOX_POLL_INTERVAL_SECONDS")
+    outbox_max_attempts: int = Field(12, alias="OUTBOX_MAX_ATTEMPTS")
+    outbox_backoff_base_seconds: float = Field(1.0, alias="OUTBOX_BACKOFF_BASE_SECONDS")
+    outbox_backoff_max_seconds: float = Field(300.0, alias="OUTBOX_BACKOFF_MAX_SECONDS")
+    outbox_timeout_seconds: float = Field(5.0, alias="OUTBOX_TIMEOUT_SECONDS")
+    outbox_max_connections: int = Field(4, alias="OUTBOX_MAX_CONNECTIONS")
+    outbox_retention_hours: float = Field(24.0, alias="OUTBOX_RETENTION_HOURS")
+
+    # Audit log (login + acciones admin), escrito en lotes desde una cola en memoria
+    # - full_policy: "drop" (descarta y cuenta) | "block" (espera hasta block_timeout_ms)
+    audit_enabled: bool = Field(True, alias="AUDIT_ENABLED")
+    audit_queue_max: int = Field(10000, alias="AUDIT_QUEUE_MAX")
+    audit_batch_size: int = Field(200, alias="AUDIT_BATCH_SIZE")
+    audit_flush_interval_seconds: float = Field(1.0, alias="AUDIT_FLUSH_INTERVAL_SECONDS")
+    audit_full_policy: str = Field("drop", alias="AUDIT_FULL_POLICY")
+    audit_block_timeout_ms: float = Field(50.0, alias="AUDIT_BLOCK_TIMEOUT_MS")
+    audit_drain_timeout_seconds: float = Field(10.0, alias="AUDIT_DRAIN_TIMEOUT_SECONDS")
+    audit_retention_days: float = Field(180.0, alias="AUDIT_RETENTION_DAYS")
+
     # ===== WHATSAPP (RENOVACIONES) =====
     # Ejemplos válidos:
     # - "+5355555555"
     # - "https://wa.me/5355555555"
     whatsapp_contact: str = Field("", alias="WHATSAPP_CONTACT")
 
+    # Recordatorios de renovación por Telegram (requiere TELEGRAM_BOT_TOKEN)
+    # - windows: "3d,1d,expired" (d = días, h = horas); expired mira hasta grace_hours atrás
+    # - rate: mensajes/s del bot (el Bot API corta cerca de 30/s)
+    renewal_reminders_enabled: bool = Field(False, alias="RENEWAL_REMINDERS_ENABLED")
+    renewal_reminder_windows: str = Field("3d,1d,expired", alias="RENEWAL_REMINDER_WINDOWS")
+    renewal_reminder_expired_grace_hours: float = Field(48.0, alias="RENEWAL_REMINDER_EXPIRED_GRACE_HOURS")
+    renewal_reminder_interval_seconds: float = Field(900.0, alias="RENEWAL_REMINDER_INTERVAL_SECONDS")
+    renewal_reminder_batch_size: int = Field(200, alias="RENEWAL_REMINDER_BATCH_SIZE")
+    renewal_reminder_rate_per_second: float = Field(25.0, alias="RENEWAL_REMINDER_RATE_PER_SECOND")
+    renewal_reminder_concurrency: int = Field(8, alias="RENEWAL_REMINDER_CONCURRENCY")
+
 
 settings = Settings()
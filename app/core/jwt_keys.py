@@ -0,0 +1,127 @@
+import base64
+import hashlib
+import json
+import re
+from datetime import timezone
+
+from jose import jwk
+from jose.exceptions import JWKError
+
+from app.core.config import settings
+
+# Claves asimétricas para JWT (JWT_ALGORITHM = RS256/384/512 o ES256/384/512):
+# - JWT_PRIVATE_KEY: PEM de la clave con la que se firma (la "actual").
+# - JWT_EXTRA_PUBLIC_KEYS: PEMs públicos que también se aceptan y se publican
+#   en el JWKS: la clave nueva antes de empezar a firmar con ella, o la vieja
+#   hasta que venzan sus tokens (rotación con solapamiento).
+# - kid = thumbprint RFC 7638 (determinístico: todos los workers coinciden).
+# Con HS* no se usa nada de esto y el JWKS sale vacío.
+ASYMMETRIC_PREFIXES = ("RS", "ES")
+
+_PEM_RE = re.compile(r"-----BEGIN [A-Z ]+-----.+?-----END [A-Z ]+-----", re.S)
+
+_loaded = False
+_signing: tuple[str, object] | None = None   # (kid, clave privada)
+_verify: dict[str, object] = {}              # kid -> clave pública
+_jwks: dict = {"keys": []}
+
+
+def asymmetric() -> bool:
+    return settings.jwt_algorithm[:2] in ASYMMETRIC_PREFIXES
+
+
+def _split_pems(text: str) -> list[str]:
+    # En variables de entorno los saltos de línea suelen venir como "\n" literal
+    return _PEM_RE.findall((text or "").replace("\\n", "\n"))
+
+
+def thumbprint(public_jwk: dict) -> str:
+    # RFC 7638: solo los miembros requeridos, orden lexicográfico, sin espacios
+    required = ("e", "kty", "n") if public_jwk["kty"] == "RSA" else ("crv", "kty", "x", "y")
+    canonical = json.dumps({k: public_jwk[k] for k in required}, separators=(",", ":"), sort_keys=True)
+    digest = hashlib.sha256(canonical.encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _construct(pem: str):
+    try:
+        return jwk.construct(pem, settings.jwt_algorithm)
+    except (JWKError, ValueError, TypeError) as e:
+        # p.ej. una clave RSA con JWT_ALGORITHM=ES256
+        raise RuntimeError(f"Invalid key for {settings.jwt_algorithm}: {e}")
+
+
+def load_keys() -> None:
+    """
+    Parsea las claves una vez (lazy). Lanza RuntimeError si falta la privada,
+    alguna no corresponde al algoritmo o falta el corte de los tokens HS legacy.
+    """
+    global _loaded, _signing, _verify, _jwks
+    if _loaded or not asymmetric():
+        return
+
+    if settings.jwt_accept_legacy_hs and settings.jwt_legacy_hs_until is None:
+        # Sin fecha de corte, JWT_SECRET seguiría acuñando tokens válidos para siempre
+        raise RuntimeError("JWT_ACCEPT_LEGACY_HS requires JWT_LEGACY_HS_UNTIL")
+
+    pems = _split_pems(settings.jwt_private_key)
+    if not pems:
+        raise RuntimeError(f"JWT_PRIVATE_KEY is required for {settings.jwt_algorithm}")
+    private = _construct(pems[0])
+    public = private.public_key()
+
+    published = [public]
+    for pem in _split_pems(settings.jwt_extra_public_keys):
+        key = _construct(pem)
+        published.append(key.public_key() if "PRIVATE" in pem else key)
+
+    verify: dict[str, object] = {}
+    entries = []
+    for key in published:
+        data = key.to_dict()
+        kid = thumbprint(data)
+        if kid in verify:
+            continue
+        verify[kid] = key
+        entries.append({**data, "kid": kid, "use": "sig", "alg": settings.jwt_algorithm})
+
+    _signing = (thumbprint(public.to_dict()), private)
+    _verify = verify
+    _jwks = {"keys": entries}
+    _loaded = True
+
+
+def reset_keys() -> None:
+    # Para recargar después de cambiar settings (tests / CLI)
+    global _loaded, _signing, _verify, _jwks
+    _loaded = False
+    _signing = None
+    _verify = {}
+    _jwks = {"keys": []}
+
+
+def signing_key() -> tuple[str, object]:
+    load_keys()
+    return _signing
+
+
+def verification_key(kid: str | None):
+    load_keys()
+    return _verify.get(kid) if kid else None
+
+
+def jwks() -> dict:
+    load_keys()
+    return _jwks
+
+
+def legacy_hs_deadline() -> float | None:
+    """
+    Epoch hasta el que se aceptan tokens HS* firmados con JWT_SECRET (None = nunca).
+    """
+    until = settings.jwt_legacy_hs_until
+    if not settings.jwt_accept_legacy_hs or until is None:
+        return None
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    return until.timestamp()
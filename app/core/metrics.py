@@ -0,0 +1,215 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+
+# Métricas en proceso, formato texto de Prometheus (/metrics).
+# Agregación mínima: un dict por serie y un lock corto (los listeners de
+# pymongo llaman desde threads del driver). Nada de I/O en el hot path.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: tuple = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: dict = {}
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._series.items())
+        return self.header() + [f"{self.name}{_fmt_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self._series[labels] = float(value)
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._series.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._series.items())
+        return self.header() + [f"{self.name}{_fmt_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [conteo por bucket (no acumulado) ..., +Inf], suma
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][idx] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1])) for k, v in self._series.items()]
+        lines = self.header()
+        for labels, (counts, total) in items:
+            acc = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                acc += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{_fmt_labels(self.labelnames + ('le',), labels + (le,))} {acc}"
+                )
+            base = _fmt_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{base} {total}")
+            lines.append(f"{self.name}_count{base} {acc}")
+        return lines
+
+
+# -----------------------
+# Registro
+# -----------------------
+_metrics: list[_Metric] = []
+_collectors: list[Callable[[], list[str]]] = []
+
+
+def _register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(fn: Callable[[], list[str]]) -> None:
+    """Callback que devuelve líneas ya formateadas (gauges calculados al scrapear)."""
+    _collectors.append(fn)
+
+
+def gauge_lines(name: str, doc: str, value) -> list[str]:
+    return [f"# HELP {name} {doc}", f"# TYPE {name} gauge", f"{name} {float(value or 0)}"]
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for fn in _collectors:
+        try:
+            lines.extend(fn())
+        except Exception:
+            pass
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUESTS = _register(Counter(
+    "chronos_http_requests_total", "HTTP requests by route, method and status.",
+    ("route", "method", "status"),
+))
+HTTP_LATENCY = _register(Histogram(
+    "chronos_http_request_duration_seconds", "HTTP request latency by route and method.",
+    ("route", "method"),
+))
+HTTP_IN_FLIGHT = _register(Gauge(
+    "chronos_http_requests_in_flight", "HTTP requests currently being served.",
+))
+PASSWORD_LATENCY = _register(Histogram(
+    "chronos_password_hash_duration_seconds", "bcrypt hash/verify duration (queue wait included).",
+    ("op",),
+))
+LOGIN_THROTTLED = _register(Counter(
+    "chronos_login_throttled_total", "Login attempts rejected by the rate limiter.",
+    ("key",),
+))
+MONGO_LATENCY = _register(Histogram(
+    "chronos_mongo_command_duration_seconds", "Mongo command latency by collection and command.",
+    ("collection", "command", "outcome"),
+))
+OUTBOX_EVENTS = _register(Counter(
+    "chronos_outbox_events_total", "Outbox events by delivery outcome (delivered, retried, dead).",
+    ("outcome",),
+))
+RENEWAL_REMINDERS = _register(Counter(
+    "chronos_renewal_reminders_total", "Renewal reminders by window and outcome (sent, blocked, failed).",
+    ("window", "outcome"),
+))
+OUTBOX_DELIVERY_LAG = _register(Histogram(
+    "chronos_outbox_delivery_lag_seconds", "Time from outbox enqueue to successful webhook delivery.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+))
+
+
+# -----------------------
+# Middleware ASGI (sin BaseHTTPMiddleware: menos overhead por request)
+# -----------------------
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Label = plantilla de la ruta (no el path real) para acotar cardinalidad
+            route = scope.get("route")
+            if route is not None:
+                label = route.path
+            elif "endpoint" in scope:
+                label = scope.get("root_path", "") + "/*"  # mounts (/web)
+            else:
+                label = "<unmatched>"
+            method = scope["method"]
+            HTTP_LATENCY.observe(time.perf_counter() - started, label, method)
+            HTTP_REQUESTS.inc(label, method, str(status))
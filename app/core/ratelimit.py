@@ -0,0 +1,196 @@
+import asyncio
+import math
+import threading
+import time
+
+from app.core.config import settings
+from app.core.metrics import LOGIN_THROTTLED
+
+# Rate limit por ventana deslizante aproximada ("sliding window counter"):
+# por clave guardamos solo (id_ventana, conteo_actual, conteo_anterior) y
+# estimamos  anterior * (1 - fracción transcurrida) + actual.
+# Un intento rechazado NO suma (el cliente no queda bloqueado para siempre).
+# Cada entrada guarda además su propio largo de ventana: ip y email usan
+# ventanas distintas y la poda tiene que respetar la de cada clave.
+
+
+def _evaluate(entry, now: float, window: float, limit: int):
+    """
+    -> (permitido, retry_after_segundos, nueva_entrada)
+    """
+    win = int(now // window)
+    frac = (now % window) / window
+
+    if entry is None:
+        cur = prev = 0
+    elif entry[0] == win:
+        cur, prev = entry[1], entry[2]
+    elif entry[0] == win - 1:
+        cur, prev = 0, entry[1]
+    else:
+        cur = prev = 0
+
+    if prev * (1 - frac) + cur + 1 <= limit:
+        return True, 0.0, (win, cur + 1, prev)
+
+    # Cuándo vuelve a entrar un intento más
+    if cur + 1 <= limit and prev:
+        need = 1 - (limit - cur - 1) / prev
+        wait = (need - frac) * window
+    else:
+        # Recién en la ventana siguiente: cur pasa a ser "anterior"
+        need = 1 - (limit - 1) / cur if cur else 0.0
+        wait = (1 - frac) * window + max(0.0, need) * window
+    return False, max(1.0, math.ceil(wait)), (win, cur, prev)
+
+
+class MemoryBackend:
+    """Estado en el proceso (un worker)."""
+
+    blocking = False
+
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[int, int, int, float]] = {}  # (win, cur, prev, window)
+        self._calls = 0
+
+    def hit(self, key: str, window: float, limit: int, now: float):
+        allowed, retry, entry = _evaluate(self._entries.get(key), now, window, limit)
+        self._entries[key] = (*entry, window)
+
+        self._calls += 1
+        if self._calls % 1024 == 0:
+            self._prune(now)
+        return allowed, retry
+
+    def _prune(self, now: float) -> None:
+        # Claves sin actividad en las dos últimas ventanas (las suyas) ya no aportan nada
+        for key in [k for k, e in self._entries.items() if e[0] < int(now // e[3]) - 1]:
+            self._entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SqliteBackend:
+    """
+    Estado compartido entre workers del mismo host vía un archivo SQLite local
+    (stand-in de un store compartido tipo Redis). Cada hit es una transacción
+    corta BEGIN IMMEDIATE. Hace I/O y puede esperar el lock del archivo:
+    check_login_attempt lo corre en un thread, nunca en el event loop.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str) -> None:
+        import sqlite3  # solo si se usa este backend
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit ("
+            " key TEXT PRIMARY KEY, win INTEGER NOT NULL, cur INTEGER NOT NULL, prev INTEGER NOT NULL,"
+            " win_seconds REAL NOT NULL DEFAULT 0)"
+        )
+        try:
+            # Archivos creados antes de guardar la ventana por fila
+            self._conn.execute("ALTER TABLE rate_limit ADD COLUMN win_seconds REAL NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+        self._calls = 0
+
+    def hit(self, key: str, window: float, limit: int, now: float):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                row = cur.execute("SELECT win, cur, prev FROM rate_limit WHERE key = ?", (key,)).fetchone()
+                allowed, retry, entry = _evaluate(row, now, window, limit)
+                cur.execute(
+                    "INSERT INTO rate_limit (key, win, cur, prev, win_seconds) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET win = excluded.win, cur = excluded.cur,"
+                    " prev = excluded.prev, win_seconds = excluded.win_seconds",
+                    (key, *entry, window),
+                )
+                self._calls += 1
+                if self._calls % 1024 == 0:
+                    # Cada fila con su propia ventana (filas viejas sin ventana: no se tocan)
+                    cur.execute(
+                        "DELETE FROM rate_limit WHERE win_seconds > 0 AND win < CAST(? / win_seconds AS INTEGER) - 1",
+                        (now,),
+                    )
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return allowed, retry
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limit").fetchone()[0]
+
+
+_backend = None
+_stats = {"allowed": 0, "rejected_ip": 0, "rejected_email": 0}
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        if (settings.rate_limit_backend or "memory").strip().lower() == "sqlite":
+            _backend = SqliteBackend(settings.rate_limit_sqlite_path)
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+
+async def _hit(backend, key: str, window: float, limit: int, now: float):
+    if backend.blocking:
+        return await asyncio.to_thread(backend.hit, key, window, limit, now)
+    return backend.hit(key, window, limit, now)
+
+
+async def check_login_attempt(ip: str | None, email: str) -> float | None:
+    """
+    Registra un intento de login. -> None si se permite, o segundos de Retry-After.
+    """
+    if not settings.login_rate_limit_enabled:
+        return None
+
+    backend = _get_backend()
+    now = time.time()
+
+    if ip:
+        allowed, retry = await _hit(
+            backend, f"ip:{ip}", float(settings.login_rate_ip_window_seconds), int(settings.login_rate_ip_limit), now
+        )
+        if not allowed:
+            _stats["rejected_ip"] += 1
+            LOGIN_THROTTLED.inc("ip")
+            return retry
+
+    allowed, retry = await _hit(
+        backend,
+        f"email:{email.strip().lower()}",
+        float(settings.login_rate_email_window_seconds),
+        int(settings.login_rate_email_limit),
+        now,
+    )
+    if not allowed:
+        _stats["rejected_email"] += 1
+        LOGIN_THROTTLED.inc("email")
+        return retry
+
+    _stats["allowed"] += 1
+    return None
+
+
+def rate_limit_stats() -> dict:
+    backend = _get_backend()
+    return {
+        "enabled": bool(settings.login_rate_limit_enabled),
+        "backend": type(backend).__name__,
+        "keys": backend.size(),
+        **_stats,
+    }
@@ -1,10 +1,27 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTError
 from app.core.config import settings
+from app.core.jwt_keys import asymmetric, legacy_hs_deadline, signing_key, verification_key
+from app.core.metrics import PASSWORD_LATENCY
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+
+class PasswordHasherBusy(RuntimeError):
+    """El pool de bcrypt está saturado (cola llena o timeout de espera)."""
+
+
 def _bcrypt_safe_password(password: str) -> str:
     """
     bcrypt solo usa los primeros 72 bytes.
@@ -14,19 +31,391 @@ def _bcrypt_safe_password(password: str) -> str:
         raise ValueError("Password exceeds bcrypt 72-byte limit")
     return password
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: int | None = None) -> str:
     password = _bcrypt_safe_password(password)
-    return pwd_context.hash(password)
+    return pwd_context.hash(password, rounds=rounds or bcrypt_rounds())
 
 def verify_password(password: str, password_hash: str) -> bool:
     password = _bcrypt_safe_password(password)
     return pwd_context.verify(password, password_hash)
 
-def create_access_token(sub: str) -> str:
+
+# -----------------------
+# Costo de bcrypt (rounds)
+# -----------------------
+# BCRYPT_ROUNDS fija el costo (0 = default de passlib, 12). Con
+# BCRYPT_CALIBRATE_ON_STARTUP se mide el hardware y se elige el máximo que entra
+# en BCRYPT_TARGET_MS. Los rounds se pasan explícitos a cada job (el pool de
+# procesos no ve cambios hechos en runtime en este proceso).
+BCRYPT_DEFAULT_ROUNDS = 12
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
+_calibrated_rounds: int | None = None
+
+
+def bcrypt_rounds() -> int:
+    if _calibrated_rounds is not None:
+        return _calibrated_rounds
+    return int(settings.bcrypt_rounds or 0) or BCRYPT_DEFAULT_ROUNDS
+
+
+def set_bcrypt_rounds(rounds: int) -> None:
+    global _calibrated_rounds
+    _calibrated_rounds = max(BCRYPT_MIN_ROUNDS, min(BCRYPT_MAX_ROUNDS, int(rounds)))
+
+
+def _hash_rounds(password_hash: str) -> int | None:
+    # "$2b$12$<salt+hash>"
+    parts = (password_hash or "").split("$")
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def password_needs_rehash(password_hash: str, rounds: int | None = None) -> bool:
+    """
+    True si el hash no es bcrypt $2b$ o su costo es MENOR al configurado.
+    Solo se sube: con calibración por worker dos workers pueden diferir en un
+    round y rehashear en ambos sentidos haría ping-pong (y bajaría el costo).
+    """
+    if not (password_hash or "").startswith("$2b$"):
+        return True
+    current = _hash_rounds(password_hash)
+    return current is None or current < (rounds or bcrypt_rounds())
+
+
+def verify_and_update(password: str, password_hash: str, rounds: int) -> tuple[bool, str | None]:
+    """
+    -> (ok, hash_nuevo|None). Un solo job del pool: verify y, si corresponde,
+    rehash con los rounds actuales.
+    """
+    if not verify_password(password, password_hash):
+        return False, None
+    if password_needs_rehash(password_hash, rounds):
+        return True, hash_password(password, rounds)
+    return True, None
+
+
+def calibrate_bcrypt_rounds(target_ms: float) -> dict:
+    """
+    Mide un hash con BCRYPT_MIN_ROUNDS y extrapola (cada round duplica el costo)
+    al máximo de rounds que entra en target_ms. Bloqueante: correr fuera del loop.
+    """
+    pwd_context.hash("calibration-password", rounds=4)  # carga el backend de bcrypt
+
+    started = time.perf_counter()
+    pwd_context.hash("calibration-password", rounds=BCRYPT_MIN_ROUNDS)
+    base_ms = (time.perf_counter() - started) * 1000
+
+    rounds = BCRYPT_MIN_ROUNDS
+    while rounds < BCRYPT_MAX_ROUNDS and base_ms * 2 ** (rounds + 1 - BCRYPT_MIN_ROUNDS) <= target_ms:
+        rounds += 1
+
+    started = time.perf_counter()
+    pwd_context.hash("calibration-password", rounds=rounds)
+    measured_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "target_ms": float(target_ms),
+        "rounds": rounds,
+        "measured_ms": round(measured_ms, 1),
+        "base_rounds": BCRYPT_MIN_ROUNDS,
+        "base_ms": round(base_ms, 1),
+    }
+
+
+# -----------------------
+# bcrypt fuera del event loop
+# -----------------------
+# Modo: "thread" (default), "process" o "inline" (en el loop, solo para debug).
+# `_slots` limita los hashes en ejecución a `workers`; el resto espera en cola
+# (máx. `max_queue`) hasta `max_wait_seconds`, si no -> PasswordHasherBusy (503).
+_executor: Executor | None = None
+_slots: asyncio.Semaphore | None = None
+
+_stats = {
+    "in_flight": 0,
+    "queued": 0,
+    "max_queued": 0,
+    "completed": 0,
+    "rejected_queue_full": 0,
+    "rejected_timeout": 0,
+    "hash_count": 0,
+    "hash_seconds_total": 0.0,
+    "verify_count": 0,
+    "verify_seconds_total": 0.0,
+    "wait_seconds_total": 0.0,
+    "rehashed": 0,
+}
+
+
+def _password_workers() -> int:
+    workers = int(settings.password_hash_workers or 0)
+    if workers <= 0:
+        workers = min(4, os.cpu_count() or 1)
+    return workers
+
+
+def _get_executor() -> Executor | None:
+    global _executor, _slots
+    mode = (settings.password_hash_executor or "thread").strip().lower()
+    if mode == "inline":
+        return None
+    if _executor is None:
+        workers = _password_workers()
+        if mode == "process":
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        _slots = asyncio.Semaphore(workers)
+    return _executor
+
+
+async def _run_password_job(kind: str, fn, *args):
+    executor = _get_executor()
+    started = time.perf_counter()
+
+    if executor is None:
+        result = fn(*args)
+    else:
+        if _stats["queued"] >= int(settings.password_hash_max_queue):
+            _stats["rejected_queue_full"] += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+
+        _stats["queued"] += 1
+        _stats["max_queued"] = max(_stats["max_queued"], _stats["queued"])
+        try:
+            await asyncio.wait_for(_slots.acquire(), timeout=float(settings.password_hash_max_wait_seconds))
+        except asyncio.TimeoutError:
+            _stats["rejected_timeout"] += 1
+            raise PasswordHasherBusy("Timed out waiting for a password hashing worker")
+        finally:
+            _stats["queued"] -= 1
+
+        _stats["wait_seconds_total"] += time.perf_counter() - started
+        _stats["in_flight"] += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        finally:
+            _stats["in_flight"] -= 1
+            _slots.release()
+
+    elapsed = time.perf_counter() - started
+    PASSWORD_LATENCY.observe(elapsed, kind)
+    _stats["completed"] += 1
+    _stats[f"{kind}_count"] += 1
+    _stats[f"{kind}_seconds_total"] += elapsed
+    return result
+
+
+async def hash_password_async(password: str) -> str:
+    # Validamos en el loop para que el ValueError no viaje por el pool
+    _bcrypt_safe_password(password)
+    return await _run_password_job("hash", hash_password, password, bcrypt_rounds())
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    _bcrypt_safe_password(password)
+    return await _run_password_job("verify", verify_password, password, password_hash)
+
+
+async def verify_and_update_async(password: str, password_hash: str) -> tuple[bool, str | None]:
+    _bcrypt_safe_password(password)
+    ok, new_hash = await _run_password_job("verify", verify_and_update, password, password_hash, bcrypt_rounds())
+    if new_hash:
+        _stats["rehashed"] += 1
+    return ok, new_hash
+
+
+def password_pool_stats() -> dict:
+    out = dict(_stats)
+    out["mode"] = (settings.password_hash_executor or "thread").strip().lower()
+    out["workers"] = _password_workers()
+    out["max_queue"] = int(settings.password_hash_max_queue)
+    out["bcrypt_rounds"] = bcrypt_rounds()
+    out["bcrypt_calibrated"] = _calibrated_rounds is not None
+    for kind in ("hash", "verify"):
+        n = out[f"{kind}_count"]
+        out[f"{kind}_avg_ms"] = round(out[f"{kind}_seconds_total"] * 1000 / n, 3) if n else None
+    return out
+
+
+def shutdown_password_pool() -> None:
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _slots = None
+
+
+# -----------------------
+# JWT
+# -----------------------
+# Backends intercambiables detrás de create_access_token/decode_token:
+# - "jose": python-jose (default, cualquier algoritmo)
+# - "native": HMAC + base64 + json de la stdlib (solo HS256/384/512)
+# Con RS*/ES* (app/core/jwt_keys.py) se firma con la clave privada actual y el
+# header lleva `kid`; al verificar se elige la clave pública por ese kid.
+_HMAC_ALGS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+
+def _b64url_encode(raw: bytes) -> bytes:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=")
+
+
+def _b64url_decode(part: bytes) -> bytes:
+    return base64.urlsafe_b64decode(part + b"=" * (-len(part) % 4))
+
+
+def _native_encode(payload: dict, secret: str, algorithm: str) -> str:
+    header = _b64url_encode(json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":")).encode())
+    body = _b64url_encode(json.dumps(payload, separators=(",", ":")).encode())
+    signing_input = header + b"." + body
+    sig = hmac.new(secret.encode(), signing_input, _HMAC_ALGS[algorithm]).digest()
+    return (signing_input + b"." + _b64url_encode(sig)).decode()
+
+
+def _native_decode(token: str, secret: str, algorithm: str) -> dict:
+    try:
+        raw = token.encode("ascii")
+        signing_input, _, sig = raw.rpartition(b".")
+        header_b64, _, body_b64 = signing_input.partition(b".")
+        header = json.loads(_b64url_decode(header_b64))
+        signature = _b64url_decode(sig)
+    except (ValueError, UnicodeError):
+        raise JWTError("Invalid token")
+
+    if not isinstance(header, dict) or header.get("alg") != algorithm:
+        raise JWTError("The specified alg value is not allowed")
+
+    expected = hmac.new(secret.encode(), signing_input, _HMAC_ALGS[algorithm]).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise JWTError("Signature verification failed")
+
+    try:
+        payload = json.loads(_b64url_decode(body_b64))
+    except ValueError:
+        raise JWTError("Invalid payload")
+    if not isinstance(payload, dict):
+        raise JWTError("Invalid payload")
+
+    now = time.time()
+    exp = payload.get("exp")
+    if exp is not None:
+        if not isinstance(exp, (int, float)):
+            raise JWTError("Expiration Time claim (exp) must be an integer.")
+        if exp < now:
+            raise ExpiredSignatureError("Signature has expired.")
+    nbf = payload.get("nbf")
+    if isinstance(nbf, (int, float)) and nbf > now:
+        raise JWTError("The token is not yet valid (nbf)")
+    return payload
+
+
+def _use_native() -> bool:
+    return (settings.jwt_backend or "jose").strip().lower() == "native" and settings.jwt_algorithm in _HMAC_ALGS
+
+
+def access_token_minutes() -> int:
+    # Con refresh tokens el access token es corto; sin ellos, JWT_EXPIRE_MINUTES
+    if settings.refresh_tokens_enabled:
+        return int(settings.access_token_expire_minutes)
+    return int(settings.jwt_expire_minutes)
+
+
+def create_access_token(sub: str, claims: dict | None = None, sid: str | None = None) -> str:
     now = datetime.now(timezone.utc)
-    exp = now + timedelta(minutes=settings.jwt_expire_minutes)
-    payload = {"sub": sub, "iat": int(now.timestamp()), "exp": exp}
+    exp = now + timedelta(minutes=access_token_minutes())
+    payload = {"sub": sub, "iat": int(now.timestamp()), "exp": int(exp.timestamp())}
+    if claims:
+        # Snapshot de entitlement (ver app/services/token_claims.py)
+        payload["ent"] = claims
+    if sid:
+        # Sesión del refresh token (ver app/services/sessions.py)
+        payload["sid"] = sid
+    if asymmetric():
+        kid, key = signing_key()
+        return jwt.encode(payload, key, algorithm=settings.jwt_algorithm, headers={"kid": kid})
+    if _use_native():
+        return _native_encode(payload, settings.jwt_secret, settings.jwt_algorithm)
     return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
-def decode_token(token: str) -> dict:
+
+def _decode_asymmetric(token: str) -> dict:
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+
+    # Migración desde HS*: los tokens viejos (firmados con JWT_SECRET) valen solo
+    # hasta JWT_LEGACY_HS_UNTIL (hora fija, no el iat: ese lo elige quien firma).
+    # Solo HMAC con el secreto: la clave pública nunca se usa como secreto HMAC.
+    if alg in _HMAC_ALGS:
+        deadline = legacy_hs_deadline()
+        if deadline is None or time.time() > deadline:
+            raise JWTError("Legacy HS tokens not accepted")
+        return jwt.decode(token, settings.jwt_secret, algorithms=list(_HMAC_ALGS))
+
+    key = verification_key(header.get("kid"))
+    if key is None:
+        raise JWTError("Unknown kid")
+    return jwt.decode(token, key, algorithms=[settings.jwt_algorithm])
+
+
+def _decode_token_uncached(token: str) -> dict:
+    if asymmetric():
+        return _decode_asymmetric(token)
+    if _use_native():
+        return _native_decode(token, settings.jwt_secret, settings.jwt_algorithm)
     return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+
+
+# Cache LRU de tokens ya verificados: digest(token) -> (exp, payload).
+# La clave cubre la firma, así que un token alterado nunca hace hit.
+_token_cache: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+_token_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def decode_token(token: str) -> dict:
+    max_entries = int(settings.token_cache_max_entries)
+    if max_entries <= 0:
+        return _decode_token_uncached(token)
+
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    entry = _token_cache.get(key)
+    if entry is not None:
+        if entry[0] > time.time():
+            _token_cache.move_to_end(key)
+            _token_cache_stats["hits"] += 1
+            return dict(entry[1])
+        _token_cache.pop(key, None)
+
+    _token_cache_stats["misses"] += 1
+    payload = _decode_token_uncached(token)
+
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expires = float(exp)
+        # Un token HS legacy cacheado no puede sobrevivir al corte
+        deadline = legacy_hs_deadline() if asymmetric() else None
+        if deadline is not None:
+            expires = min(expires, deadline)
+        _token_cache[key] = (expires, payload)
+        while len(_token_cache) > max_entries:
+            _token_cache.popitem(last=False)
+            _token_cache_stats["evictions"] += 1
+    return dict(payload)
+
+
+def clear_token_cache() -> None:
+    _token_cache.clear()
+
+
+def token_cache_stats() -> dict:
+    return {
+        **_token_cache_stats,
+        "size": len(_token_cache),
+        "max_entries": int(settings.token_cache_max_entries),
+        "backend": "native" if _use_native() else "jose",
+        "algorithm": settings.jwt_algorithm,
+    }
@@ -0,0 +1,157 @@
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse, Response
+
+try:
+    import brotli  # opcional: si no está, solo gzip
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# UI estática servida desde memoria: todo web/ se lee y se comprime UNA vez al
+# arrancar (gzip y brotli si está instalado). Por request solo se elige la
+# variante según Accept-Encoding y se compara el ETag.
+#
+# Cache:
+# - assets versionados (nombre con hash "app.1a2b3c4d.css" o ?v=<hash> correcto)
+#   -> immutable por un año
+# - el resto (index.html) -> no-cache: siempre revalida, 304 si no cambió
+# El HTML se reescribe al cargar para pedir /web/<asset>?v=<hash>, así el
+# navegador nunca revalida CSS/JS hasta que cambien.
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+_HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+_WEB_REF = re.compile(r'((?:href|src)=")(/web/)([^"?#]+)(")')
+
+
+class _Asset:
+    __slots__ = ("content_type", "digest", "variants", "immutable_name")
+
+    def __init__(self, name: str, data: bytes):
+        self.content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type == "application/javascript":
+            self.content_type += "; charset=utf-8"
+        self.digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+        self.immutable_name = bool(_HASHED_NAME.search(name))
+
+        # encoding -> (cuerpo, etag fuerte propio de esa variante)
+        self.variants: dict[str, tuple[bytes, str]] = {"identity": (data, f'"{self.digest}"')}
+        if self.content_type.startswith(_COMPRESSIBLE) and len(data) > 256:
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(gz) < len(data):
+                self.variants["gzip"] = (gz, f'"{self.digest}-gz"')
+            if brotli is not None:
+                br = brotli.compress(data, quality=11)
+                if len(br) < len(data):
+                    self.variants["br"] = (br, f'"{self.digest}-br"')
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if token:
+            accepted.add(token.strip())
+    return accepted
+
+
+def _not_modified(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+class StaticAssets:
+    """
+    App ASGI para montar en /web (reemplaza StaticFiles) + response() para "/".
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.assets: dict[str, _Asset] = {}
+        self.load()
+
+    def load(self) -> None:
+        files = {
+            p.relative_to(self.directory).as_posix(): p.read_bytes()
+            for p in sorted(self.directory.rglob("*")) if p.is_file()
+        }
+
+        # Primero los no-HTML (para conocer sus hashes), después el HTML reescrito
+        assets = {name: _Asset(name, data) for name, data in files.items() if not name.endswith(".html")}
+
+        def versioned(m: re.Match) -> str:
+            asset = assets.get(m.group(3))
+            if asset is None:
+                return m.group(0)
+            return f"{m.group(1)}{m.group(2)}{m.group(3)}?v={asset.digest}{m.group(4)}"
+
+        for name, data in files.items():
+            if name.endswith(".html"):
+                html = _WEB_REF.sub(versioned, data.decode("utf-8"))
+                assets[name] = _Asset(name, html.encode("utf-8"))
+
+        self.assets = assets
+
+    def stats(self) -> dict:
+        return {
+            "assets": len(self.assets),
+            "bytes": sum(len(a.variants["identity"][0]) for a in self.assets.values()),
+            "brotli": brotli is not None,
+        }
+
+    def response(self, name: str, headers: Headers, query_version: str | None = None, head: bool = False) -> Response:
+        asset = self.assets.get(name)
+        if asset is None:
+            return PlainTextResponse("Not Found", status_code=404)
+
+        immutable = asset.immutable_name or (query_version is not None and query_version == asset.digest)
+        accepted = _accepted(headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in asset.variants and e in accepted), "identity")
+        body, etag = asset.variants[encoding]
+
+        out = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+        if encoding != "identity":
+            out["Content-Encoding"] = encoding
+
+        inm = headers.get("if-none-match")
+        if inm and _not_modified(inm, etag):
+            return Response(status_code=304, headers=out)
+
+        if head:
+            out["Content-Length"] = str(len(body))
+            return Response(status_code=200, headers=out, media_type=asset.content_type)
+        return Response(body, headers=out, media_type=asset.content_type)
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        else:
+            path, root = scope["path"], scope.get("root_path", "")
+            if root and path.startswith(root):
+                path = path[len(root):]
+            name = path.lstrip("/")
+            query = scope.get("query_string", b"").decode("latin-1")
+            version = next((v for k, _, v in (p.partition("=") for p in query.split("&")) if k == "v"), None)
+            response = self.response(name, Headers(scope=scope), version, head=scope["method"] == "HEAD")
+        await response(scope, receive, send)
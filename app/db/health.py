@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from app.core.config import settings
+from app.db.mongo import get_db
+
+# Ping a Mongo en segundo plano: los probes (/health, /health/ready) leen el
+# último resultado en memoria y nunca esperan a Atlas.
+# Además medimos el lag del event loop (cuánto se pasa el sleep del loop).
+_state = {
+    "ok": False,
+    "rtt_ms": None,
+    "last_ping_at": None,       # epoch del último intento
+    "last_ok_at": None,         # epoch del último ping exitoso
+    "last_error": None,
+    "consecutive_failures": 0,
+    "pings": 0,
+    "loop_lag_ms": None,
+}
+
+
+async def ping_once() -> bool:
+    started = time.perf_counter()
+    _state["pings"] += 1
+    _state["last_ping_at"] = time.time()
+    try:
+        await asyncio.wait_for(get_db().command("ping"), timeout=float(settings.health_ping_timeout_seconds))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        _state["ok"] = False
+        _state["last_error"] = repr(e) if not isinstance(e, asyncio.TimeoutError) else "timeout"
+        _state["consecutive_failures"] += 1
+        return False
+
+    _state["ok"] = True
+    _state["rtt_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    _state["last_ok_at"] = time.time()
+    _state["last_error"] = None
+    _state["consecutive_failures"] = 0
+    return True
+
+
+async def ping_loop() -> None:
+    interval = max(0.5, float(settings.health_ping_interval_seconds))
+    while True:
+        await ping_once()
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        _state["loop_lag_ms"] = round(max(0.0, time.perf_counter() - expected) * 1000, 2)
+
+
+def mongo_health() -> dict:
+    now = time.time()
+    last_ok = _state["last_ok_at"]
+    age = round(now - last_ok, 2) if last_ok else None
+    ready = bool(_state["ok"]) and age is not None and age <= float(settings.health_ping_max_age_seconds)
+    return {
+        "ready": ready,
+        "age_seconds": age,
+        **{k: v for k, v in _state.items() if k not in ("last_ping_at", "last_ok_at")},
+    }
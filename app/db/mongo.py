@@ -1,5 +1,9 @@
+import asyncio
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import IndexModel
 from app.core.config import settings
+from app.db.monitoring import command_metrics, pool_stats
 
 _client: AsyncIOMotorClient | None = None
 _db: AsyncIOMotorDatabase | None = None
@@ -8,7 +12,21 @@ _db: AsyncIOMotorDatabase | None = None
 def get_client() -> AsyncIOMotorClient:
     global _client
     if _client is None:
-        _client = AsyncIOMotorClient(settings.mongodb_uri)
+        options = {
+            "maxPoolSize": settings.mongodb_max_pool_size,
+            "minPoolSize": settings.mongodb_min_pool_size,
+            "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+            "retryWrites": settings.mongodb_retry_writes,
+            "retryReads": settings.mongodb_retry_reads,
+            "appname": "chronos-api",
+            "event_listeners": [pool_stats, command_metrics],
+        }
+        if settings.mongodb_wait_queue_timeout_ms:
+            options["waitQueueTimeoutMS"] = settings.mongodb_wait_queue_timeout_ms
+        compressors = [c.strip() for c in (settings.mongodb_compressors or "").split(",") if c.strip()]
+        if compressors:
+            options["compressors"] = compressors
+        _client = AsyncIOMotorClient(settings.mongodb_uri, **options)
     return _client
 
 
@@ -19,9 +37,128 @@ def get_db() -> AsyncIOMotorDatabase:
     return _db
 
 
-async def ensure_indexes() -> None:
+async def warm_up_pool() -> int:
+    """
+    Abre minPoolSize conexiones (pings concurrentes) antes de declarar la app
+    lista, así los primeros requests no pagan SRV/TLS/handshake.
+    """
+    db = get_db()
+    n = max(1, int(settings.mongodb_min_pool_size))
+    await asyncio.gather(*(db.command("ping") for _ in range(n)))
+    return n
+
+
+def mongo_pool_stats() -> dict:
+    return {
+        "max_pool_size": settings.mongodb_max_pool_size,
+        "min_pool_size": settings.mongodb_min_pool_size,
+        **pool_stats.snapshot(),
+    }
+
+
+def desired_indexes() -> dict[str, list[IndexModel]]:
+    """
+    Índices que necesita la app, por colección. Se comparan por key pattern
+    contra list_indexes() y solo se crean los que faltan.
+    """
+    return {
+        "users": [
+            IndexModel("email", unique=True),
+            IndexModel("telegram_id"),
+            IndexModel("token_version_at", sparse=True),
+            IndexModel([("status", 1), ("plan_expires_at", 1)]),
+            IndexModel([("status", 1), ("banned_until", 1)]),
+            # Listado admin con paginación keyset
+            IndexModel([("plan", 1), ("status", 1), ("_id", -1)]),
+            IndexModel([("plan_expires_at", 1), ("_id", 1)]),
+            IndexModel([("telegram_linked", 1), ("_id", -1)]),
+        ],
+        # Feed de entitlements (scanner)
+        "entitlement_changes": [
+            IndexModel("v", unique=True),
+            IndexModel("at", expireAfterSeconds=int(settings.entitlement_changes_ttl_hours * 3600)),
+        ],
+        "telegram_link_codes": [
+            IndexModel("code", unique=True),
+            IndexModel("expires_at", expireAfterSeconds=0),
+        ],
+        # Canjes de códigos firmados (_id = código)
+        "telegram_link_redemptions": [
+            IndexModel("expires_at", expireAfterSeconds=0),
+        ],
+        # Locks de arranque (bootstrap admin): expiran solos
+        "locks": [
+            IndexModel("expires_at", expireAfterSeconds=0),
+        ],
+        # Outbox: reclamo por (status, next_attempt_at), lotes propios por owner,
+        # y los entregados se borran solos (los pending no tienen delivered_at)
+        "outbox": [
+            IndexModel([("status", 1), ("next_attempt_at", 1)]),
+            IndexModel([("owner", 1), ("status", 1)], sparse=True),
+            IndexModel("delivered_at", expireAfterSeconds=int(settings.outbox_retention_hours * 3600)),
+        ],
+        # Audit log: listado admin por _id desc, con filtros opcionales
+        "audit_log": [
+            IndexModel([("action", 1), ("_id", -1)]),
+            IndexModel([("actor_id", 1), ("_id", -1)]),
+            IndexModel([("target_id", 1), ("_id", -1)]),
+            IndexModel("at", expireAfterSeconds=int(settings.audit_retention_days * 86400)),
+        ],
+        # Sesiones (refresh tokens): logout-all por user_id, sync incremental de
+        # revocaciones por revoked_at, y vencidas se borran solas
+        "sessions": [
+            IndexModel("user_id"),
+            IndexModel("revoked_at", sparse=True),
+            IndexModel("expires_at", expireAfterSeconds=0),
+        ],
+    }
+
+
+def _key_signature(key) -> tuple:
+    return tuple((field, int(direction)) for field, direction in dict(key).items())
+
+
+async def missing_indexes() -> dict[str, list[IndexModel]]:
+    """
+    Un list_indexes por colección (en paralelo) -> {colección: [IndexModel faltantes]}.
+    """
     db = get_db()
-    await db.users.create_index("email", unique=True)
-    await db.users.create_index("telegram_id", unique=False)
-    await db.telegram_link_codes.create_index("code", unique=True)
-    await db.telegram_link_codes.create_index("expires_at", expireAfterSeconds=0)
+    desired = desired_indexes()
+
+    async def existing(name: str) -> set[tuple]:
+        return {_key_signature(idx["key"]) async for idx in db[name].list_indexes()}
+
+    found = await asyncio.gather(*(existing(name) for name in desired))
+    missing = {}
+    for (name, models), have in zip(desired.items(), found):
+        todo = [m for m in models if _key_signature(m.document["key"]) not in have]
+        if todo:
+            missing[name] = todo
+    return missing
+
+
+def split_unique(missing: dict[str, list[IndexModel]]) -> tuple[dict, dict]:
+    """
+    -> (únicos, resto). Los únicos (users.email, etc.) son los que garantizan
+    correctitud (register depende del DuplicateKeyError): se construyen antes
+    de servir; el resto (secundarios/TTL) puede ir en segundo plano.
+    """
+    unique: dict[str, list[IndexModel]] = {}
+    rest: dict[str, list[IndexModel]] = {}
+    for name, models in missing.items():
+        for m in models:
+            target = unique if m.document.get("unique") else rest
+            target.setdefault(name, []).append(m)
+    return unique, rest
+
+
+async def build_indexes(missing: dict[str, list[IndexModel]]) -> int:
+    # Un create_indexes por colección
+    db = get_db()
+    for name, models in missing.items():
+        await db[name].create_indexes(models)
+    return sum(len(models) for models in missing.values())
+
+
+async def ensure_indexes() -> int:
+    return await build_indexes(await missing_indexes())
@@ -0,0 +1,121 @@
+import threading
+
+from pymongo import monitoring
+
+from app.core.metrics import MONGO_LATENCY
+
+# Listeners de pymongo. Motor ejecuta el driver en threads, así que los
+# contadores se actualizan bajo lock (operaciones O(1), sin I/O).
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Estadísticas del pool de conexiones: checked-out actuales, espera de
+    checkout (duration que reporta el driver), conexiones creadas/cerradas.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats = {
+            "checked_out": 0,
+            "max_checked_out": 0,
+            "checkouts": 0,
+            "checkout_failed": 0,
+            "checkout_wait_seconds_total": 0.0,
+            "checkout_wait_seconds_max": 0.0,
+            "connections_open": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "pool_cleared": 0,
+        }
+
+    # --- checkout ---
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        wait = float(event.duration or 0.0)
+        with self._lock:
+            s = self._stats
+            s["checkouts"] += 1
+            s["checked_out"] += 1
+            s["max_checked_out"] = max(s["max_checked_out"], s["checked_out"])
+            s["checkout_wait_seconds_total"] += wait
+            s["checkout_wait_seconds_max"] = max(s["checkout_wait_seconds_max"], wait)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._stats["checkout_failed"] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._stats["checked_out"] -= 1
+
+    # --- ciclo de vida ---
+    def connection_created(self, event):
+        with self._lock:
+            self._stats["connections_created"] += 1
+            self._stats["connections_open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._stats["connections_closed"] += 1
+            self._stats["connections_open"] -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._stats["pool_cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        n = out["checkouts"]
+        out["checkout_wait_ms_avg"] = round(out["checkout_wait_seconds_total"] * 1000 / n, 3) if n else None
+        return out
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Latencia por colección/comando (histograma de app.core.metrics).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict = {}  # (connection_id, request_id) -> (collection, command)
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else "-"
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name)
+
+    def _finish(self, event, outcome: str) -> None:
+        with self._lock:
+            info = self._pending.pop((event.connection_id, event.request_id), None)
+        if info is None:
+            return
+        MONGO_LATENCY.observe(event.duration_micros / 1_000_000, info[0], info[1], outcome)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+pool_stats = PoolStatsListener()
+command_metrics = CommandMetricsListener()
@@ -2,14 +2,18 @@
 
 from __future__ import annotations
 
+import hmac
 from datetime import datetime, timezone
 
 from bson import ObjectId
-from fastapi import Depends, HTTPException
+from fastapi import Depends, Header, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from app.core.config import settings
 from app.core.security import decode_token
-from app.db.mongo import get_db
+from app.services.sessions import is_revoked
+from app.services.token_claims import claims_enabled, user_from_claims
+from app.services.user_cache import get_user
 
 bearer = HTTPBearer(auto_error=False)
 
@@ -25,6 +29,15 @@ def _as_aware_utc(dt: datetime) -> datetime:
     return dt
 
 
+def client_ip(request: Request) -> str | None:
+    # X-Forwarded-For solo si estamos detrás de un proxy que lo setea
+    if settings.trust_forwarded_for:
+        fwd = request.headers.get("x-forwarded-for")
+        if fwd:
+            return fwd.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
 def _is_datetime(value) -> bool:
     return isinstance(value, datetime)
 
@@ -44,10 +57,21 @@ async def get_current_user(
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    db = get_db()
-    user = await db.users.find_one({"_id": user_id})
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    # Logout / logout-all: set en memoria, sin round trip
+    sid = payload.get("sid")
+    if sid and is_revoked(sid):
+        raise HTTPException(status_code=401, detail="Session revoked")
+
+    user = None
+    ent = payload.get("ent")
+    if ent and claims_enabled():
+        # Camino rápido: claims del token vigentes -> sin Mongo ni cache
+        user = user_from_claims(user_id, ent)
+
+    if user is None:
+        user = await get_user(user_id)
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
 
     now = _now()
 
@@ -83,29 +107,46 @@ async def get_current_user(
     exp = user.get("plan_expires_at")
 
     # Si no hay expiración guardada => NO se da acceso (evita bugs/datos inconsistentes)
+    # (Solo lectura: el status "inactive" lo persiste app/services/expiry_sweeper.py)
     if not _is_datetime(exp):
         # Free siempre debe tener expiración (trial)
         # Plus/Premium siempre debe tener expiración (30 días)
-        await db.users.update_one(
-            {"_id": user["_id"]},
-            {"$set": {"status": "inactive"}},
-        )
         raise HTTPException(status_code=403, detail="Plan inactive")
 
     exp = _as_aware_utc(exp)
 
-    # Si el plan expira y ya venció => marcamos inactive y cortamos
+    # Si el plan expira y ya venció => cortamos
     if exp <= now:
-        await db.users.update_one(
-            {"_id": user["_id"]},
-            {"$set": {"status": "inactive"}},
-        )
         raise HTTPException(status_code=403, detail="Plan expired")
 
     return user
 
 
+async def get_current_user_doc(user: dict = Depends(get_current_user)) -> dict:
+    """
+    Igual que get_current_user pero garantiza el documento completo
+    (con JWT_EMBED_CLAIMS el usuario puede venir solo desde los claims).
+    """
+    if not user.get("_from_claims"):
+        return user
+
+    doc = await get_user(user["_id"])
+    if not doc:
+        raise HTTPException(status_code=401, detail="User not found")
+    return doc
+
+
 async def require_admin(user: dict = Depends(get_current_user)) -> dict:
     if not user.get("is_admin", False):
         raise HTTPException(status_code=403, detail="Admin only")
     return user
+
+
+async def require_internal_key(x_internal_key: str | None = Header(default=None)) -> None:
+    """
+    Servicios internos (bot / scanner): header X-Internal-Key == INTERNAL_API_KEY.
+    """
+    if not settings.internal_api_key:
+        raise HTTPException(status_code=500, detail="INTERNAL_API_KEY not configured")
+    if not x_internal_key or not hmac.compare_digest(x_internal_key, settings.internal_api_key):
+        raise HTTPException(status_code=401, detail="Unauthorized")
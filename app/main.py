@@ -1,16 +1,45 @@
-from fastapi import FastAPI
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import importlib.util
+import logging
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
 from app.api.router import api_router
-from app.db.mongo import ensure_indexes, get_db
+from app.db.health import ping_loop
+from app.db.mongo import build_indexes, missing_indexes, split_unique, warm_up_pool
 from app.core.config import settings
-from app.services.users import create_user
-from pymongo.errors import DuplicateKeyError
+from app.core.jwt_keys import load_keys
+from app.core.metrics import MetricsMiddleware
+from app.core.static_assets import StaticAssets
+from app.core.security import calibrate_bcrypt_rounds, set_bcrypt_rounds, shutdown_password_pool
+from app.services.bootstrap import bootstrap_admin
+from app.services.token_claims import claims_enabled, revocation_sync_loop, sync_revocations
+from app.services.audit import audit_writer_loop
+from app.services.expiry_sweeper import expiry_sweep_loop
+from app.services.sessions import refresh_enabled, session_revocation_loop, sync_revoked_sessions
+from app.services.outbox import close_outbox_client, outbox_dispatch_loop, outbox_enabled
+from app.services.renewal_reminders import close_reminder_client, parse_windows, renewal_reminder_loop, reminders_enabled
+
+# Mismo logger que uvicorn: sale en los logs de Railway sin configurar nada
+logger = logging.getLogger("uvicorn.error")
+_IMPORT_MS = (time.perf_counter() - _IMPORT_STARTED) * 1000
 
-app = FastAPI(title="Chronos API", version="0.1.3")
+# Respuestas JSON con orjson si está instalado (fallback: JSONResponse de la stdlib)
+# (ORJSONResponse se importa aunque orjson falte y recién falla al responder)
+if importlib.util.find_spec("orjson") is not None:
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+else:  # pragma: no cover
+    from fastapi.responses import JSONResponse as DefaultJSONResponse
+
+app = FastAPI(title="Chronos API", version="0.1.3", default_response_class=DefaultJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,17 +49,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencia/conteo por ruta para /metrics
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # --- Web UI (sin Jinja2) ---
 BASE_DIR = Path(__file__).resolve().parent
 WEB_DIR = BASE_DIR / "web"
 
 # Sirve /web/app.css, /web/app.js, etc.
+# Modo "memory": leídos y comprimidos una vez al arrancar (ETag/304/immutable)
+web_assets: StaticAssets | None = None
 if WEB_DIR.exists():
-    app.mount("/web", StaticFiles(directory=str(WEB_DIR)), name="web")
+    if (settings.web_static_mode or "memory").strip().lower() == "memory":
+        web_assets = StaticAssets(WEB_DIR)
+        app.mount("/web", web_assets, name="web")
+    else:
+        app.mount("/web", StaticFiles(directory=str(WEB_DIR)), name="web")
 
 @app.get("/")
-async def web_root():
+async def web_root(request: Request):
     # UI tipo app (mismo servicio)
+    if web_assets is not None and "index.html" in web_assets.assets:
+        return web_assets.response("index.html", request.headers)
     index = WEB_DIR / "index.html"
     if index.exists():
         return FileResponse(str(index))
@@ -38,25 +79,128 @@ async def web_root():
 
 app.include_router(api_router)
 
+# Tareas de fondo arrancadas en startup (se cancelan en shutdown)
+_background_tasks: list[asyncio.Task] = []
+
+async def _build_indexes_in_background(missing: dict) -> None:
+    started = time.perf_counter()
+    try:
+        built = await build_indexes(missing)
+        logger.info("startup: built %d missing indexes in %.0fms", built, (time.perf_counter() - started) * 1000)
+    except Exception:
+        logger.exception("startup: index build failed")
+
+
 @app.on_event("startup")
 async def on_startup():
-    await ensure_indexes()
+    timings: dict[str, float] = {"imports": _IMPORT_MS}
+    started = step = time.perf_counter()
+
+    def mark(name: str) -> None:
+        nonlocal step
+        now = time.perf_counter()
+        timings[name] = (now - step) * 1000
+        step = now
+
+    # Claves RS*/ES*: si están mal configuradas, que falle el arranque y no cada login
+    load_keys()
+
+    # Conexiones listas antes de servir (si Atlas no responde, que no tumbe el arranque)
+    if settings.mongodb_warmup:
+        try:
+            await warm_up_pool()
+        except Exception:
+            logger.warning("startup: mongo warm-up failed", exc_info=True)
+        mark("warmup")
 
-    # bootstrap admin opcional (no tumbar backend)
-    if settings.admin_email and settings.admin_password:
-        admin_email = settings.admin_email.strip()
-        admin_password = settings.admin_password.strip()
+    # Costo de bcrypt medido en este hardware (bloqueante -> thread)
+    if settings.bcrypt_calibrate_on_startup:
+        result = await asyncio.to_thread(calibrate_bcrypt_rounds, float(settings.bcrypt_target_ms))
+        set_bcrypt_rounds(result["rounds"])
+        logger.info("startup: bcrypt calibrated to %d rounds (%.0fms, target %.0fms)",
+                    result["rounds"], result["measured_ms"], result["target_ms"])
+        mark("bcrypt_calibration")
 
+    # Ping cacheado para /health y /health/ready (el primero sale ya mismo)
+    _background_tasks.append(asyncio.create_task(ping_loop()))
+
+    # Un list_indexes por colección; los únicos que falten se construyen ya,
+    # el resto en segundo plano
+    try:
+        missing = await missing_indexes()
+    except Exception:
+        logger.warning("startup: could not list indexes", exc_info=True)
+        missing = {}
+    unique, secondary = split_unique(missing)
+    if unique:
+        # Sin el índice único de email, register podría duplicar cuentas: si no
+        # se puede construir (p.ej. duplicados existentes) no arrancamos
+        await build_indexes(unique)
+        logger.info("startup: built %d unique indexes", sum(len(m) for m in unique.values()))
+    if secondary:
+        _background_tasks.append(asyncio.create_task(_build_indexes_in_background(secondary)))
+    mark("index_check")
+
+    # bootstrap admin opcional (no tumbar backend); solo hashea si el admin no existe
+    try:
+        admin = await bootstrap_admin()
+    except Exception:
+        logger.warning("startup: admin bootstrap failed", exc_info=True)
+        admin = "error"
+    mark("admin_bootstrap")
+
+    # JWT con claims: cargamos los bumps de token_version vigentes antes de servir
+    if claims_enabled():
         try:
-            db = get_db()
-            existing = await db.users.find_one({"email": admin_email.lower()})
-            if not existing:
-                await create_user(admin_email, admin_password, is_admin=True)
-                await db.users.update_one(
-                    {"email": admin_email.lower()},
-                    {"$set": {"plan": "premium", "plan_expires_at": None}}
-                )
-        except DuplicateKeyError:
+            await sync_revocations()
+        except Exception:
             pass
+        _background_tasks.append(asyncio.create_task(revocation_sync_loop()))
+        mark("claims_sync")
+
+    # Refresh tokens: sesiones revocadas (logout) en memoria antes de servir
+    if refresh_enabled():
+        try:
+            await sync_revoked_sessions()
         except Exception:
             pass
+        _background_tasks.append(asyncio.create_task(session_revocation_loop()))
+        mark("sessions_sync")
+
+    # Audit log write-behind (en shutdown vacía la cola antes de salir)
+    if settings.audit_enabled:
+        _background_tasks.append(asyncio.create_task(audit_writer_loop()))
+
+    # Planes vencidos / bans vencidos: fuera del request path
+    if settings.expiry_sweep_enabled:
+        _background_tasks.append(asyncio.create_task(expiry_sweep_loop()))
+
+    # Eventos de usuario -> webhook del bot (con OUTBOX_WEBHOOK_URL)
+    if outbox_enabled():
+        _background_tasks.append(asyncio.create_task(outbox_dispatch_loop()))
+
+    # Recordatorios de renovación por Telegram (un worker a la vez, por lock)
+    if reminders_enabled():
+        parse_windows(settings.renewal_reminder_windows)  # ValueError: que falle el arranque
+        _background_tasks.append(asyncio.create_task(renewal_reminder_loop()))
+
+    total = (time.perf_counter() - started) * 1000
+    logger.info(
+        "startup: %.0fms (%s) missing_indexes=%d admin=%s",
+        total,
+        " ".join(f"{k}={v:.0f}ms" for k, v in timings.items()),
+        sum(len(m) for m in missing.values()),
+        admin,
+    )
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+
+    await close_outbox_client()
+    await close_reminder_client()
+    shutdown_password_pool()
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
 class RegisterIn(BaseModel):
@@ -25,3 +27,12 @@ class LoginIn(BaseModel):
 class TokenOut(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    # Solo con REFRESH_TOKENS_ENABLED
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshIn(BaseModel):
+    refresh_token: str = Field(min_length=1, max_length=256)
+
+class LogoutIn(BaseModel):
+    refresh_token: Optional[str] = Field(default=None, max_length=256)
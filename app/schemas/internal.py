@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class AccessStateIn(BaseModel):
+    telegram_ids: list[int] = Field(..., min_length=1, max_length=1000)
+
+
+class AccessStateItem(BaseModel):
+    telegram_id: int
+    found: bool
+    account_state: str
+    plan: Optional[str] = None
+    plan_expires_at: Optional[datetime] = None
+
+
+class AccessStateOut(BaseModel):
+    results: list[AccessStateItem]
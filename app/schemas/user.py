@@ -1,13 +1,24 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Optional, Literal
+from datetime import datetime, timezone
+from typing import Annotated, Optional, Literal
 
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, ConfigDict, field_validator
 
 
 PlanName = Literal["free", "plus", "premium"]
 UserStatus = Literal["active", "inactive", "banned"]
+AccountState = Literal["trial", "active", "inactive", "banned"]
+
+
+def _as_aware_utc(dt: datetime) -> datetime:
+    # Mongo devuelve naive (UTC) -> lo marcamos como UTC al serializar
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+UTCDatetime = Annotated[datetime, AfterValidator(_as_aware_utc)]
 
 
 class UserOut(BaseModel):
@@ -16,17 +27,19 @@ class UserOut(BaseModel):
     IMPORTANTÍSIMO:
     - Todo lo "nuevo" va OPTIONAL para que no tumbe la API si en Mongo todavía no existe.
     """
-    model_config = ConfigDict(extra="ignore")
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
 
-    _id: str
-    email: EmailStr
+    # Se sigue respondiendo como "_id" (compat con el front)
+    id: str = Field(validation_alias="_id", serialization_alias="_id")
+    # Salida: ya validado al registrarse, no repetimos email-validator por request
+    email: str
 
     plan: PlanName = "free"
-    plan_expires_at: Optional[datetime] = None
+    plan_expires_at: Optional[UTCDatetime] = None
 
     # Control de acceso / bloqueos
     status: Optional[UserStatus] = "active"
-    banned_until: Optional[datetime] = None
+    banned_until: Optional[UTCDatetime] = None
     trial_used: Optional[bool] = False
 
     is_admin: bool = False
@@ -35,8 +48,33 @@ class UserOut(BaseModel):
     telegram_id: Optional[int] = None
     telegram_username: Optional[str] = None
     telegram_linked: Optional[bool] = False
+    telegram_linked_at: Optional[UTCDatetime] = None
+
+    created_at: Optional[UTCDatetime] = None
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def _oid_to_str(cls, v):
+        return str(v)
+
+
+class MeOut(UserOut):
+    """Response model de GET /me."""
+    account_state: AccountState
 
-    created_at: datetime
+
+class AuthMeOut(BaseModel):
+    """Response model de GET /auth/me (datos seguros del usuario)."""
+    model_config = ConfigDict(extra="ignore")
+
+    id: str
+    email: str
+    plan: PlanName = "free"
+    plan_expires_at: Optional[UTCDatetime] = None
+    status: Optional[UserStatus] = "active"
+    is_admin: bool = False
+    telegram_id: Optional[int] = None
+    telegram_username: Optional[str] = None
 
 
 class PlanUpdateIn(BaseModel):
@@ -0,0 +1,80 @@
+# app/services/access_state.py
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.db.mongo import get_db
+
+# Cache corto por telegram_id para el bot (/internal/access-state).
+# Guardamos el documento proyectado (o None si no existe ese telegram_id) y el
+# estado se calcula en cada request, así nunca queda "active" pasado el vencimiento.
+ACCESS_PROJECTION = {
+    "telegram_id": 1,
+    "plan": 1,
+    "plan_expires_at": 1,
+    "status": 1,
+    "banned_until": 1,
+}
+
+_entries: "OrderedDict[int, tuple[float, dict | None]]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "queries": 0, "evictions": 0}
+
+
+def _put(telegram_id: int, user: dict | None, expires_at: float) -> None:
+    _entries[telegram_id] = (expires_at, user)
+    _entries.move_to_end(telegram_id)
+    max_entries = int(settings.access_state_cache_max_entries)
+    while len(_entries) > max_entries:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+async def get_users_by_telegram_ids(telegram_ids: list[int]) -> dict[int, dict | None]:
+    """
+    -> {telegram_id: doc proyectado | None}. Un solo $in (índice telegram_id)
+    para todos los ids que no estén en cache.
+    """
+    now = time.monotonic()
+    found: dict[int, dict | None] = {}
+    missing: list[int] = []
+
+    for tid in telegram_ids:
+        entry = _entries.get(tid)
+        if entry is not None and entry[0] > now:
+            found[tid] = entry[1]
+            _stats["hits"] += 1
+        else:
+            missing.append(tid)
+            _stats["misses"] += 1
+
+    if missing:
+        _stats["queries"] += 1
+        db = get_db()
+        loaded: dict[int, dict] = {}
+        cursor = db.users.find({"telegram_id": {"$in": missing}}, ACCESS_PROJECTION).batch_size(len(missing))
+        async for user in cursor:
+            loaded.setdefault(user["telegram_id"], user)
+
+        expires_at = now + float(settings.access_state_cache_ttl_seconds)
+        for tid in missing:
+            user = loaded.get(tid)
+            found[tid] = user
+            _put(tid, user, expires_at)  # también cacheamos los "no existe"
+
+    return found
+
+
+def invalidate_telegram_id(telegram_id: int | None) -> None:
+    if telegram_id is not None:
+        _entries.pop(telegram_id, None)
+
+
+def access_state_cache_stats() -> dict:
+    return {
+        **_stats,
+        "size": len(_entries),
+        "ttl_seconds": float(settings.access_state_cache_ttl_seconds),
+    }
@@ -0,0 +1,186 @@
+# app/services/audit.py
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.db.mongo import get_db
+
+# Audit log write-behind: las rutas encolan en memoria (sin round trip a Atlas)
+# y una tarea de fondo escribe con insert_many cuando junta AUDIT_BATCH_SIZE
+# eventos o pasan AUDIT_FLUSH_INTERVAL_SECONDS, lo que ocurra primero.
+# - cola acotada (AUDIT_QUEUE_MAX). Llena: AUDIT_FULL_POLICY=drop descarta y
+#   cuenta; =block espera hasta AUDIT_BLOCK_TIMEOUT_MS (backpressure) y si no
+#   hay lugar descarta igual.
+# - el _id se asigna al encolar: orden cronológico para la paginación y
+#   reintentar un lote no duplica (DuplicateKey se ignora).
+# - en shutdown la tarea se cancela y vacía la cola antes de salir.
+logger = logging.getLogger("uvicorn.error")
+
+_queue: asyncio.Queue | None = None
+_POLL_SECONDS = 0.05
+
+_stats = {
+    "enqueued": 0,
+    "written": 0,
+    "dropped": 0,
+    "batches": 0,
+    "flush_errors": 0,
+    "lost": 0,
+    "max_depth": 0,
+    "last_flush_ms": None,
+    "last_error": None,
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _get_queue() -> asyncio.Queue:
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=max(1, int(settings.audit_queue_max)))
+    return _queue
+
+
+# -----------------------
+# Escritura (rutas)
+# -----------------------
+async def audit(
+    action: str,
+    *,
+    actor: Optional[dict] = None,
+    target_id: Any = None,
+    ip: Optional[str] = None,
+    **details,
+) -> None:
+    """
+    Encola un evento. Nunca lanza: el audit no debe romper el request.
+    actor = usuario que hace la acción (admin o el propio usuario en login).
+    """
+    if not settings.audit_enabled:
+        return
+
+    event = {
+        "_id": ObjectId(),
+        "at": _now(),
+        "action": action,
+        "actor_id": actor.get("_id") if actor else None,
+        "actor_email": actor.get("email") if actor else None,
+        "target_id": target_id,
+        "ip": ip,
+        "details": details or None,
+    }
+
+    q = _get_queue()
+    try:
+        q.put_nowait(event)
+    except asyncio.QueueFull:
+        if settings.audit_full_policy != "block":
+            _stats["dropped"] += 1
+            return
+        try:
+            await asyncio.wait_for(q.put(event), timeout=float(settings.audit_block_timeout_ms) / 1000)
+        except asyncio.TimeoutError:
+            _stats["dropped"] += 1
+            return
+
+    _stats["enqueued"] += 1
+    _stats["max_depth"] = max(_stats["max_depth"], q.qsize())
+
+
+# -----------------------
+# Writer
+# -----------------------
+async def _write(batch: list[dict]) -> None:
+    started = time.perf_counter()
+    for attempt in range(3):
+        try:
+            await get_db().audit_log.insert_many(batch, ordered=False)
+            break
+        except BulkWriteError as e:
+            # Solo duplicados = un reintento anterior ya los había escrito
+            if all(err.get("code") == 11000 for err in e.details.get("writeErrors", [])):
+                break
+            _stats["flush_errors"] += 1
+            _stats["last_error"] = repr(e)
+        except Exception as e:
+            _stats["flush_errors"] += 1
+            _stats["last_error"] = repr(e)
+        if attempt == 2:
+            _stats["lost"] += len(batch)
+            logger.warning("audit: lost %d events (%s)", len(batch), _stats["last_error"])
+            return
+        await asyncio.sleep(0.5 * (attempt + 1))
+
+    _stats["written"] += len(batch)
+    _stats["batches"] += 1
+    _stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def _take_nowait(q: asyncio.Queue, batch: list[dict], limit: int) -> None:
+    while len(batch) < limit:
+        try:
+            batch.append(q.get_nowait())
+        except asyncio.QueueEmpty:
+            return
+
+
+async def _drain(batch: list[dict]) -> None:
+    q = _get_queue()
+    limit = max(1, int(settings.audit_batch_size))
+    while True:
+        _take_nowait(q, batch, limit)
+        if not batch:
+            return
+        await _write(batch)
+        batch = []
+
+
+async def audit_writer_loop() -> None:
+    q = _get_queue()
+    limit = max(1, int(settings.audit_batch_size))
+    interval = max(0.05, float(settings.audit_flush_interval_seconds))
+    batch: list[dict] = []
+    try:
+        while True:
+            # Espera el primer evento sin límite; después junta hasta tamaño o tiempo.
+            # Sleep corto en vez de wait_for(q.get()): en 3.11 wait_for puede
+            # tragarse la cancelación si el get termina justo a la vez.
+            batch.append(await q.get())
+            deadline = time.monotonic() + interval
+            while True:
+                _take_nowait(q, batch, limit)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= limit or remaining <= 0:
+                    break
+                await asyncio.sleep(min(remaining, _POLL_SECONDS))
+            await _write(batch)
+            batch = []
+    except asyncio.CancelledError:
+        # Shutdown: lo que quedó en mano + la cola. Si cortamos un insert a
+        # mitad, reescribir el lote no duplica (mismos _id)
+        try:
+            await asyncio.wait_for(_drain(batch), timeout=float(settings.audit_drain_timeout_seconds))
+        except Exception as e:
+            logger.warning("audit: drain failed (%r), %d events pending", e, _get_queue().qsize())
+        raise
+
+
+def audit_stats() -> dict:
+    return {
+        "enabled": bool(settings.audit_enabled),
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "queue_max": int(settings.audit_queue_max),
+        "full_policy": settings.audit_full_policy,
+        **_stats,
+    }
@@ -0,0 +1,72 @@
+# app/services/bootstrap.py
+
+from __future__ import annotations
+
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.db.mongo import get_db
+from app.services.users import create_user_doc
+
+# Trabajo de arranque que solo debe hacer UN worker: lock liviano en la
+# colección `locks` ({_id, owner, expires_at} con TTL). Tomar el lock es un
+# upsert que solo matchea si el lock no existe o ya venció; si otro worker lo
+# tiene, el upsert choca con el _id -> DuplicateKeyError.
+LOCK_TTL_SECONDS = 120
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def acquire_lock(name: str, ttl_seconds: int = LOCK_TTL_SECONDS) -> bool:
+    now = _now()
+    try:
+        await get_db().locks.update_one(
+            {"_id": name, "expires_at": {"$lte": now}},
+            {"$set": {"owner": _OWNER, "acquired_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release_lock(name: str) -> None:
+    await get_db().locks.delete_one({"_id": name, "owner": _OWNER})
+
+
+async def bootstrap_admin() -> str:
+    """
+    Crea el admin (premium, sin vencimiento) si no existe.
+    -> "disabled" | "exists" | "locked" | "created"
+    """
+    if not (settings.admin_email and settings.admin_password):
+        return "disabled"
+
+    email = settings.admin_email.strip().lower()
+    users = get_db().users
+
+    # Camino normal en cada arranque: un find_one por índice, sin bcrypt
+    if await users.find_one({"email": email}, {"_id": 1}):
+        return "exists"
+
+    if not await acquire_lock("bootstrap-admin"):
+        return "locked"
+    try:
+        # Otro worker pudo terminarlo justo antes de que tomáramos el lock
+        if await users.find_one({"email": email}, {"_id": 1}):
+            return "exists"
+
+        try:
+            await create_user_doc(email, settings.admin_password.strip(), is_admin=True, plan="premium")
+        except DuplicateKeyError:
+            return "exists"
+        return "created"
+    finally:
+        await release_lock("bootstrap-admin")
@@ -0,0 +1,168 @@
+# app/services/entitlement_feed.py
+
+from __future__ import annotations
+
+import base64
+import json
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+from app.db.mongo import get_db
+
+# Feed de entitlements para el scanner (telegram_ids con acceso, por plan).
+#
+# - counters/{_id: "entitlements"}.v: contador que se incrementa con cada cambio
+#   de plan/ban/link que afecta a un usuario con telegram_id.
+# - entitlement_changes: {v, telegram_id, plan|None, at} (TTL); plan=None => sin acceso.
+#
+# Orden de escritura: primero el usuario, después contador + cambio. Así un
+# snapshot tomado con versión V ya ve todas las escrituras con v <= V.
+PLANS = ("free", "plus", "premium")
+COUNTER_ID = "entitlements"
+
+_snapshot_cache: dict = {}  # (version, compress) -> bytes (solo la última versión)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_aware_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def entitled_plan(user: dict, now: datetime | None = None) -> str | None:
+    """
+    Plan con acceso vigente (free=trial, plus, premium) o None.
+    """
+    now = now or _now()
+
+    if user.get("status") == "banned":
+        until = user.get("banned_until")
+        if not isinstance(until, datetime) or _as_aware_utc(until) > now:
+            return None
+
+    exp = user.get("plan_expires_at")
+    if not isinstance(exp, datetime) or _as_aware_utc(exp) <= now:
+        return None
+
+    plan = user.get("plan", "free")
+    return plan if plan in PLANS else None
+
+
+async def current_version() -> int:
+    doc = await get_db().counters.find_one({"_id": COUNTER_ID})
+    return int(doc["v"]) if doc else 0
+
+
+async def record_changes(changes: list[tuple[int, str | None]]) -> int | None:
+    """
+    changes = [(telegram_id, plan|None)]. Reserva un rango del contador con un
+    solo $inc y guarda los cambios con insert_many. Devuelve la última versión.
+    """
+    changes = [(tid, plan) for tid, plan in changes if tid is not None]
+    if not changes:
+        return None
+
+    db = get_db()
+    counter = await db.counters.find_one_and_update(
+        {"_id": COUNTER_ID},
+        {"$inc": {"v": len(changes)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    last = int(counter["v"])
+    first = last - len(changes) + 1
+    now = _now()
+
+    await db.entitlement_changes.insert_many(
+        [
+            {"v": first + i, "telegram_id": int(tid), "plan": plan, "at": now}
+            for i, (tid, plan) in enumerate(changes)
+        ],
+        ordered=False,
+    )
+    return last
+
+
+def _pack(ids: list[int], compress: bool) -> str:
+    raw = struct.pack(f"<{len(ids)}q", *ids)
+    if compress:
+        raw = zlib.compress(raw, 6)
+    return base64.b64encode(raw).decode()
+
+
+async def build_snapshot(version: int, compress: bool) -> bytes:
+    """
+    JSON con un array int64 little-endian ordenado (base64, opcionalmente zlib)
+    por plan. Se cachea por versión: si nada cambió no se vuelve a consultar.
+    """
+    key = (version, compress)
+    cached = _snapshot_cache.get(key)
+    if cached is not None:
+        return cached
+
+    now = _now()
+    by_plan: dict[str, list[int]] = {p: [] for p in PLANS}
+    cursor = get_db().users.find(
+        {"telegram_id": {"$ne": None}, "plan_expires_at": {"$gt": now}},
+        {"telegram_id": 1, "plan": 1, "plan_expires_at": 1, "status": 1, "banned_until": 1},
+    ).batch_size(5000)
+    async for user in cursor:
+        plan = entitled_plan(user, now)
+        if plan is not None:
+            by_plan[plan].append(int(user["telegram_id"]))
+
+    body = {
+        "version": version,
+        "generated_at": now.isoformat(),
+        "encoding": "int64le-sorted",
+        "compression": "zlib" if compress else None,
+        "counts": {p: len(ids) for p, ids in by_plan.items()},
+        "plans": {p: _pack(sorted(set(ids)), compress) for p, ids in by_plan.items()},
+    }
+    data = json.dumps(body, separators=(",", ":")).encode()
+
+    _snapshot_cache.clear()
+    _snapshot_cache[key] = data
+    return data
+
+
+async def changes_since(since: int, limit: int) -> tuple[int, list[dict], bool] | None:
+    """
+    -> (versión hasta la que llega el delta, cambios compactados, hay_más)
+    o None si `since` ya no está cubierto (TTL) y el scanner debe re-sincronizar.
+
+    Solo se devuelve el tramo contiguo desde since+1: un hueco puede ser una
+    escritura que reservó versión y todavía no insertó su cambio.
+    """
+    docs = await get_db().entitlement_changes.find(
+        {"v": {"$gt": since}},
+        {"_id": 0, "v": 1, "telegram_id": 1, "plan": 1, "at": 1},
+    ).sort("v", 1).limit(limit + 1).to_list(limit + 1)
+
+    if docs and docs[0]["v"] != since + 1:
+        # Hueco al inicio: si el primer cambio disponible ya es viejo, no es una
+        # escritura en curso sino que el TTL borró lo que faltaba.
+        first_at = docs[0]["at"]
+        if _as_aware_utc(first_at) < _now() - timedelta(seconds=60):
+            return None
+        return since, [], False
+
+    version = since
+    latest: dict[int, str | None] = {}
+    for doc in docs[:limit]:
+        if doc["v"] != version + 1:
+            break
+        version = doc["v"]
+        latest.pop(doc["telegram_id"], None)  # mantener orden del último cambio
+        latest[doc["telegram_id"]] = doc["plan"]
+
+    more = len(docs) > limit or version < (docs[-1]["v"] if docs else since)
+    changes = [{"telegram_id": tid, "plan": plan} for tid, plan in latest.items()]
+    return version, changes, more
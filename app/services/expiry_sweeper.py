@@ -0,0 +1,132 @@
+# app/services/expiry_sweeper.py
+
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.db.mongo import get_db
+from app.services.access_state import invalidate_telegram_id
+from app.services.entitlement_feed import entitled_plan, record_changes
+from app.services.user_cache import invalidate_user
+
+# Barrido periódico de estados vencidos (reemplaza las escrituras que hacía
+# get_current_user dentro del request):
+# - plan vencido (o sin expiración) y status "active" -> "inactive"
+# - ban temporal vencido -> "active"/"inactive" según el plan (como /unban)
+# Usa los índices (status, plan_expires_at) y (status, banned_until).
+_stats = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "last_expired": 0,
+    "last_unbanned": 0,
+    "total_expired": 0,
+    "total_unbanned": 0,
+    "last_error": None,
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _expired_filter(now: datetime) -> dict:
+    return {
+        "status": "active",
+        "is_admin": {"$ne": True},
+        "$or": [
+            {"plan_expires_at": {"$lte": now}},
+            {"plan_expires_at": None},
+        ],
+    }
+
+
+def _lapsed_ban_filter(now: datetime) -> dict:
+    return {"status": "banned", "banned_until": {"$lte": now}}
+
+
+_SWEEP_PROJECTION = {"telegram_id": 1, "plan": 1, "plan_expires_at": 1}
+
+
+async def _sweep(flt: dict, update, batch_size: int, now: datetime) -> int:
+    db = get_db()
+    total = 0
+    while True:
+        docs = await db.users.find(flt, _SWEEP_PROJECTION).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        ids = [d["_id"] for d in docs]
+
+        # Repetimos el filtro: si otro worker/admin lo cambió entre medio, no lo pisamos
+        await db.users.update_many({"_id": {"$in": ids}, **flt}, update)
+        for doc in docs:
+            invalidate_user(doc["_id"])
+            invalidate_telegram_id(doc.get("telegram_id"))
+
+        # Feed del scanner: el acceso resultante (sin status banned) sale del plan
+        await record_changes([
+            (doc["telegram_id"], entitled_plan(doc, now))
+            for doc in docs if doc.get("telegram_id") is not None
+        ])
+        total += len(ids)
+
+        if len(ids) < batch_size:
+            break
+    return total
+
+
+async def sweep_once() -> dict:
+    started = time.perf_counter()
+    now = _now()
+    batch_size = max(1, int(settings.expiry_sweep_batch_size))
+
+    expired = await _sweep(
+        _expired_filter(now),
+        {"$set": {"status": "inactive"}},
+        batch_size,
+        now,
+    )
+
+    # Pipeline update: el status depende del plan del propio documento
+    unbanned = await _sweep(
+        _lapsed_ban_filter(now),
+        [
+            {"$set": {"status": {"$cond": [{"$gt": ["$plan_expires_at", now]}, "active", "inactive"]}}},
+            {"$unset": ["banned_until", "ban_reason", "banned_at"]},
+        ],
+        batch_size,
+        now,
+    )
+
+    _stats["runs"] += 1
+    _stats["last_run_at"] = now
+    _stats["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    _stats["last_expired"] = expired
+    _stats["last_unbanned"] = unbanned
+    _stats["total_expired"] += expired
+    _stats["total_unbanned"] += unbanned
+    _stats["last_error"] = None
+    return {"expired": expired, "unbanned": unbanned}
+
+
+async def expiry_sweep_loop() -> None:
+    while True:
+        try:
+            await sweep_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _stats["last_error"] = repr(e)
+        await asyncio.sleep(max(1.0, float(settings.expiry_sweep_interval_seconds)))
+
+
+def expiry_sweeper_stats() -> dict:
+    return {
+        "enabled": bool(settings.expiry_sweep_enabled),
+        "interval_seconds": float(settings.expiry_sweep_interval_seconds),
+        "batch_size": int(settings.expiry_sweep_batch_size),
+        **_stats,
+    }
@@ -0,0 +1,281 @@
+# app/services/outbox.py
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import secrets
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.metrics import OUTBOX_DELIVERY_LAG, OUTBOX_EVENTS
+from app.db.mongo import get_client, get_db
+from app.services.entitlement_feed import entitled_plan
+
+# Outbox transaccional: cada escritura de estado de usuario (user_repo) agrega
+# su evento a `outbox` en la MISMA transacción. Un dispatcher en segundo plano
+# los reclama por lotes y los manda por POST a OUTBOX_WEBHOOK_URL (el bot).
+#
+# Estados: pending -> inflight (lease de un worker) -> delivered (TTL) | dead.
+# Entrega at-least-once: el bot deduplica por `id`.
+#
+# Cuerpo del webhook:
+#   {"events": [{"id", "type", "created_at", "data": {...}}]}
+# Firma: X-Chronos-Signature: sha256=<hmac(body, OUTBOX_WEBHOOK_SECRET)>
+_client: httpx.AsyncClient | None = None
+_wakeup: asyncio.Event | None = None
+_OWNER = secrets.token_hex(6)
+
+_stats = {
+    "enqueued": 0,
+    "delivered": 0,
+    "failed_attempts": 0,
+    "dead": 0,
+    "batches": 0,
+    "last_delivery_at": None,
+    "last_error": None,
+    "last_lag_seconds": None,
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_aware_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _iso(value) -> str | None:
+    return _as_aware_utc(value).isoformat() if isinstance(value, datetime) else None
+
+
+def outbox_enabled() -> bool:
+    return bool(settings.outbox_webhook_url)
+
+
+# -----------------------
+# Escritura (dentro de la transacción del usuario)
+# -----------------------
+async def run_in_transaction(fn):
+    """
+    fn(session) en una transacción si el outbox está activo (y
+    OUTBOX_TRANSACTIONS), si no fn(None). with_transaction reintenta fn ante
+    errores transitorios, así que fn no debe tener efectos fuera de Mongo.
+    """
+    if not (outbox_enabled() and settings.outbox_transactions):
+        return await fn(None)
+    async with await get_client().start_session() as session:
+        return await session.with_transaction(fn)
+
+
+def user_event(kind: str, user: dict, now: datetime | None = None, **extra) -> dict:
+    now = now or _now()
+    return {
+        "type": kind,
+        "data": {
+            "user_id": str(user["_id"]),
+            "telegram_id": user.get("telegram_id"),
+            "plan": user.get("plan"),
+            "plan_expires_at": _iso(user.get("plan_expires_at")),
+            "status": user.get("status"),
+            "access": entitled_plan(user, now),
+            **extra,
+        },
+    }
+
+
+async def enqueue(events: list[dict], session=None) -> None:
+    if not events or not outbox_enabled():
+        return
+    now = _now()
+    await get_db().outbox.insert_many(
+        [
+            {**event, "created_at": now, "status": "pending", "attempts": 0, "next_attempt_at": now}
+            for event in events
+        ],
+        session=session,
+    )
+    _stats["enqueued"] += len(events)
+
+
+def notify() -> None:
+    # Despierta al dispatcher de este worker (después del commit)
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+# -----------------------
+# Dispatcher
+# -----------------------
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        conns = max(1, int(settings.outbox_max_connections))
+        _client = httpx.AsyncClient(
+            timeout=float(settings.outbox_timeout_seconds),
+            limits=httpx.Limits(max_connections=conns, max_keepalive_connections=conns),
+            headers={"User-Agent": "chronos-outbox"},
+        )
+    return _client
+
+
+async def close_outbox_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+
+
+async def _claim(batch_size: int) -> list[dict]:
+    """
+    Reclama hasta batch_size eventos: pending vencidos o inflight con lease
+    vencido (worker caído). El update_many marca owner y después leemos solo
+    los nuestros, así dos workers no mandan el mismo lote.
+    """
+    db = get_db()
+    now = _now()
+    claimable = {"$or": [
+        {"status": "pending", "next_attempt_at": {"$lte": now}},
+        {"status": "inflight", "lease_until": {"$lte": now}},
+    ]}
+    candidates = await db.outbox.find(claimable, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+    if not candidates:
+        return []
+
+    token = f"{_OWNER}:{secrets.token_hex(4)}"
+    lease = now + timedelta(seconds=float(settings.outbox_timeout_seconds) * 3)
+    await db.outbox.update_many(
+        {"_id": {"$in": [c["_id"] for c in candidates]}, **claimable},
+        {"$set": {"status": "inflight", "owner": token, "lease_until": lease}},
+    )
+    return await db.outbox.find({"owner": token, "status": "inflight"}).sort("_id", 1).to_list(batch_size)
+
+
+def _body(events: list[dict]) -> bytes:
+    return json.dumps(
+        {"events": [
+            {"id": str(e["_id"]), "type": e["type"], "created_at": _iso(e["created_at"]), "data": e.get("data")}
+            for e in events
+        ]},
+        separators=(",", ":"),
+    ).encode()
+
+
+def _backoff(attempts: int) -> float:
+    base = float(settings.outbox_backoff_base_seconds)
+    delay = min(float(settings.outbox_backoff_max_seconds), base * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)  # jitter: que los reintentos no lleguen juntos
+
+
+async def _deliver(events: list[dict]) -> None:
+    db = get_db()
+    body = _body(events)
+    headers = {"Content-Type": "application/json"}
+    if settings.outbox_webhook_secret:
+        sig = hmac.new(settings.outbox_webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        headers["X-Chronos-Signature"] = f"sha256={sig}"
+
+    error = None
+    try:
+        r = await _get_client().post(settings.outbox_webhook_url, content=body, headers=headers)
+        if r.status_code >= 300:
+            error = f"HTTP {r.status_code}"
+    except httpx.HTTPError as e:
+        error = repr(e)
+
+    now = _now()
+    ids = [e["_id"] for e in events]
+
+    if error is None:
+        await db.outbox.update_many(
+            {"_id": {"$in": ids}},
+            {"$set": {"status": "delivered", "delivered_at": now}, "$unset": {"owner": "", "lease_until": ""}},
+        )
+        for e in events:
+            lag = (now - _as_aware_utc(e["created_at"])).total_seconds()
+            OUTBOX_DELIVERY_LAG.observe(lag)
+            _stats["last_lag_seconds"] = round(lag, 3)
+        OUTBOX_EVENTS.inc("delivered", amount=len(events))
+        _stats["delivered"] += len(events)
+        _stats["last_delivery_at"] = now
+        return
+
+    # Falla: reintento con backoff por evento, o dead si se agotaron
+    max_attempts = int(settings.outbox_max_attempts)
+    ops = []
+    for e in events:
+        attempts = int(e.get("attempts", 0)) + 1
+        if attempts >= max_attempts:
+            update = {"$set": {"status": "dead", "attempts": attempts, "last_error": error}}
+            OUTBOX_EVENTS.inc("dead")
+            _stats["dead"] += 1
+        else:
+            update = {"$set": {
+                "status": "pending",
+                "attempts": attempts,
+                "last_error": error,
+                "next_attempt_at": now + timedelta(seconds=_backoff(attempts)),
+            }}
+            OUTBOX_EVENTS.inc("retried")
+        update["$unset"] = {"owner": "", "lease_until": ""}
+        ops.append(UpdateOne({"_id": e["_id"]}, update))
+    await db.outbox.bulk_write(ops, ordered=False)
+    _stats["failed_attempts"] += len(events)
+    _stats["last_error"] = error
+
+
+async def dispatch_once() -> int:
+    events = await _claim(max(1, int(settings.outbox_batch_size)))
+    if events:
+        _stats["batches"] += 1
+        await _deliver(events)
+    return len(events)
+
+
+async def outbox_dispatch_loop() -> None:
+    global _wakeup
+    _wakeup = asyncio.Event()
+    interval = max(0.1, float(settings.outbox_poll_interval_seconds))
+    while True:
+        try:
+            # Lote lleno => puede haber más, seguimos sin esperar
+            while await dispatch_once() >= int(settings.outbox_batch_size):
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _stats["last_error"] = repr(e)
+
+        # asyncio.wait y no wait_for: no se traga la cancelación del shutdown
+        waiter = asyncio.ensure_future(_wakeup.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=interval)
+        finally:
+            waiter.cancel()
+        _wakeup.clear()
+
+
+def outbox_stats() -> dict:
+    return {
+        "enabled": outbox_enabled(),
+        "transactions": bool(settings.outbox_transactions),
+        **_stats,
+    }
+
+
+async def outbox_backlog() -> dict:
+    # Para /admin/stats: cuántos hay en cada estado (usa el índice por status)
+    db = get_db()
+    counts = await asyncio.gather(*(
+        db.outbox.count_documents({"status": s}) for s in ("pending", "inflight", "dead")
+    ))
+    return dict(zip(("pending", "inflight", "dead"), counts))
@@ -0,0 +1,352 @@
+# app/services/renewal_reminders.py
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.metrics import RENEWAL_REMINDERS
+from app.db.mongo import get_db
+from app.services.bootstrap import acquire_lock, release_lock
+
+# Recordatorios de renovación por Telegram (tarea de fondo, un worker a la vez
+# por el lock "renewal-reminders"):
+# - ventanas RENEWAL_REMINDER_WINDOWS, p.ej. "3d,1d,expired" -> rangos sin
+#   solaparse sobre plan_expires_at: (now+1d, now+3d], (now, now+1d] y
+#   (now-grace, now]. Usa el índice (status, plan_expires_at).
+# - marcador por usuario: renewal_reminders.<ventana> = plan_expires_at al que
+#   se le avisó. Si renueva cambia el vencimiento y la ventana se rearma sola.
+# - el marcador se pone ANTES de mandar (bulk_write por lote, filtrado por el
+#   vencimiento leído, y una relectura para quedarse con los que matchearon);
+#   si el envío falla se saca y el próximo run reintenta.
+# - envío con httpx pooled, N en paralelo y token bucket (límite del Bot API:
+#   ~30 mensajes/s por bot). 429 -> espera retry_after; 403 -> bloqueó al bot.
+_LOCK = "renewal-reminders"
+_client: httpx.AsyncClient | None = None
+
+_stats = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "last_candidates": 0,
+    "last_sent": 0,
+    "last_throughput_per_s": None,
+    "backlog": 0,               # reclamados en este run y todavía sin mandar
+    "sent": 0,
+    "failed": 0,
+    "blocked": 0,
+    "rate_limited": 0,
+    "skipped_locked": 0,
+    "last_error": None,
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_aware_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def reminders_enabled() -> bool:
+    return bool(settings.renewal_reminders_enabled and settings.telegram_bot_token)
+
+
+# -----------------------
+# Ventanas
+# -----------------------
+# Solo enteros: la ventana es parte del path `renewal_reminders.<ventana>` y un
+# punto ("1.5d") lo convertiría en un path anidado (usar "36h")
+_WINDOW_RE = re.compile(r"^(\d+)([dh])$")
+
+
+def parse_windows(spec: str) -> list[tuple[str, timedelta]]:
+    """
+    "3d,1d,12h,expired" -> [("expired", 0), ("12h", 12h), ("1d", 1d), ("3d", 3d)]
+    ordenadas por offset. Lanza ValueError si alguna no se entiende.
+    """
+    windows: dict[str, timedelta] = {}
+    for raw in (spec or "").split(","):
+        key = raw.strip().lower()
+        if not key:
+            continue
+        if key == "expired":
+            windows[key] = timedelta(0)
+            continue
+        m = _WINDOW_RE.match(key)
+        if not m:
+            raise ValueError(f"invalid reminder window: {raw!r}")
+        amount = int(m.group(1))
+        windows[key] = timedelta(days=amount) if m.group(2) == "d" else timedelta(hours=amount)
+    return sorted(windows.items(), key=lambda kv: kv[1])
+
+
+def _ranges(now: datetime) -> list[tuple[str, datetime, datetime]]:
+    # (key, desde exclusivo, hasta inclusivo); cada ventana empieza donde termina la anterior
+    out = []
+    previous = timedelta(0)
+    for key, offset in parse_windows(settings.renewal_reminder_windows):
+        if key == "expired":
+            grace = timedelta(hours=float(settings.renewal_reminder_expired_grace_hours))
+            out.append((key, now - grace, now))
+            continue
+        out.append((key, now + previous, now + offset))
+        previous = offset
+    return out
+
+
+def _window_filter(key: str, lo: datetime, hi: datetime) -> dict:
+    return {
+        # Vencidos: el sweeper ya los pasó (o pasará) a inactive
+        "status": {"$in": ["active", "inactive"]} if key == "expired" else "active",
+        "plan_expires_at": {"$gt": lo, "$lte": hi},
+        "telegram_id": {"$ne": None},
+        "is_admin": {"$ne": True},
+    }
+
+
+_PROJECTION = {"telegram_id": 1, "plan": 1, "plan_expires_at": 1, "renewal_reminders": 1}
+
+
+# -----------------------
+# Mensaje
+# -----------------------
+def _whatsapp_url() -> str | None:
+    contact = (settings.whatsapp_contact or "").strip()
+    if not contact:
+        return None
+    if contact.startswith("http"):
+        return contact
+    return "https://wa.me/" + re.sub(r"\D", "", contact)
+
+
+def _message(key: str, doc: dict) -> str:
+    expires = _as_aware_utc(doc["plan_expires_at"]).strftime("%d/%m/%Y %H:%M UTC")
+    plan = str(doc.get("plan") or "").capitalize()
+    if key == "expired":
+        text = f"Tu plan {plan} venció el {expires}. Renueva para recuperar el acceso."
+    else:
+        text = f"Tu plan {plan} vence el {expires}. Renueva para no perder el acceso."
+    url = _whatsapp_url()
+    if url:
+        text += f"\n\nRenovar por WhatsApp: {url}"
+    return text
+
+
+# -----------------------
+# Envío
+# -----------------------
+class _TokenBucket:
+    """rate por segundo con ráfaga de hasta `rate` (un solo event loop, sin locks de thread)."""
+
+    def __init__(self, rate: float):
+        self.rate = max(0.1, rate)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def take(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        # 429: vaciamos el bucket para que nadie mande hasta retry_after
+        self.tokens = -seconds * self.rate
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        conns = max(1, int(settings.renewal_reminder_concurrency))
+        _client = httpx.AsyncClient(
+            base_url=settings.telegram_api_base.rstrip("/"),
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=conns, max_keepalive_connections=conns),
+        )
+    return _client
+
+
+async def close_reminder_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+
+
+async def send_telegram_message(chat_id: int, text: str, bucket: _TokenBucket) -> str:
+    """
+    -> "sent" | "blocked" | "failed". Reintenta los 429 respetando retry_after.
+    """
+    url = f"/bot{settings.telegram_bot_token}/sendMessage"
+    for _ in range(3):
+        await bucket.take()
+        try:
+            r = await _get_client().post(url, json={"chat_id": chat_id, "text": text, "disable_web_page_preview": True})
+        except httpx.HTTPError as e:
+            _stats["last_error"] = repr(e)
+            return "failed"
+
+        if r.status_code == 200:
+            return "sent"
+        if r.status_code == 429:
+            _stats["rate_limited"] += 1
+            try:
+                retry_after = float(r.json().get("parameters", {}).get("retry_after", 1))
+            except ValueError:
+                retry_after = 1.0
+            bucket.pause(retry_after)
+            continue
+        if r.status_code in (400, 403):
+            # Bloqueó al bot / chat inexistente: no reintentamos nunca
+            return "blocked"
+        _stats["last_error"] = f"HTTP {r.status_code}"
+        return "failed"
+    return "failed"
+
+
+# -----------------------
+# Run
+# -----------------------
+async def _claim(key: str, docs: list[dict]) -> list[dict]:
+    # Marcador antes de mandar; filtrado por el vencimiento leído. bulk_write
+    # no dice qué ops matchearon: releemos y nos quedamos solo con los que
+    # siguen con ese vencimiento y nuestro marcador (si renovó entre medio, no
+    # se manda nada)
+    pending = [d for d in docs if (d.get("renewal_reminders") or {}).get(key) != d["plan_expires_at"]]
+    if not pending:
+        return []
+    users = get_db().users
+    await users.bulk_write([
+        UpdateOne(
+            {"_id": d["_id"], "plan_expires_at": d["plan_expires_at"]},
+            {"$set": {f"renewal_reminders.{key}": d["plan_expires_at"]}},
+        )
+        for d in pending
+    ], ordered=False)
+
+    current = {
+        u["_id"]: u
+        async for u in users.find({"_id": {"$in": [d["_id"] for d in pending]}}, {"plan_expires_at": 1, "renewal_reminders": 1})
+    }
+    claimed = []
+    for d in pending:
+        now_doc = current.get(d["_id"])
+        if (
+            now_doc is not None
+            and now_doc.get("plan_expires_at") == d["plan_expires_at"]
+            and (now_doc.get("renewal_reminders") or {}).get(key) == d["plan_expires_at"]
+        ):
+            claimed.append(d)
+    _stats["backlog"] += len(claimed)
+    return claimed
+
+
+async def _send_batch(key: str, docs: list[dict], bucket: _TokenBucket) -> int:
+    sem = asyncio.Semaphore(max(1, int(settings.renewal_reminder_concurrency)))
+
+    async def one(doc: dict) -> str:
+        async with sem:
+            outcome = await send_telegram_message(int(doc["telegram_id"]), _message(key, doc), bucket)
+        RENEWAL_REMINDERS.inc(key, outcome)
+        _stats[outcome] += 1
+        _stats["backlog"] = max(0, _stats["backlog"] - 1)
+        return outcome
+
+    outcomes = await asyncio.gather(*(one(d) for d in docs))
+
+    # Fallas transitorias: sacamos el marcador para el próximo run
+    failed = [d for d, o in zip(docs, outcomes) if o == "failed"]
+    if failed:
+        await get_db().users.bulk_write([
+            UpdateOne(
+                {"_id": d["_id"], f"renewal_reminders.{key}": d["plan_expires_at"]},
+                {"$unset": {f"renewal_reminders.{key}": ""}},
+            )
+            for d in failed
+        ], ordered=False)
+    return sum(1 for o in outcomes if o == "sent")
+
+
+async def remind_once() -> dict:
+    """
+    Un pase por todas las ventanas. -> {ventana: enviados} o {"locked": True}.
+    """
+    interval = float(settings.renewal_reminder_interval_seconds)
+    if not await acquire_lock(_LOCK, ttl_seconds=int(max(60.0, interval))):
+        _stats["skipped_locked"] += 1
+        return {"locked": True}
+
+    started = time.perf_counter()
+    now = _now()
+    batch_size = max(1, int(settings.renewal_reminder_batch_size))
+    bucket = _TokenBucket(float(settings.renewal_reminder_rate_per_second))
+    users = get_db().users
+    result: dict = {}
+    candidates = sent = 0
+    try:
+        for key, lo, hi in _ranges(now):
+            flt = _window_filter(key, lo, hi)
+            result[key] = 0
+
+            batch: list[dict] = []
+            async for doc in users.find(flt, _PROJECTION).sort("plan_expires_at", 1).batch_size(batch_size):
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    claimed = await _claim(key, batch)
+                    candidates += len(claimed)
+                    result[key] += await _send_batch(key, claimed, bucket)
+                    batch = []
+            if batch:
+                claimed = await _claim(key, batch)
+                candidates += len(claimed)
+                result[key] += await _send_batch(key, claimed, bucket)
+            sent += result[key]
+    finally:
+        _stats["backlog"] = 0
+        await release_lock(_LOCK)
+
+    elapsed = time.perf_counter() - started
+    _stats["runs"] += 1
+    _stats["last_run_at"] = now
+    _stats["last_duration_ms"] = round(elapsed * 1000, 2)
+    _stats["last_candidates"] = candidates
+    _stats["last_sent"] = sent
+    _stats["last_throughput_per_s"] = round(sent / elapsed, 2) if elapsed and sent else 0.0
+    return result
+
+
+async def renewal_reminder_loop() -> None:
+    while True:
+        try:
+            await remind_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _stats["last_error"] = repr(e)
+        await asyncio.sleep(max(10.0, float(settings.renewal_reminder_interval_seconds)))
+
+
+def renewal_reminder_stats() -> dict:
+    return {
+        "enabled": reminders_enabled(),
+        "windows": settings.renewal_reminder_windows,
+        "rate_per_second": float(settings.renewal_reminder_rate_per_second),
+        "concurrency": int(settings.renewal_reminder_concurrency),
+        **_stats,
+    }
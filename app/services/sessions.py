@@ -0,0 +1,238 @@
+# app/services/sessions.py
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.security import access_token_minutes
+from app.db.mongo import get_db
+
+# Sesiones con refresh token rotativo (REFRESH_TOKENS_ENABLED=true).
+#
+# refresh token = "<sid>.<secreto>"; en `sessions` solo guardamos sha256 del
+# secreto. Cada /auth/refresh rota el secreto en un find_one_and_update (un
+# round trip). Si aparece un secreto ya rotado (fuera de la ventana de gracia)
+# asumimos robo y revocamos la sesión entera.
+#
+# Revocación de access tokens: llevan `sid`. En memoria guardamos los sid
+# revocados en los últimos ACCESS_TOKEN_EXPIRE_MINUTES (un access token más
+# viejo ya venció solo), así que el set queda chico y el chequeo es O(1).
+# Los demás workers se enteran por un sync incremental sobre revoked_at.
+_revoked: dict[str, float] = {}   # sid -> epoch de revocación
+_last_sync: datetime | None = None
+_stats = {
+    "created": 0,
+    "refreshed": 0,
+    "refresh_rejected": 0,
+    "reuse_detected": 0,
+    "revoked": 0,
+    "syncs": 0,
+    "last_sync_at": None,
+}
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_aware_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _hash(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def refresh_enabled() -> bool:
+    return bool(settings.refresh_tokens_enabled)
+
+
+def _split(refresh_token: str) -> tuple[str, str]:
+    sid, _, secret = (refresh_token or "").partition(".")
+    if not sid or not secret:
+        raise InvalidRefreshToken()
+    return sid, secret
+
+
+def _expires_at(now: datetime) -> datetime:
+    return now + timedelta(days=float(settings.refresh_token_expire_days))
+
+
+# -----------------------
+# Sesiones
+# -----------------------
+async def create_session(user_id: ObjectId, ip: Optional[str] = None, user_agent: Optional[str] = None) -> tuple[str, str]:
+    """
+    -> (sid, refresh_token)
+    """
+    now = _now()
+    sid = secrets.token_urlsafe(16)
+    secret = secrets.token_urlsafe(32)
+    await get_db().sessions.insert_one({
+        "_id": sid,
+        "user_id": user_id,
+        "refresh_hash": _hash(secret),
+        "created_at": now,
+        "rotated_at": now,
+        "expires_at": _expires_at(now),
+        "ip": ip,
+        "user_agent": (user_agent or "")[:200] or None,
+    })
+    _stats["created"] += 1
+    return sid, f"{sid}.{secret}"
+
+
+async def rotate_refresh_token(refresh_token: str) -> tuple[ObjectId, str, str]:
+    """
+    -> (user_id, sid, refresh_token nuevo). Lanza InvalidRefreshToken.
+    """
+    sid, secret = _split(refresh_token)
+    presented = _hash(secret)
+    new_secret = secrets.token_urlsafe(32)
+    now = _now()
+    sessions = get_db().sessions
+
+    doc = await sessions.find_one_and_update(
+        {"_id": sid, "refresh_hash": presented, "revoked_at": None, "expires_at": {"$gt": now}},
+        {"$set": {
+            "refresh_hash": _hash(new_secret),
+            "prev_hash": presented,
+            "rotated_at": now,
+            "expires_at": _expires_at(now),
+        }},
+        projection={"user_id": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is not None:
+        _stats["refreshed"] += 1
+        return doc["user_id"], sid, f"{sid}.{new_secret}"
+
+    # Camino de error: ¿es un secreto ya rotado?
+    _stats["refresh_rejected"] += 1
+    current = await sessions.find_one({"_id": sid}, {"prev_hash": 1, "rotated_at": 1, "revoked_at": 1})
+    if current and not current.get("revoked_at") and current.get("prev_hash") == presented:
+        rotated_at = current.get("rotated_at")
+        grace = timedelta(seconds=float(settings.refresh_reuse_grace_seconds))
+        if not (isinstance(rotated_at, datetime) and now - _as_aware_utc(rotated_at) <= grace):
+            _stats["reuse_detected"] += 1
+            await revoke_session(sid)
+    raise InvalidRefreshToken()
+
+
+async def session_id_for(refresh_token: str) -> Optional[str]:
+    """
+    sid si el refresh token es el VIGENTE de su sesión. Uno ya rotado no sirve:
+    si no, quien tenga un refresh viejo filtrado podría cerrar la sesión activa.
+    """
+    try:
+        sid, secret = _split(refresh_token)
+    except InvalidRefreshToken:
+        return None
+    doc = await get_db().sessions.find_one({"_id": sid, "refresh_hash": _hash(secret)}, {"_id": 1})
+    return sid if doc else None
+
+
+async def revoke_session(sid: str) -> bool:
+    now = _now()
+    res = await get_db().sessions.update_one(
+        {"_id": sid, "revoked_at": None},
+        {"$set": {"revoked_at": now}},
+    )
+    _note_revoked(sid, now.timestamp())
+    if res.modified_count:
+        _stats["revoked"] += 1
+    return bool(res.modified_count)
+
+
+async def revoke_user_sessions(user_id: ObjectId) -> int:
+    """
+    Logout en todos los dispositivos: revoca las sesiones abiertas del usuario.
+    """
+    now = _now()
+    sessions = get_db().sessions
+    flt = {"user_id": user_id, "revoked_at": None}
+    sids = [d["_id"] async for d in sessions.find(flt, {"_id": 1})]
+    if not sids:
+        return 0
+    await sessions.update_many({"_id": {"$in": sids}, "revoked_at": None}, {"$set": {"revoked_at": now}})
+    for sid in sids:
+        _note_revoked(sid, now.timestamp())
+    _stats["revoked"] += len(sids)
+    return len(sids)
+
+
+# -----------------------
+# Filtro en memoria
+# -----------------------
+def _note_revoked(sid: str, at: float) -> None:
+    _revoked[sid] = at
+
+
+def is_revoked(sid: str) -> bool:
+    return sid in _revoked
+
+
+def _horizon() -> float:
+    # Un access token emitido antes de esto ya venció: no hace falta recordarlo
+    return time.time() - access_token_minutes() * 60 - 60
+
+
+async def sync_revoked_sessions() -> int:
+    """
+    Trae las revocaciones hechas por otros workers desde el último sync.
+    """
+    global _last_sync
+    now = _now()
+    since = _last_sync or datetime.fromtimestamp(_horizon(), timezone.utc)
+
+    n = 0
+    async for doc in get_db().sessions.find({"revoked_at": {"$gt": since}}, {"revoked_at": 1}):
+        _note_revoked(doc["_id"], _as_aware_utc(doc["revoked_at"]).timestamp())
+        n += 1
+
+    horizon = _horizon()
+    for sid in [s for s, at in _revoked.items() if at < horizon]:
+        _revoked.pop(sid, None)
+
+    # Pequeño solape para no perder escrituras concurrentes con el query
+    _last_sync = now - timedelta(seconds=2)
+    _stats["syncs"] += 1
+    _stats["last_sync_at"] = now
+    return n
+
+
+async def session_revocation_loop() -> None:
+    interval = max(1.0, float(settings.session_revocation_sync_seconds))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sync_revoked_sessions()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Atlas caído momentáneamente: reintentamos en el próximo ciclo
+            pass
+
+
+def session_stats() -> dict:
+    return {
+        "enabled": refresh_enabled(),
+        "access_token_minutes": access_token_minutes(),
+        "revoked_in_memory": len(_revoked),
+        **_stats,
+    }
@@ -1,19 +1,100 @@
 from datetime import datetime, timedelta
+import base64
+import binascii
+import hashlib
+import hmac
 import secrets
+import struct
+import time
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import DuplicateKeyError
 
+from app.core.config import settings
 from app.db.mongo import get_db
 
 
 LINK_EXPIRE_SECONDS = 600  # 10 minutos
 
+# Modo "signed" (TELEGRAM_LINK_CODE_MODE=signed): el código es
+#   base64url(user_id 12B + exp uint32 4B + HMAC-SHA256[:8] 8B) = 32 chars
+# sin escritura en /link-code. El uso único se registra al canjear con un
+# insert_one en telegram_link_redemptions (_id = código, TTL por expires_at):
+# un segundo canje choca con el _id -> DuplicateKeyError.
+SIGNED_CODE_LENGTH = 32
+_SIG_BYTES = 8
+
 
 def _utcnow():
     # Naive UTC (coherente con Mongo/Motor en este proyecto)
     return datetime.utcnow()
 
 
+def _signed_mode() -> bool:
+    return (settings.telegram_link_code_mode or "stored").strip().lower() == "signed"
+
+
+def _signing_key() -> bytes:
+    # Clave propia si está configurada; si no, derivada de JWT_SECRET
+    secret = settings.telegram_link_code_secret or settings.jwt_secret
+    return hmac.new(secret.encode(), b"chronos/telegram-link-code", hashlib.sha256).digest()
+
+
+def create_signed_link_code(user_id: str, expires_minutes: int = 10) -> dict:
+    exp = int(time.time()) + expires_minutes * 60
+    payload = ObjectId(user_id).binary + struct.pack(">I", exp)
+    sig = hmac.new(_signing_key(), payload, hashlib.sha256).digest()[:_SIG_BYTES]
+    code = base64.urlsafe_b64encode(payload + sig).decode()
+    return {"code": code, "expires_at": datetime.utcfromtimestamp(exp)}
+
+
+def verify_signed_link_code(code: str) -> tuple[ObjectId, datetime] | None:
+    """
+    Verificación en memoria (firma + expiración). No dice si ya se usó.
+    """
+    if len(code) != SIGNED_CODE_LENGTH:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(code)
+    except (binascii.Error, ValueError):
+        return None
+
+    payload, sig = raw[:-_SIG_BYTES], raw[-_SIG_BYTES:]
+    expected = hmac.new(_signing_key(), payload, hashlib.sha256).digest()[:_SIG_BYTES]
+    if not hmac.compare_digest(sig, expected):
+        return None
+
+    (exp,) = struct.unpack(">I", payload[12:])
+    if exp <= time.time():
+        return None
+    try:
+        return ObjectId(payload[:12]), datetime.utcfromtimestamp(exp)
+    except InvalidId:
+        return None
+
+
+async def redeem_signed_link_code(code: str):
+    verified = verify_signed_link_code(code)
+    if verified is None:
+        return None
+    user_id, expires_at = verified
+
+    try:
+        await get_db().telegram_link_redemptions.insert_one({
+            "_id": code,
+            "user_id": user_id,
+            "expires_at": expires_at,
+            "used_at": _utcnow(),
+        })
+    except DuplicateKeyError:
+        return None  # ya canjeado
+    return {"user_id": user_id, "code": code, "expires_at": expires_at}
+
+
 async def create_link_code(user_id: str, expires_minutes: int = 10):
+    if _signed_mode():
+        return create_signed_link_code(user_id, expires_minutes)
+
     db = get_db()
 
     code = secrets.token_urlsafe(6)
@@ -37,20 +118,20 @@ async def create_link_code(user_id: str, expires_minutes: int = 10):
 
 
 async def consume_link_code(code: str):
-    db = get_db()
-
-    doc = await db.telegram_link_codes.find_one({"code": code, "used": False})
-    if not doc:
-        return None
+    """
+    Marca el código como usado de forma atómica: el filtro exige no usado y no
+    vencido, así dos /link simultáneos con el mismo código no pueden ganar ambos.
+    """
+    # Los códigos firmados se reconocen por su largo (los guardados tienen 8 chars),
+    # así los dos modos conviven durante un cambio de TELEGRAM_LINK_CODE_MODE
+    if len(code) == SIGNED_CODE_LENGTH:
+        return await redeem_signed_link_code(code)
 
+    db = get_db()
     now = _utcnow()
 
-    if doc.get("expires_at") and doc["expires_at"] < now:
-        return None
-
-    await db.telegram_link_codes.update_one(
-        {"_id": doc["_id"]},
-        {"$set": {"used": True}},
+    return await db.telegram_link_codes.find_one_and_update(
+        {"code": code, "used": False, "expires_at": {"$gt": now}},
+        {"$set": {"used": True, "used_at": now}},
+        projection={"user_id": 1, "code": 1, "expires_at": 1},
     )
-
-    return doc
@@ -0,0 +1,166 @@
+# app/services/token_claims.py
+
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.mongo import get_db
+
+# Claims de entitlement dentro del JWT (opt-in: JWT_EMBED_CLAIMS=true).
+#
+# El token lleva un snapshot compacto en "ent":
+#   p = plan, x = plan_expires_at (epoch s o None), s = status,
+#   b = banned_until (epoch s o None), a = is_admin (0/1), v = token_version
+#
+# Cada escritura admin que cambia plan/ban hace $inc de users.token_version y
+# marca token_version_at. Aquí guardamos en memoria la versión mínima válida
+# por usuario: un token con v menor NO se confía y get_current_user cae al
+# camino normal (cache/Mongo), que sí ve el estado real.
+_min_versions: dict[str, tuple[int, float]] = {}  # user_id -> (versión mínima, epoch del bump)
+_last_sync: datetime | None = None
+_stats = {"syncs": 0, "last_sync_at": None, "stale_tokens": 0}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_aware_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _epoch(value) -> int | None:
+    if isinstance(value, datetime):
+        return int(_as_aware_utc(value).timestamp())
+    return None
+
+
+def claims_enabled() -> bool:
+    return bool(settings.jwt_embed_claims)
+
+
+def entitlement_claims(user: dict) -> dict:
+    return {
+        "p": user.get("plan", "free"),
+        "x": _epoch(user.get("plan_expires_at")),
+        "s": user.get("status", "active"),
+        "b": _epoch(user.get("banned_until")),
+        "a": 1 if user.get("is_admin", False) else 0,
+        "v": int(user.get("token_version", 0) or 0),
+    }
+
+
+def issue_access_token(user: dict, sid: str | None = None) -> str:
+    """
+    Token para login/registro/refresh: con claims si el modo está activo y
+    con sid si viene de una sesión con refresh token.
+    """
+    claims = entitlement_claims(user) if claims_enabled() else None
+    return create_access_token(str(user["_id"]), claims=claims, sid=sid)
+
+
+def user_from_claims(user_id: ObjectId, ent: dict) -> dict | None:
+    """
+    Reconstruye un "user" mínimo desde los claims, o None si no se puede confiar
+    (formato raro o token_version revocada).
+    """
+    try:
+        version = int(ent.get("v", 0))
+        plan_exp = ent.get("x")
+        banned_until = ent.get("b")
+        user = {
+            "_id": user_id,
+            "plan": ent.get("p", "free"),
+            "plan_expires_at": datetime.fromtimestamp(plan_exp, timezone.utc) if plan_exp is not None else None,
+            "status": ent.get("s", "active"),
+            "banned_until": datetime.fromtimestamp(banned_until, timezone.utc) if banned_until is not None else None,
+            "is_admin": bool(ent.get("a", 0)),
+            "token_version": version,
+            "_from_claims": True,
+        }
+    except (AttributeError, TypeError, ValueError, OverflowError, OSError):
+        return None
+
+    entry = _min_versions.get(str(user_id))
+    if entry is not None and version < entry[0]:
+        _stats["stale_tokens"] += 1
+        return None
+    return user
+
+
+def note_token_version(user_id: ObjectId | str, version: int) -> None:
+    key = str(user_id)
+    current = _min_versions.get(key)
+    if current is None or version > current[0]:
+        _min_versions[key] = (int(version), time.time())
+
+
+def token_version_bump(now: datetime | None = None) -> dict:
+    """
+    Fragmento de update para invalidar los tokens emitidos hasta ahora.
+    Uso: {"$set": {...}, **token_version_bump()}
+    """
+    return {
+        "$inc": {"token_version": 1},
+        "$max": {"token_version_at": now or _now()},
+    }
+
+
+async def sync_revocations() -> int:
+    """
+    Trae los bumps hechos por otros workers desde la última sincronización.
+    En el primer sync mira toda la vida útil de un token (JWT_EXPIRE_MINUTES).
+    """
+    global _last_sync
+    db = get_db()
+    now = _now()
+    since = _last_sync or (now - timedelta(minutes=settings.jwt_expire_minutes))
+
+    n = 0
+    cursor = db.users.find(
+        {"token_version_at": {"$gt": since}},
+        {"token_version": 1, "token_version_at": 1},
+    )
+    async for doc in cursor:
+        note_token_version(doc["_id"], int(doc.get("token_version", 0) or 0))
+        n += 1
+
+    # Un bump más viejo que la vida de un token ya no protege nada
+    horizon = time.time() - settings.jwt_expire_minutes * 60
+    for key in [k for k, (_, at) in _min_versions.items() if at < horizon]:
+        _min_versions.pop(key, None)
+
+    # Pequeño solape para no perder escrituras concurrentes con el query
+    _last_sync = now - timedelta(seconds=2)
+    _stats["syncs"] += 1
+    _stats["last_sync_at"] = now
+    return n
+
+
+async def revocation_sync_loop() -> None:
+    interval = max(1.0, float(settings.token_revocation_sync_seconds))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sync_revocations()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Atlas caído momentáneamente: reintentamos en el próximo ciclo
+            pass
+
+
+def token_claims_stats() -> dict:
+    return {
+        "enabled": claims_enabled(),
+        "revoked_users": len(_min_versions),
+        **_stats,
+    }
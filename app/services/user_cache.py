@@ -0,0 +1,114 @@
+# app/services/user_cache.py
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.db.mongo import get_db
+
+# Cache LRU + TTL de documentos de usuario (por proceso).
+# - get_current_user lee de aquí en vez de ir a Atlas en cada request.
+# - Toda ruta que escribe un usuario debe llamar invalidate_user(oid).
+# - El TTL acota la staleness entre workers (cada uno tiene su cache).
+
+# Solo lo que usan get_current_user, /me y /auth/me (nunca password_hash)
+USER_PROJECTION = {
+    "email": 1,
+    "plan": 1,
+    "plan_expires_at": 1,
+    "status": 1,
+    "banned_until": 1,
+    "trial_used": 1,
+    "is_admin": 1,
+    "telegram_id": 1,
+    "telegram_username": 1,
+    "telegram_linked": 1,
+    "telegram_linked_at": 1,
+    "created_at": 1,
+    "token_version": 1,
+}
+
+_entries: "OrderedDict[ObjectId, tuple[float, dict]]" = OrderedDict()
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "expired": 0,
+    "evictions": 0,
+    "invalidations": 0,
+}
+
+
+def _enabled() -> bool:
+    return bool(settings.user_cache_enabled) and int(settings.user_cache_max_entries) > 0
+
+
+def _get(oid: ObjectId) -> dict | None:
+    entry = _entries.get(oid)
+    if entry is None:
+        _stats["misses"] += 1
+        return None
+
+    expires_at, user = entry
+    if expires_at <= time.monotonic():
+        _entries.pop(oid, None)
+        _stats["expired"] += 1
+        _stats["misses"] += 1
+        return None
+
+    _entries.move_to_end(oid)
+    _stats["hits"] += 1
+    return user
+
+
+def _put(oid: ObjectId, user: dict) -> None:
+    _entries[oid] = (time.monotonic() + float(settings.user_cache_ttl_seconds), user)
+    _entries.move_to_end(oid)
+
+    max_entries = int(settings.user_cache_max_entries)
+    while len(_entries) > max_entries:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+async def get_user(oid: ObjectId) -> dict | None:
+    """
+    Devuelve una COPIA del documento (los handlers mutan el dict, p.ej. /me).
+    """
+    if _enabled():
+        user = _get(oid)
+        if user is not None:
+            return dict(user)
+
+    db = get_db()
+    user = await db.users.find_one({"_id": oid}, USER_PROJECTION)
+    if user is None:
+        return None
+
+    if _enabled():
+        _put(oid, user)
+    return dict(user)
+
+
+def invalidate_user(oid: ObjectId) -> None:
+    if _entries.pop(oid, None) is not None:
+        _stats["invalidations"] += 1
+
+
+def clear_user_cache() -> None:
+    _entries.clear()
+
+
+def user_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "size": len(_entries),
+        "max_entries": int(settings.user_cache_max_entries),
+        "ttl_seconds": float(settings.user_cache_ttl_seconds),
+        "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else None,
+    }
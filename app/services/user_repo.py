@@ -0,0 +1,294 @@
+# app/services/user_repo.py
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from app.db.mongo import get_db
+from app.services.access_state import invalidate_telegram_id
+from app.services.entitlement_feed import entitled_plan, record_changes
+from app.services.outbox import enqueue, notify, run_in_transaction, user_event
+from app.services.token_claims import note_token_version, token_version_bump
+from app.services.user_cache import invalidate_user
+
+# Escrituras de usuarios en UN solo round trip (find_one_and_update / insert_one)
+# con las reglas en el filtro (no baneado, etc.) en vez de find_one + update_one.
+# Todas pasan por _after_write para invalidar caches y registrar token_version,
+# y anotan el acceso resultante en el feed del scanner (entitlement_feed).
+# Las escrituras de estado agregan su evento al outbox en la misma transacción
+# (run_in_transaction); caches/feed/notify van después del commit.
+
+# Lo mínimo que necesitan las rutas para responder
+STATE_PROJECTION = {
+    "plan": 1,
+    "plan_expires_at": 1,
+    "status": 1,
+    "banned_until": 1,
+    "token_version": 1,
+    "telegram_id": 1,
+}
+
+
+class UserNotFound(LookupError):
+    pass
+
+
+class UserBanned(Exception):
+    pass
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def not_banned_filter(now: datetime) -> dict:
+    # status != banned, o ban temporal ya vencido
+    return {"$or": [{"status": {"$ne": "banned"}}, {"banned_until": {"$lte": now}}]}
+
+
+def _after_write(doc: dict) -> None:
+    invalidate_user(doc["_id"])
+    invalidate_telegram_id(doc.get("telegram_id"))
+    if "token_version" in doc:
+        note_token_version(doc["_id"], int(doc.get("token_version") or 0))
+
+
+async def _record_access(docs: list[dict]) -> None:
+    now = _now()
+    await record_changes([
+        (doc["telegram_id"], entitled_plan(doc, now))
+        for doc in docs if doc.get("telegram_id") is not None
+    ])
+
+
+async def _raise_missing_or_banned(flt: dict) -> None:
+    # Solo en el camino de error: distinguimos 404 de 409 con un find_one liviano
+    exists = await get_db().users.find_one(flt, {"_id": 1})
+    if not exists:
+        raise UserNotFound()
+    raise UserBanned()
+
+
+async def insert_user(doc: dict) -> ObjectId:
+    # DuplicateKeyError (índice único de email) lo maneja quien llama
+    res = await get_db().users.insert_one(doc)
+    return res.inserted_id
+
+
+async def update_password_hash(oid: ObjectId, old_hash: str, new_hash: str) -> bool:
+    """
+    Rehash transparente (cambio de costo de bcrypt). El filtro por el hash viejo
+    evita pisar un cambio de password concurrente. No afecta caches ni el feed.
+    """
+    res = await get_db().users.update_one(
+        {"_id": oid, "password_hash": old_hash},
+        {"$set": {"password_hash": new_hash}},
+    )
+    return res.modified_count == 1
+
+
+async def set_plan(flt: dict, plan: str, expires_at: datetime) -> dict:
+    """
+    Activa plan (plus/premium) si el usuario NO está baneado.
+    Lanza UserNotFound / UserBanned.
+    """
+    now = _now()
+
+    async def write(session):
+        doc = await get_db().users.find_one_and_update(
+            {**flt, **not_banned_filter(now)},
+            {"$set": {"plan": plan, "plan_expires_at": expires_at, "status": "active"},
+             **token_version_bump(now)},
+            projection=STATE_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if doc is not None:
+            await enqueue([user_event("plan.activated", doc, now)], session=session)
+        return doc
+
+    doc = await run_in_transaction(write)
+    if doc is None:
+        await _raise_missing_or_banned(flt)
+
+    _after_write(doc)
+    notify()
+    await _record_access([doc])
+    return doc
+
+
+async def set_plan_many(items: list[tuple[dict, str]], expires_at: datetime) -> set[ObjectId]:
+    """
+    Versión bulk de set_plan para usuarios ya resueltos (con _id y token_version).
+    Un solo bulk_write sin orden; el filtro vuelve a excluir baneados por si
+    alguno fue baneado entre la resolución y la escritura.
+    Devuelve los _id que efectivamente se activaron (el resto = baneado entre medio).
+    """
+    if not items:
+        return set()
+
+    now = _now()
+    ops = [
+        UpdateOne(
+            {"_id": user["_id"], **not_banned_filter(now)},
+            {"$set": {"plan": plan, "plan_expires_at": expires_at, "status": "active"},
+             **token_version_bump(now)},
+        )
+        for user, plan in items
+    ]
+    # Último plan por usuario (si vino repetido gana la última fila)
+    plans = {user["_id"]: plan for user, plan in items}
+    users = {user["_id"]: user for user, _ in items}
+
+    async def write(session):
+        users_coll = get_db().users
+        res = await users_coll.bulk_write(ops, ordered=False, session=session)
+        if res.matched_count == len(ops):
+            applied = set(plans)
+        else:
+            # bulk_write no dice cuáles matchearon: releemos por el vencimiento
+            # que acabamos de escribir (dentro de la transacción)
+            applied = {
+                d["_id"] async for d in users_coll.find(
+                    {"_id": {"$in": list(plans)}, "plan_expires_at": expires_at}, {"_id": 1}, session=session,
+                )
+            }
+        # bulk_write no devuelve los docs: el evento sale de lo que escribimos
+        await enqueue([
+            user_event("plan.activated", {**users[oid], "plan": plan, "plan_expires_at": expires_at, "status": "active"}, now)
+            for oid, plan in plans.items() if oid in applied
+        ], session=session)
+        return applied
+
+    applied = await run_in_transaction(write)
+    if not applied:
+        return applied
+    notify()
+
+    # Un mismo usuario puede venir repetido en el lote: cada fila sumó un $inc
+    for oid, bumps in Counter(user["_id"] for user, _ in items if user["_id"] in applied).items():
+        _after_write({
+            "_id": oid,
+            "telegram_id": users[oid].get("telegram_id"),
+            "token_version": int(users[oid].get("token_version") or 0) + bumps,
+        })
+
+    await _record_access([
+        {"telegram_id": users[oid].get("telegram_id"), "plan": plan, "plan_expires_at": expires_at}
+        for oid, plan in plans.items() if oid in applied
+    ])
+    return applied
+
+
+async def ban_user(oid: ObjectId, banned_until: Optional[datetime], reason: Optional[str]) -> dict:
+    now = _now()
+
+    async def write(session):
+        doc = await get_db().users.find_one_and_update(
+            {"_id": oid},
+            {"$set": {
+                "status": "banned",
+                "banned_until": banned_until,
+                "ban_reason": reason,
+                "banned_at": now,
+            }, **token_version_bump(now)},
+            projection=STATE_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if doc is not None:
+            await enqueue([user_event(
+                "user.banned", doc, now, banned_until=banned_until.isoformat() if banned_until else None,
+            )], session=session)
+        return doc
+
+    doc = await run_in_transaction(write)
+    if doc is None:
+        raise UserNotFound()
+
+    _after_write(doc)
+    notify()
+    await _record_access([doc])
+    return doc
+
+
+async def unban_user(oid: ObjectId) -> dict:
+    """
+    status = active si el plan sigue vigente, si no inactive (pipeline update,
+    así no hace falta leer el plan antes).
+    """
+    now = _now()
+
+    async def write(session):
+        doc = await get_db().users.find_one_and_update(
+            {"_id": oid},
+            [
+                {"$set": {
+                    "status": {"$cond": [{"$gt": ["$plan_expires_at", now]}, "active", "inactive"]},
+                    "token_version": {"$add": [{"$ifNull": ["$token_version", 0]}, 1]},
+                    "token_version_at": now,
+                }},
+                {"$unset": ["banned_until", "ban_reason", "banned_at"]},
+            ],
+            projection=STATE_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if doc is not None:
+            await enqueue([user_event("user.unbanned", doc, now)], session=session)
+        return doc
+
+    doc = await run_in_transaction(write)
+    if doc is None:
+        raise UserNotFound()
+
+    _after_write(doc)
+    notify()
+    await _record_access([doc])
+    return doc
+
+
+async def link_telegram(oid: ObjectId, telegram_id: int, telegram_username: Optional[str]) -> None:
+    now = _now()
+
+    async def write(session):
+        # BEFORE: necesitamos el telegram_id anterior (si cambia, pierde el acceso)
+        before = await get_db().users.find_one_and_update(
+            {"_id": oid},
+            {"$set": {
+                "telegram_id": telegram_id,
+                "telegram_username": telegram_username,
+                "telegram_linked": True,
+                "telegram_linked_at": now,
+            }},
+            projection=STATE_PROJECTION,
+            session=session,
+        )
+        if before is not None:
+            old = before.get("telegram_id")
+            await enqueue([user_event(
+                "telegram.linked", {**before, "telegram_id": telegram_id}, now,
+                previous_telegram_id=old if old != telegram_id else None,
+                telegram_username=telegram_username,
+            )], session=session)
+        return before
+
+    before = await run_in_transaction(write)
+    _after_write({"_id": oid, "telegram_id": telegram_id})
+    if before is None:
+        return
+
+    notify()
+    old_tid = before.get("telegram_id")
+    invalidate_telegram_id(old_tid)
+
+    changes = []
+    if old_tid is not None and old_tid != telegram_id:
+        changes.append((old_tid, None))
+    changes.append((telegram_id, entitled_plan(before, now)))
+    await record_changes(changes)
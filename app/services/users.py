@@ -6,8 +6,9 @@ from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 
 from app.db.mongo import get_db
-from app.core.security import hash_password, verify_password
+from app.core.security import hash_password_async, verify_and_update_async
 from app.core.config import settings
+from app.services.user_repo import insert_user, update_password_hash
 
 
 def _now() -> datetime:
@@ -15,17 +16,30 @@ def _now() -> datetime:
 
 
 async def create_user(email: str, password: str, is_admin: bool = False) -> ObjectId:
-    db = get_db()
+    doc = await create_user_doc(email, password, is_admin=is_admin)
+    return doc["_id"]
+
+
+async def create_user_doc(
+    email: str,
+    password: str,
+    is_admin: bool = False,
+    plan: str | None = None,
+) -> dict:
+    """
+    Inserta el usuario ya completo (plan/trial incluidos) en un solo insert_one
+    y devuelve el documento insertado. `plan` solo aplica a admins (bootstrap).
+    """
     now = _now()
 
-    # Hash seguro (puede lanzar ValueError si >72 bytes)
-    password_hash = hash_password(password)
+    # Hash seguro en el pool de bcrypt (ValueError si >72 bytes, PasswordHasherBusy si saturado)
+    password_hash = await hash_password_async(password)
 
     # ✅ REGLA CHRONOS:
     # - Al registrarse: el usuario entra FREE automáticamente por 7 días (trial_days)
     # - Admin NO maneja free; solo plus/premium (eso va por endpoints admin)
     if is_admin:
-        plan = "free"
+        plan = plan or "free"
         plan_expires_at = None
         trial_used = False
         status = "active"
@@ -58,8 +72,8 @@ async def create_user(email: str, password: str, is_admin: bool = False) -> Obje
         "created_at": now,
     }
 
-    res = await db.users.insert_one(doc)
-    return res.inserted_id
+    doc["_id"] = await insert_user(doc)
+    return doc
 
 
 async def authenticate(email: str, password: str) -> dict | None:
@@ -67,8 +81,18 @@ async def authenticate(email: str, password: str) -> dict | None:
     user = await db.users.find_one({"email": email.strip().lower()})
     if not user:
         return None
-    if not verify_password(password, user.get("password_hash", "")):
+    old_hash = user.get("password_hash", "")
+    ok, new_hash = await verify_and_update_async(password, old_hash)
+    if not ok:
         return None
+
+    # Costo de bcrypt cambió (BCRYPT_ROUNDS / calibración): migramos sin reset.
+    # Best-effort: si falla, se reintenta en el próximo login.
+    if new_hash:
+        try:
+            await update_password_hash(user["_id"], old_hash, new_hash)
+        except Exception:
+            pass
     return user
 
 # --- Backward-compat alias (some deployments import authenticate_user) ---
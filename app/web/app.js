@@ -4,6 +4,7 @@ const $ = (sel) => document.querySelector(sel);
 const state = {
   route: "dashboard",
   token: localStorage.getItem("chronos_token") || "",
+  refresh: localStorage.getItem("chronos_refresh") || "",
   me: null,
 };
 
@@ -44,10 +45,41 @@ function openSidebar(open) {
   sb.classList.toggle("open", !!open);
 }
 
-async function api(path, { method="GET", body=null, auth=true } = {}) {
+function saveTokens(data) {
+  state.token = data.access_token || data.token || "";
+  localStorage.setItem("chronos_token", state.token);
+  // refresh_token solo llega si el backend tiene REFRESH_TOKENS_ENABLED
+  state.refresh = data.refresh_token || "";
+  if (state.refresh) localStorage.setItem("chronos_refresh", state.refresh);
+  else localStorage.removeItem("chronos_refresh");
+}
+
+// Un solo /auth/refresh a la vez: el refresh rota y reusar el viejo revoca la sesión
+let refreshing = null;
+function refreshTokens() {
+  if (!refreshing) {
+    refreshing = (async () => {
+      const res = await fetch("/auth/refresh", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh_token: state.refresh }),
+      });
+      if (!res.ok) return false;
+      saveTokens(await res.json());
+      return true;
+    })().catch(() => false).finally(() => { refreshing = null; });
+  }
+  return refreshing;
+}
+
+async function api(path, { method="GET", body=null, auth=true, retry=true } = {}) {
   const headers = { "Content-Type": "application/json" };
   if (auth && state.token) headers["Authorization"] = `Bearer ${state.token}`;
   const res = await fetch(path, { method, headers, body: body ? JSON.stringify(body) : null });
+  // Access token vencido: renovamos una vez y repetimos
+  if (res.status === 401 && auth && retry && state.refresh && await refreshTokens()) {
+    return api(path, { method, body, auth, retry: false });
+  }
   const txt = await res.text();
   let data = null;
   try { data = txt ? JSON.parse(txt) : null; } catch { data = { raw: txt }; }
@@ -141,10 +173,8 @@ async function doLogin() {
 
   try {
     const data = await api("/auth/login", { method:"POST", auth:false, body:{ email, password }});
-    const token = data.access_token || data.token || "";
-    if (!token) throw new Error("No llegó access_token.");
-    state.token = token;
-    localStorage.setItem("chronos_token", token);
+    if (!(data.access_token || data.token)) throw new Error("No llegó access_token.");
+    saveTokens(data);
     setAuthMsg("OK. Sesión iniciada.");
     await loadMe();
     showView("dashboard");
@@ -154,8 +184,18 @@ async function doLogin() {
 }
 
 function logout(silent=false) {
+  // Revoca la sesión en el backend (best effort, sin esperar)
+  if (state.refresh) {
+    fetch("/auth/logout", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ refresh_token: state.refresh }),
+    }).catch(() => {});
+  }
   state.token = "";
+  state.refresh = "";
   localStorage.removeItem("chronos_token");
+  localStorage.removeItem("chronos_refresh");
   setMe(null);
   if (!silent) setAuthMsg("Sesión cerrada.");
 }
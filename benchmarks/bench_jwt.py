@@ -0,0 +1,72 @@
+"""
+Micro-benchmark de decode_token (costo por request del auth dependency).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_jwt [--iterations 20000] [--json]
+
+Compara jose vs backend "native", con y sin cache de tokens decodificados.
+No necesita Mongo: solo usa app.core.security.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("JWT_SECRET", "bench-secret-" + "x" * 32)
+
+from app.core.config import settings  # noqa: E402
+from app.core import security  # noqa: E402
+
+CLAIMS = {"p": "premium", "x": 1893456000, "s": "active", "b": None, "a": 0, "v": 3}
+
+
+def _bench(backend: str, cache_entries: int, iterations: int) -> dict:
+    settings.jwt_backend = backend
+    settings.token_cache_max_entries = cache_entries
+    security.clear_token_cache()
+
+    token = security.create_access_token("65f0c0ffee0123456789abcd", claims=CLAIMS)
+    security.decode_token(token)  # warm-up (y llena la cache si aplica)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        security.decode_token(token)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "cache": cache_entries > 0,
+        "iterations": iterations,
+        "us_per_decode": round(elapsed * 1e6 / iterations, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--json", action="store_true", help="salida JSON (para CI)")
+    args = parser.parse_args()
+
+    results = [
+        _bench(backend, cache, args.iterations)
+        for backend in ("jose", "native")
+        for cache in (0, 10000)
+    ]
+    baseline = results[0]["us_per_decode"]
+    for r in results:
+        r["speedup_vs_jose_uncached"] = round(baseline / r["us_per_decode"], 1) if r["us_per_decode"] else None
+
+    if args.json:
+        print(json.dumps({"benchmark": "jwt_decode", "results": results}, indent=2))
+        return
+
+    print(f"{'backend':<8} {'cache':<6} {'us/decode':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['backend']:<8} {str(r['cache']):<6} {r['us_per_decode']:>10} {r['speedup_vs_jose_uncached']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
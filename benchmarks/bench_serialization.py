@@ -0,0 +1,125 @@
+"""
+Micro-benchmark de serialización de GET /me (costo por request, sin red ni Mongo).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_serialization [--iterations 20000] [--json]
+
+Compara:
+- before: documento completo de Mongo + normalización manual de fechas +
+  jsonable_encoder + JSONResponse (lo que hacía /me antes)
+- after:  documento proyectado (USER_PROJECTION) + MeOut (pydantic-core) +
+  respuesta por defecto de la app (ORJSONResponse si orjson está instalado)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("JWT_SECRET", "bench-secret-" + "x" * 32)
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.api.routes.users import compute_account_state  # noqa: E402
+from app.main import DefaultJSONResponse  # noqa: E402
+from app.schemas.user import MeOut  # noqa: E402
+from app.services.user_cache import USER_PROJECTION  # noqa: E402
+
+
+def _full_doc() -> dict:
+    # Como lo devuelve Motor: fechas naive (UTC) y campos internos
+    now = datetime.utcnow().replace(microsecond=123000)
+    return {
+        "_id": ObjectId(),
+        "email": "someone@example.com",
+        "password_hash": "$2b$12$" + "x" * 53,
+        "plan": "premium",
+        "plan_expires_at": now + timedelta(days=20),
+        "status": "active",
+        "trial_used": True,
+        "is_admin": False,
+        "telegram_id": 123456789,
+        "telegram_username": "someone",
+        "telegram_linked": True,
+        "telegram_linked_at": now - timedelta(days=3),
+        "created_at": now - timedelta(days=40),
+        "token_version": 4,
+        "token_version_at": now - timedelta(days=1),
+    }
+
+
+def _before(doc: dict) -> bytes:
+    user = dict(doc)
+    user["_id"] = str(user["_id"])
+    user.pop("password_hash", None)
+    for key in ("plan_expires_at", "banned_until", "created_at", "banned_at", "telegram_linked_at"):
+        val = user.get(key)
+        if isinstance(val, datetime) and val.tzinfo is None:
+            user[key] = val.replace(tzinfo=timezone.utc)
+    content = jsonable_encoder({**user, "account_state": compute_account_state(user)})
+    return JSONResponse(content).body
+
+
+_ME_ADAPTER = TypeAdapter(MeOut)
+
+
+def _after(doc: dict) -> bytes:
+    # Lo mismo que hace FastAPI con response_model: validar + serializar en modo json
+    model = _ME_ADAPTER.validate_python({**doc, "account_state": compute_account_state(doc)})
+    content = _ME_ADAPTER.dump_python(model, mode="json", by_alias=True)
+    return DefaultJSONResponse(content).body
+
+
+def _bench(name: str, fn, doc: dict, iterations: int) -> dict:
+    body = fn(doc)  # warm-up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(doc)
+    elapsed = time.perf_counter() - started
+    return {
+        "variant": name,
+        "iterations": iterations,
+        "us_per_request": round(elapsed * 1e6 / iterations, 3),
+        "response_bytes": len(body),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--json", action="store_true", help="salida JSON (para CI)")
+    args = parser.parse_args()
+
+    full = _full_doc()
+    projected = {k: v for k, v in full.items() if k == "_id" or k in USER_PROJECTION}
+
+    results = [
+        _bench("before", _before, full, args.iterations),
+        _bench("after", _after, projected, args.iterations),
+    ]
+    baseline = results[0]["us_per_request"]
+    for r in results:
+        r["speedup_vs_before"] = round(baseline / r["us_per_request"], 2) if r["us_per_request"] else None
+
+    if args.json:
+        print(json.dumps({
+            "benchmark": "me_serialization",
+            "response_class": DefaultJSONResponse.__name__,
+            "results": results,
+        }, indent=2))
+        return
+
+    print(f"response class: {DefaultJSONResponse.__name__}")
+    print(f"{'variant':<8} {'us/request':>11} {'bytes':>6} {'speedup':>8}")
+    for r in results:
+        print(f"{r['variant']:<8} {r['us_per_request']:>11} {r['response_bytes']:>6} {r['speedup_vs_before']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,763 @@
+"""
+Stand-in en memoria compatible (subset) con Motor para benchmarks locales.
+
+Implementa solo lo que usa la API de Chronos: find/find_one, insert, update
+(incluyendo pipelines simples), find_one_and_update, bulk_write, índices únicos,
+sesiones/transacciones no-op y `command("ping")`. Cada operación puede sumar
+una latencia artificial (`latency_ms`) para imitar el round trip a Atlas.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import random
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult,
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+_MISSING = object()
+
+
+# -----------------------
+# Helpers de valores
+# -----------------------
+def _norm(value: Any) -> Any:
+    # Motor (tz_aware=False) devuelve datetimes naive en UTC
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None, microsecond=(value.microsecond // 1000) * 1000)
+    if isinstance(value, datetime):
+        return value.replace(microsecond=(value.microsecond // 1000) * 1000)
+    if isinstance(value, dict):
+        return {k: _norm(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_norm(v) for v in value]
+    return value
+
+
+def _get(doc: dict, path: str) -> Any:
+    cur: Any = doc
+    for part in path.split("."):
+        if isinstance(cur, dict) and part in cur:
+            cur = cur[part]
+        else:
+            return _MISSING
+    return cur
+
+
+def _set(doc: dict, path: str, value: Any) -> None:
+    parts = path.split(".")
+    cur = doc
+    for part in parts[:-1]:
+        nxt = cur.get(part)
+        if not isinstance(nxt, dict):
+            nxt = {}
+            cur[part] = nxt
+        cur = nxt
+    cur[parts[-1]] = value
+
+
+def _unset(doc: dict, path: str) -> None:
+    parts = path.split(".")
+    cur = doc
+    for part in parts[:-1]:
+        cur = cur.get(part)
+        if not isinstance(cur, dict):
+            return
+    cur.pop(parts[-1], None)
+
+
+def _type_rank(v: Any) -> int:
+    if v is None or v is _MISSING:
+        return 0
+    if isinstance(v, bool):
+        return 5
+    if isinstance(v, (int, float)):
+        return 1
+    if isinstance(v, str):
+        return 2
+    if isinstance(v, ObjectId):
+        return 4
+    if isinstance(v, datetime):
+        return 6
+    return 3
+
+
+def _cmp(a: Any, b: Any) -> int | None:
+    """Comparación tipo Mongo; None si los tipos no son comparables."""
+    a, b = _norm(a), _norm(b)
+    if _type_rank(a) != _type_rank(b):
+        return None
+    if a is _MISSING or a is None:
+        return 0
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        return None
+
+
+def _sort_key(value: Any):
+    value = _norm(value)
+    rank = _type_rank(value)
+    if value is _MISSING or value is None:
+        return (rank, 0)
+    if isinstance(value, ObjectId):
+        return (rank, value.binary)
+    return (rank, value)
+
+
+# -----------------------
+# Matching de filtros
+# -----------------------
+def _eq(field_val: Any, target: Any) -> bool:
+    target = _norm(target)
+    if target is None:
+        return field_val is _MISSING or field_val is None
+    if isinstance(field_val, list) and not isinstance(target, list):
+        return any(_norm(v) == target for v in field_val)
+    return field_val is not _MISSING and _norm(field_val) == target
+
+
+def _match_op(field_val: Any, op: str, arg: Any) -> bool:
+    if op == "$eq":
+        return _eq(field_val, arg)
+    if op == "$ne":
+        return not _eq(field_val, arg)
+    if op == "$in":
+        return any(_eq(field_val, a) for a in arg)
+    if op == "$nin":
+        return not any(_eq(field_val, a) for a in arg)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        if field_val is _MISSING:
+            return False
+        c = _cmp(field_val, arg)
+        if c is None:
+            return False
+        return {"$gt": c > 0, "$gte": c >= 0, "$lt": c < 0, "$lte": c <= 0}[op]
+    if op == "$exists":
+        return (field_val is not _MISSING) == bool(arg)
+    if op == "$type":
+        names = arg if isinstance(arg, list) else [arg]
+        for name in names:
+            if name == "date" and isinstance(field_val, datetime):
+                return True
+            if name == "null" and field_val is None:
+                return True
+            if name in ("long", "int", "number") and isinstance(field_val, int) and not isinstance(field_val, bool):
+                return True
+            if name == "string" and isinstance(field_val, str):
+                return True
+        return False
+    if op == "$regex":
+        return isinstance(field_val, str) and re.search(arg, field_val) is not None
+    if op == "$not":
+        return not _match_value(field_val, arg)
+    raise OperationFailure(f"fake_mongo: unsupported operator {op}")
+
+
+def _match_value(field_val: Any, cond: Any) -> bool:
+    if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        return all(_match_op(field_val, op, arg) for op, arg in cond.items())
+    return _eq(field_val, cond)
+
+
+def match(doc: dict, flt: dict | None) -> bool:
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$or":
+            if not any(match(doc, sub) for sub in cond):
+                return False
+        elif key == "$and":
+            if not all(match(doc, sub) for sub in cond):
+                return False
+        elif key == "$nor":
+            if any(match(doc, sub) for sub in cond):
+                return False
+        elif not _match_value(_get(doc, key), cond):
+            return False
+    return True
+
+
+# -----------------------
+# Updates
+# -----------------------
+def _eval_expr(doc: dict, expr: Any, now: datetime) -> Any:
+    if isinstance(expr, str):
+        if expr == "$$NOW":
+            return now
+        if expr.startswith("$"):
+            v = _get(doc, expr[1:])
+            return None if v is _MISSING else v
+        return expr
+    if isinstance(expr, list):
+        return [_eval_expr(doc, e, now) for e in expr]
+    if isinstance(expr, dict):
+        if len(expr) == 1:
+            (op, args), = expr.items()
+            if op.startswith("$"):
+                if op == "$literal":
+                    return args
+                vals = [_eval_expr(doc, a, now) for a in (args if isinstance(args, list) else [args])]
+                if op == "$cond":
+                    if isinstance(args, dict):
+                        c = _eval_expr(doc, args["if"], now)
+                        return _eval_expr(doc, args["then"] if c else args["else"], now)
+                    return vals[1] if vals[0] else vals[2]
+                if op == "$ifNull":
+                    return next((v for v in vals if v is not None), vals[-1])
+                if op == "$add":
+                    total = 0
+                    for v in vals:
+                        total = total + (v or 0)
+                    return total
+                if op in ("$gt", "$gte", "$lt", "$lte", "$eq", "$ne"):
+                    c = _cmp(vals[0], vals[1])
+                    if op == "$eq":
+                        return c == 0
+                    if op == "$ne":
+                        return c != 0
+                    if c is None:
+                        # Mongo ordena por tipo: null < números < ... < fechas
+                        c = (_type_rank(_norm(vals[0])) > _type_rank(_norm(vals[1]))) - (
+                            _type_rank(_norm(vals[0])) < _type_rank(_norm(vals[1]))
+                        )
+                    return {"$gt": c > 0, "$gte": c >= 0, "$lt": c < 0, "$lte": c <= 0}[op]
+                if op == "$and":
+                    return all(vals)
+                if op == "$or":
+                    return any(vals)
+                raise OperationFailure(f"fake_mongo: unsupported expression {op}")
+        return {k: _eval_expr(doc, v, now) for k, v in expr.items()}
+    return expr
+
+
+def apply_update(doc: dict, update: Any, *, inserting: bool = False) -> dict:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if isinstance(update, list):
+        for stage in update:
+            for op, spec in stage.items():
+                if op in ("$set", "$addFields"):
+                    values = {k: _eval_expr(doc, v, now) for k, v in spec.items()}
+                    for k, v in values.items():
+                        _set(doc, k, _norm(v))
+                elif op in ("$unset", "$project") and op == "$unset":
+                    for k in ([spec] if isinstance(spec, str) else spec):
+                        _unset(doc, k)
+                else:
+                    raise OperationFailure(f"fake_mongo: unsupported pipeline stage {op}")
+        return doc
+
+    for op, spec in update.items():
+        if op == "$set":
+            for k, v in spec.items():
+                _set(doc, k, _norm(copy.deepcopy(v)))
+        elif op == "$setOnInsert":
+            if inserting:
+                for k, v in spec.items():
+                    _set(doc, k, _norm(copy.deepcopy(v)))
+        elif op == "$unset":
+            for k in spec:
+                _unset(doc, k)
+        elif op == "$inc":
+            for k, v in spec.items():
+                cur = _get(doc, k)
+                _set(doc, k, (0 if cur is _MISSING or cur is None else cur) + v)
+        elif op == "$max":
+            for k, v in spec.items():
+                cur = _get(doc, k)
+                if cur is _MISSING or (_cmp(v, cur) or 0) > 0:
+                    _set(doc, k, _norm(v))
+        elif op == "$min":
+            for k, v in spec.items():
+                cur = _get(doc, k)
+                if cur is _MISSING or (_cmp(v, cur) or 0) < 0:
+                    _set(doc, k, _norm(v))
+        elif op == "$push":
+            for k, v in spec.items():
+                cur = _get(doc, k)
+                lst = list(cur) if isinstance(cur, list) else []
+                if isinstance(v, dict) and "$each" in v:
+                    lst.extend(_norm(copy.deepcopy(v["$each"])))
+                else:
+                    lst.append(_norm(copy.deepcopy(v)))
+                _set(doc, k, lst)
+        elif op == "$pull":
+            for k, v in spec.items():
+                cur = _get(doc, k)
+                if isinstance(cur, list):
+                    _set(doc, k, [x for x in cur if not _match_value(x, v)])
+        elif op == "$currentDate":
+            for k in spec:
+                _set(doc, k, now)
+        else:
+            raise OperationFailure(f"fake_mongo: unsupported update operator {op}")
+    return doc
+
+
+def project(doc: dict, projection: Any) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {k: 1 for k in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        # Se copia solo lo proyectado
+        out: dict = {}
+        if projection.get("_id", 1):
+            out["_id"] = doc.get("_id")
+        for k in include:
+            v = _get(doc, k)
+            if v is not _MISSING:
+                _set(out, k, v)
+        return copy.deepcopy(out)
+    doc = copy.deepcopy(doc)
+    for k, v in projection.items():
+        if not v:
+            _unset(doc, k)
+    return doc
+
+
+# -----------------------
+# Cursor
+# -----------------------
+class FakeCursor:
+    def __init__(self, coll: "FakeCollection", flt: dict | None, projection: Any = None):
+        self._coll = coll
+        self._filter = flt or {}
+        self._projection = projection
+        self._sort: list[tuple[str, int]] = []
+        self._limit = 0
+        self._skip = 0
+        self._batch_size = 101
+        self._buffer: list[dict] | None = None
+        self._pos = 0
+
+    def sort(self, key_or_list, direction: int | None = None) -> "FakeCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction or 1)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def limit(self, n: int) -> "FakeCursor":
+        self._limit = int(n)
+        return self
+
+    def skip(self, n: int) -> "FakeCursor":
+        self._skip = int(n)
+        return self
+
+    def batch_size(self, n: int) -> "FakeCursor":
+        self._batch_size = max(1, int(n))
+        return self
+
+    def _materialize(self) -> list[dict]:
+        docs = [d for d in self._coll._candidates(self._filter) if match(d, self._filter)]
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda d, k=key: _sort_key(_get(d, k)), reverse=direction < 0)
+        if self._skip:
+            docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[: self._limit]
+        return [project(d, self._projection) for d in docs]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._buffer is None:
+            await self._coll._db._client._tick()
+            self._buffer = self._materialize()
+        if self._pos >= len(self._buffer):
+            raise StopAsyncIteration
+        # cada batch_size docs simulamos un getMore
+        if self._pos and self._pos % self._batch_size == 0:
+            await self._coll._db._client._tick()
+        doc = self._buffer[self._pos]
+        self._pos += 1
+        return doc
+
+    async def to_list(self, length: int | None = None) -> list[dict]:
+        out = []
+        async for doc in self:
+            out.append(doc)
+            if length and len(out) >= length:
+                break
+        return out
+
+
+# -----------------------
+# Collection / Database / Client
+# -----------------------
+class FakeCollection:
+    def __init__(self, db: "FakeDatabase", name: str):
+        self._db = db
+        self.name = name
+        self._docs: "OrderedDict[Any, dict]" = OrderedDict()
+        self._indexes: dict[str, dict] = {"_id_": {"name": "_id_", "key": {"_id": 1}}}
+
+    async def _tick(self) -> None:
+        await self._db._client._tick()
+
+    def _candidates(self, flt: dict | None) -> list[dict]:
+        # Atajo tipo índice para filtros por _id (el resto es scan completo)
+        target = (flt or {}).get("_id", _MISSING)
+        if target is _MISSING:
+            return list(self._docs.values())
+        if isinstance(target, dict):
+            if set(target) != {"$in"}:
+                return list(self._docs.values())
+            keys = target["$in"]
+        else:
+            keys = [target]
+        return [self._docs[k] for k in keys if k in self._docs]
+
+    # --- índices ---
+    @staticmethod
+    def _index_name(keys) -> str:
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        return "_".join(f"{k}_{d}" for k, d in keys)
+
+    def _add_index(self, keys, **kwargs) -> str:
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        name = kwargs.pop("name", None) or self._index_name(keys)
+        spec = {"name": name, "key": dict(keys)}
+        spec.update({k: v for k, v in kwargs.items() if k != "background"})
+        self._indexes[name] = spec
+        return name
+
+    async def create_index(self, keys, **kwargs) -> str:
+        await self._tick()
+        return self._add_index(keys, **kwargs)
+
+    async def create_indexes(self, models) -> list[str]:
+        await self._tick()
+        names = []
+        for m in models:
+            doc = dict(m.document)
+            keys = list(doc.pop("key").items())
+            names.append(self._add_index(keys, **doc))
+        return names
+
+    def list_indexes(self) -> FakeCursor:
+        idx_coll = FakeCollection(self._db, f"{self.name}.$indexes")
+        for spec in self._indexes.values():
+            idx_coll._docs[spec["name"]] = copy.deepcopy(spec)
+        return FakeCursor(idx_coll, {})
+
+    async def index_information(self) -> dict:
+        await self._tick()
+        return {n: {"key": list(s["key"].items())} for n, s in self._indexes.items()}
+
+    def _check_unique(self, doc: dict, exclude_id: Any = _MISSING) -> None:
+        for spec in self._indexes.values():
+            if not spec.get("unique"):
+                continue
+            keys = list(spec["key"])
+            vals = tuple(_norm(_get(doc, k)) for k in keys)
+            if spec.get("sparse") and all(v is _MISSING for v in vals):
+                continue
+            pfe = spec.get("partialFilterExpression")
+            if pfe and not match(doc, pfe):
+                continue
+            # Los docs guardados ya están normalizados (_insert/_update_doc)
+            if len(keys) == 1 and "." not in keys[0] and not pfe:
+                key, val = keys[0], vals[0]
+                clash = any(
+                    other.get(key, _MISSING) == val and other_id != exclude_id
+                    for other_id, other in self._docs.items()
+                )
+            else:
+                clash = any(
+                    other_id != exclude_id
+                    and not (pfe and not match(other, pfe))
+                    and tuple(_get(other, k) for k in keys) == vals
+                    for other_id, other in self._docs.items()
+                )
+            if clash:
+                raise DuplicateKeyError(f"E11000 duplicate key error index: {spec['name']}", 11000)
+
+    # --- lecturas ---
+    def find(self, filter: dict | None = None, projection: Any = None, **kwargs) -> FakeCursor:
+        cur = FakeCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cur.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cur.limit(kwargs["limit"])
+        if kwargs.get("batch_size"):
+            cur.batch_size(kwargs["batch_size"])
+        return cur
+
+    async def find_one(self, filter: Any = None, projection: Any = None, **kwargs) -> dict | None:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        docs = await self.find(filter, projection, sort=kwargs.get("sort"), limit=1).to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        await self._tick()
+        return sum(1 for d in self._docs.values() if match(d, filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        await self._tick()
+        return len(self._docs)
+
+    # --- escrituras ---
+    def _insert(self, doc: dict) -> Any:
+        doc = _norm(copy.deepcopy(doc))
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError("E11000 duplicate key error index: _id_", 11000)
+        self._check_unique(doc)
+        self._docs[doc["_id"]] = doc
+        return doc["_id"]
+
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        await self._tick()
+        document.setdefault("_id", ObjectId())
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        await self._tick()
+        ids, errors = [], []
+        for i, d in enumerate(documents):
+            d.setdefault("_id", ObjectId())
+            try:
+                ids.append(self._insert(d))
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(ids)})
+        return InsertManyResult(ids, True)
+
+    def _update_doc(self, doc_id: Any, update: Any, inserting: bool = False) -> bool:
+        original = self._docs[doc_id]
+        new = apply_update(copy.deepcopy(original), update, inserting=inserting)
+        if new.get("_id") != doc_id:
+            raise OperationFailure("fake_mongo: _id is immutable")
+        self._check_unique(new, exclude_id=doc_id)
+        self._docs[doc_id] = new
+        return new != original
+
+    def _upsert_doc(self, filter: dict, update: Any) -> Any:
+        seed = {k: v for k, v in (filter or {}).items() if not k.startswith("$") and not isinstance(v, dict)}
+        seed = apply_update(_norm(copy.deepcopy(seed)), update, inserting=True)
+        return self._insert(seed)
+
+    async def update_one(self, filter: dict, update: Any, upsert: bool = False, **kwargs) -> UpdateResult:
+        await self._tick()
+        for doc in self._candidates(filter):
+            if match(doc, filter):
+                modified = self._update_doc(doc["_id"], update)
+                return UpdateResult({"n": 1, "nModified": int(modified)}, True)
+        if upsert:
+            new_id = self._upsert_doc(filter, update)
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": new_id}, True)
+        return UpdateResult({"n": 0, "nModified": 0}, True)
+
+    async def update_many(self, filter: dict, update: Any, upsert: bool = False, **kwargs) -> UpdateResult:
+        await self._tick()
+        ids = [d["_id"] for d in self._candidates(filter) if match(d, filter)]
+        modified = sum(1 for i in ids if self._update_doc(i, update))
+        return UpdateResult({"n": len(ids), "nModified": modified}, True)
+
+    async def find_one_and_update(
+        self,
+        filter: dict,
+        update: Any,
+        projection: Any = None,
+        sort: Any = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        **kwargs,
+    ) -> dict | None:
+        await self._tick()
+        cur = FakeCursor(self, filter)
+        if sort:
+            cur.sort(sort)
+        docs = cur._materialize()
+        if not docs:
+            if not upsert:
+                return None
+            new_id = self._upsert_doc(filter, update)
+            return project(self._docs[new_id], projection) if return_document == ReturnDocument.AFTER else None
+        doc_id = docs[0]["_id"]
+        before = copy.deepcopy(self._docs[doc_id])
+        self._update_doc(doc_id, update)
+        out = self._docs[doc_id] if return_document == ReturnDocument.AFTER else before
+        return project(out, projection)
+
+    async def find_one_and_delete(self, filter: dict, projection: Any = None, **kwargs) -> dict | None:
+        await self._tick()
+        for doc_id, doc in self._docs.items():
+            if match(doc, filter):
+                del self._docs[doc_id]
+                return project(doc, projection)
+        return None
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        await self._tick()
+        for doc in self._candidates(filter):
+            if match(doc, filter):
+                del self._docs[doc["_id"]]
+                return DeleteResult({"n": 1}, True)
+        return DeleteResult({"n": 0}, True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        await self._tick()
+        ids = [d["_id"] for d in self._candidates(filter) if match(d, filter)]
+        for i in ids:
+            del self._docs[i]
+        return DeleteResult({"n": len(ids)}, True)
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        await self._tick()
+        n_matched = n_modified = n_inserted = n_upserted = 0
+        errors = []
+        for i, req in enumerate(requests):
+            kind = type(req).__name__
+            doc = req._doc if hasattr(req, "_doc") else None
+            try:
+                if kind == "InsertOne":
+                    self._insert(doc)
+                    n_inserted += 1
+                elif kind in ("UpdateOne", "UpdateMany"):
+                    ids = [d_id for d_id, d in self._docs.items() if match(d, req._filter)]
+                    if kind == "UpdateOne":
+                        ids = ids[:1]
+                    if not ids and req._upsert:
+                        self._upsert_doc(req._filter, req._doc)
+                        n_upserted += 1
+                    n_matched += len(ids)
+                    n_modified += sum(1 for d_id in ids if self._update_doc(d_id, req._doc))
+                elif kind in ("DeleteOne", "DeleteMany"):
+                    ids = [d_id for d_id, d in self._docs.items() if match(d, req._filter)]
+                    for d_id in ids[:1] if kind == "DeleteOne" else ids:
+                        del self._docs[d_id]
+                else:
+                    raise OperationFailure(f"fake_mongo: unsupported bulk op {kind}")
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        raw = {
+            "nInserted": n_inserted,
+            "nMatched": n_matched,
+            "nModified": n_modified,
+            "nUpserted": n_upserted,
+            "nRemoved": 0,
+            "upserted": [],
+            "writeErrors": errors,
+        }
+        if errors:
+            raise BulkWriteError(raw)
+        return BulkWriteResult(raw, True)
+
+    async def aggregate_count_by(self, field: str) -> dict:  # pragma: no cover - helper de debug
+        out: dict = {}
+        for d in self._docs.values():
+            out[_get(d, field)] = out.get(_get(d, field), 0) + 1
+        return out
+
+
+class FakeDatabase:
+    def __init__(self, client: "FakeMotorClient", name: str):
+        self._client = client
+        self.name = name
+        self._collections: dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, cmd: Any, *args, **kwargs) -> dict:
+        await self._client._tick()
+        name = cmd if isinstance(cmd, str) else next(iter(cmd))
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"fake_mongo: unsupported command {name}")
+
+
+class FakeSession:
+    def __init__(self, client: "FakeMotorClient"):
+        self.client = client
+        self.in_transaction = False
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.in_transaction = False
+
+    def start_transaction(self, *args, **kwargs) -> "FakeSession":
+        self.in_transaction = True
+        return self
+
+    async def with_transaction(self, callback, *args, **kwargs):
+        self.in_transaction = True
+        try:
+            return await callback(self)
+        finally:
+            self.in_transaction = False
+
+    async def end_session(self) -> None:
+        return None
+
+
+class FakeMotorClient:
+    """
+    Cliente en memoria. `latency_ms` (+ `jitter_ms`) se suma en cada round trip.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.round_trips = 0
+        self._dbs: dict[str, FakeDatabase] = {}
+
+    async def _tick(self) -> None:
+        self.round_trips += 1
+        delay = self.latency_ms
+        if self.jitter_ms:
+            delay += random.uniform(0, self.jitter_ms)
+        await asyncio.sleep(delay / 1000.0 if delay > 0 else 0)
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        if name not in self._dbs:
+            self._dbs[name] = FakeDatabase(self, name)
+        return self._dbs[name]
+
+    def get_database(self, name: str) -> FakeDatabase:
+        return self[name]
+
+    async def start_session(self, **kwargs) -> FakeSession:
+        return FakeSession(self)
+
+    @property
+    def admin(self) -> FakeDatabase:
+        return self["admin"]
+
+    def close(self) -> None:
+        return None
@@ -0,0 +1,276 @@
+"""
+Prueba de carga local: levanta app.main:app contra un Mongo en memoria
+(benchmarks/fake_mongo.py, con latencia inyectable para imitar Atlas) y manda
+tráfico concurrente con httpx (ASGITransport, sin sockets).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.load [--requests 2000] [--concurrency 32]
+        [--latency-ms 2 --jitter-ms 1] [--scenarios me,login,...]
+        [--json] [--out results.json]
+        [--baseline results.json --max-regression 0.2]
+
+Escenarios: login, me, link_code, link, admin_lookup, admin_activate, admin_list.
+Reporta throughput y p50/p95/p99 por escenario. Con --baseline compara contra
+una corrida anterior y sale con código 1 si algún escenario empeora más de
+--max-regression (p95 o throughput), para cortarlo antes del deploy.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("JWT_SECRET", "bench-secret-" + "x" * 32)
+os.environ.setdefault("TELEGRAM_LINK_SECRET", "bench-tg-secret")
+os.environ.setdefault("INTERNAL_API_KEY", "bench-internal-key")
+# El rate limit de login cortaría el escenario "login" (todo sale de una IP)
+os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "false")
+# Sin tareas de fondo compitiendo por el loop durante la medición
+os.environ.setdefault("EXPIRY_SWEEP_ENABLED", "false")
+os.environ.setdefault("MONGODB_WARMUP", "false")
+
+import httpx  # noqa: E402
+
+from benchmarks.fake_mongo import FakeMotorClient  # noqa: E402
+import app.db.mongo as mongo  # noqa: E402
+
+SCENARIOS = ("login", "me", "link_code", "link", "admin_lookup", "admin_activate", "admin_list")
+PASSWORD = "bench-password-1"
+ADMIN_EMAIL = "bench-admin@example.com"
+
+
+# -----------------------
+# Setup
+# -----------------------
+async def _seed(db, n_users: int) -> dict:
+    from app.core.security import hash_password
+    from app.services.token_claims import issue_access_token
+
+    # Un solo bcrypt para todos (sembrar N hashes tardaría minutos)
+    password_hash = hash_password(PASSWORD)
+    now = datetime.now(timezone.utc)
+
+    def user_doc(i: int, is_admin: bool = False) -> dict:
+        return {
+            "email": ADMIN_EMAIL if is_admin else f"bench{i}@example.com",
+            "password_hash": password_hash,
+            "plan": "premium",
+            "plan_expires_at": now + timedelta(days=30),
+            "status": "active",
+            "trial_used": True,
+            "is_admin": is_admin,
+            "telegram_id": None,
+            "telegram_username": None,
+            "telegram_linked": False,
+            "created_at": now,
+        }
+
+    docs = [user_doc(i) for i in range(n_users)]
+    await db.users.insert_many(docs)
+    admin = user_doc(0, is_admin=True)
+    await db.users.insert_one(admin)
+
+    return {
+        "users": docs,
+        "tokens": [issue_access_token(d) for d in docs],
+        "admin_token": issue_access_token(admin),
+    }
+
+
+async def _link_codes(users: list[dict], n: int) -> list[str]:
+    from app.services.telegram_link import create_link_code
+
+    codes = []
+    for i in range(n):
+        data = await create_link_code(str(users[i % len(users)]["_id"]))
+        codes.append(data["code"])
+    return codes
+
+
+def _requests_for(name: str, ctx: dict, n: int):
+    """
+    -> función i -> (method, url, kwargs) para el request i del escenario.
+    """
+    users, tokens = ctx["users"], ctx["tokens"]
+    auth = [{"Authorization": f"Bearer {t}"} for t in tokens]
+    admin = {"Authorization": f"Bearer {ctx['admin_token']}"}
+
+    if name == "login":
+        return lambda i: ("POST", "/auth/login", {"json": {"email": users[i % len(users)]["email"], "password": PASSWORD}})
+    if name == "me":
+        return lambda i: ("GET", "/me", {"headers": auth[i % len(auth)]})
+    if name == "link_code":
+        return lambda i: ("POST", "/telegram/link-code", {"headers": auth[i % len(auth)]})
+    if name == "link":
+        codes = ctx["codes"]
+        secret = {"X-TG-SECRET": os.environ["TELEGRAM_LINK_SECRET"]}
+        return lambda i: ("POST", "/telegram/link", {
+            "headers": secret,
+            "json": {"code": codes[i], "telegram_id": 7_000_000 + i, "telegram_username": f"bench{i}"},
+        })
+    if name == "admin_lookup":
+        return lambda i: ("POST", "/admin/users/lookup", {"headers": admin, "json": {"email": users[i % len(users)]["email"]}})
+    if name == "admin_activate":
+        return lambda i: ("POST", "/admin/plan/activate", {
+            "headers": admin, "json": {"email": users[i % len(users)]["email"], "plan": "plus"},
+        })
+    if name == "admin_list":
+        return lambda i: ("GET", "/admin/users", {"headers": admin, "params": {"limit": 50}})
+    raise ValueError(f"unknown scenario: {name}")
+
+
+# -----------------------
+# Driver
+# -----------------------
+def _percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def _run(client: httpx.AsyncClient, name: str, make, n: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    next_i = 0
+
+    async def worker():
+        nonlocal next_i
+        while next_i < n:
+            i = next_i
+            next_i += 1
+            method, url, kwargs = make(i)
+            started = time.perf_counter()
+            r = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(c for s, c in statuses.items() if s >= 400)
+    return {
+        "scenario": name,
+        "requests": n,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(n / elapsed, 1) if elapsed else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "errors": errors,
+        "statuses": {str(s): c for s, c in sorted(statuses.items())},
+    }
+
+
+async def run(args) -> dict:
+    fake = FakeMotorClient()
+    mongo._client = fake
+    mongo._db = fake[os.environ.get("MONGODB_DB", "chronos")]
+
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        ctx = await _seed(mongo._db, args.users)
+        scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+        if "link" in scenarios:
+            ctx["codes"] = await _link_codes(ctx["users"], args.requests)
+
+        # La latencia artificial solo aplica a la medición, no al seed
+        fake.latency_ms = args.latency_ms
+        fake.jitter_ms = args.jitter_ms
+
+        results = []
+        transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in scenarios:
+                n = args.login_requests if name == "login" else args.requests
+                before = fake.round_trips
+                result = await _run(client, name, _requests_for(name, ctx, n), n, args.concurrency)
+                result["mongo_round_trips_per_request"] = round((fake.round_trips - before) / n, 2)
+                results.append(result)
+    finally:
+        await app.router.shutdown()
+
+    return {
+        "benchmark": "load",
+        "config": {
+            "requests": args.requests,
+            "login_requests": args.login_requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }
+
+
+def _regressions(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    previous = {r["scenario"]: r for r in baseline.get("results", [])}
+    problems = []
+    for r in report["results"]:
+        old = previous.get(r["scenario"])
+        if not old:
+            continue
+        if old.get("p95_ms") and r["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+            problems.append(f"{r['scenario']}: p95 {old['p95_ms']}ms -> {r['p95_ms']}ms")
+        if old.get("throughput_rps") and r["throughput_rps"] < old["throughput_rps"] * (1 - max_regression):
+            problems.append(f"{r['scenario']}: throughput {old['throughput_rps']} -> {r['throughput_rps']} rps")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requests por escenario")
+    parser.add_argument("--login-requests", type=int, default=200, help="requests de login (bcrypt es caro)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latencia por round trip a Mongo")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--json", action="store_true", help="salida JSON (para CI)")
+    parser.add_argument("--out", help="guardar el reporte JSON en este archivo")
+    parser.add_argument("--baseline", help="reporte JSON anterior para comparar")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'scenario':<15} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'rt/req':>7}")
+        for r in report["results"]:
+            print(
+                f"{r['scenario']:<15} {r['throughput_rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+                f"{r['p99_ms']:>9} {r['errors']:>7} {r['mongo_round_trips_per_request']:>7}"
+            )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = _regressions(report, json.load(f), args.max_regression)
+        for p in problems:
+            print(f"REGRESSION {p}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Webhook de prueba para el outbox: recibe los POST del dispatcher, verifica la
+firma y loguea los eventos. Puede fallar o demorar a propósito para ver los
+reintentos/backoff y el lag de entrega en /metrics y /admin/stats.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.webhook_stub [--port 8099] [--secret s]
+        [--fail-rate 0.3] [--delay-ms 50] [--quiet]
+
+Y en la API:
+    OUTBOX_WEBHOOK_URL=http://127.0.0.1:8099/events OUTBOX_WEBHOOK_SECRET=s
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_seen: set[str] = set()
+_stats = {"requests": 0, "events": 0, "duplicates": 0, "failed": 0, "bad_signature": 0}
+
+
+def make_handler(args):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, igual que el cliente pooled
+
+        def _reply(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._reply(200, _stats)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            _stats["requests"] += 1
+
+            if args.secret:
+                expected = "sha256=" + hmac.new(args.secret.encode(), body, hashlib.sha256).hexdigest()
+                if not hmac.compare_digest(expected, self.headers.get("X-Chronos-Signature", "")):
+                    _stats["bad_signature"] += 1
+                    self._reply(401, {"detail": "bad signature"})
+                    return
+
+            if args.delay_ms:
+                time.sleep(args.delay_ms / 1000)
+            if random.random() < args.fail_rate:
+                _stats["failed"] += 1
+                self._reply(503, {"detail": "simulated failure"})
+                return
+
+            for event in json.loads(body).get("events", []):
+                if event["id"] in _seen:
+                    _stats["duplicates"] += 1  # at-least-once: el receptor deduplica
+                    continue
+                _seen.add(event["id"])
+                _stats["events"] += 1
+                if not args.quiet:
+                    print(f"{event['created_at']} {event['type']:<16} {json.dumps(event['data'])}", flush=True)
+            self._reply(200, {"ok": True})
+
+        def log_message(self, *a):
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--secret", default="", help="OUTBOX_WEBHOOK_SECRET (vacío = no verificar)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fracción de POST que responden 503")
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args))
+    print(f"webhook stub en http://{args.host}:{args.port}/events (GET = stats)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(_stats), flush=True)
+
+
+if __name__ == "__main__":
+    main()
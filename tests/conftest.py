@@ -0,0 +1,26 @@
+import os
+import sys
+from pathlib import Path
+
+# Settings obligatorios antes de importar app.* (no se conecta a nada)
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:1")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+
+from app.db import mongo  # noqa: E402
+from app.services.user_cache import clear_user_cache  # noqa: E402
+from benchmarks.fake_mongo import FakeMotorClient  # noqa: E402
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    # Mongo en memoria (el mismo stand-in que usan los benchmarks)
+    fake = FakeMotorClient()
+    monkeypatch.setattr(mongo, "_client", fake)
+    monkeypatch.setattr(mongo, "_db", fake["chronos"])
+    clear_user_cache()
+    yield mongo._db
+    clear_user_cache()
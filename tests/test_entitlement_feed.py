@@ -0,0 +1,117 @@
+import asyncio
+import base64
+import struct
+from datetime import timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.routes import internal
+from app.core.config import settings
+from app.services import entitlement_feed as feed
+
+KEY = {"X-Internal-Key": "ik"}
+
+
+@pytest.fixture
+def api(fake_db, monkeypatch):
+    monkeypatch.setattr(settings, "internal_api_key", "ik")
+    monkeypatch.setattr(feed, "_snapshot_cache", {})
+    app = FastAPI()
+    app.include_router(internal.router, prefix="/internal")
+    return app
+
+
+def _run(app, scenario):
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await scenario(c)
+    return asyncio.run(main())
+
+
+def _ids(packed: str) -> list[int]:
+    raw = base64.b64decode(packed)
+    return list(struct.unpack(f"<{len(raw) // 8}q", raw))
+
+
+def test_delta_round_trip(api):
+    async def scenario(c):
+        await feed.record_changes([(1, "plus"), (2, "premium")])
+        await feed.record_changes([(1, None)])
+
+        full = (await c.get("/internal/entitlements/delta", params={"since": 0}, headers=KEY)).json()
+        page = (await c.get("/internal/entitlements/delta", params={"since": 0, "limit": 1}, headers=KEY)).json()
+        caught_up = (await c.get("/internal/entitlements/delta", params={"since": 3}, headers=KEY)).json()
+        return full, page, caught_up
+
+    full, page, caught_up = _run(api, scenario)
+    # Compactado: el último cambio por telegram_id, en orden de ese cambio
+    assert full == {"version": 3, "changes": [
+        {"telegram_id": 2, "plan": "premium"}, {"telegram_id": 1, "plan": None},
+    ], "more": False}
+    assert page == {"version": 1, "changes": [{"telegram_id": 1, "plan": "plus"}], "more": True}
+    assert caught_up == {"version": 3, "changes": [], "more": False}
+
+
+def test_client_lagging_past_retention_gets_410(api, fake_db):
+    async def scenario(c):
+        await feed.record_changes([(1, "plus"), (2, "plus"), (3, "plus")])
+        # El TTL ya borró v=1..2 y lo que queda es viejo: hueco definitivo
+        await fake_db.entitlement_changes.delete_many({"v": {"$lte": 2}})
+        old = feed._now() - timedelta(hours=1)
+        await fake_db.entitlement_changes.update_many({}, {"$set": {"at": old}})
+        gone = await c.get("/internal/entitlements/delta", params={"since": 0}, headers=KEY)
+        fine = await c.get("/internal/entitlements/delta", params={"since": 2}, headers=KEY)
+        return gone, fine
+
+    gone, fine = _run(api, scenario)
+    assert gone.status_code == 410
+    assert fine.json()["version"] == 3
+
+
+def test_recent_gap_waits_instead_of_410(api, fake_db):
+    async def scenario(c):
+        await feed.record_changes([(1, "plus"), (2, "plus")])
+        # v=1 reservada pero todavía sin insertar (escritura en curso)
+        await fake_db.entitlement_changes.delete_many({"v": 1})
+        return (await c.get("/internal/entitlements/delta", params={"since": 0}, headers=KEY))
+
+    r = _run(api, scenario)
+    assert r.status_code == 200
+    assert r.json() == {"version": 0, "changes": [], "more": False}
+
+
+def test_snapshot_etag_and_per_version_cache(api, fake_db):
+    async def scenario(c):
+        future = feed._now() + timedelta(days=5)
+        await fake_db.users.insert_many([
+            {"telegram_id": 20, "plan": "plus", "plan_expires_at": future, "status": "active"},
+            {"telegram_id": 10, "plan": "plus", "plan_expires_at": future, "status": "active"},
+            {"telegram_id": 30, "plan": "premium", "plan_expires_at": future, "status": "banned"},
+        ])
+        await feed.record_changes([(10, "plus")])
+
+        first = await c.get("/internal/entitlements/snapshot", headers=KEY)
+        etag = first.headers["etag"]
+        not_modified = await c.get("/internal/entitlements/snapshot", headers={**KEY, "If-None-Match": etag})
+
+        # Misma versión -> el cuerpo sale de cache aunque Mongo cambie
+        await fake_db.users.insert_one({"telegram_id": 40, "plan": "plus", "plan_expires_at": future, "status": "active"})
+        cached = await c.get("/internal/entitlements/snapshot", headers=KEY)
+
+        # Versión nueva -> se reconstruye
+        await feed.record_changes([(40, "plus")])
+        rebuilt = await c.get("/internal/entitlements/snapshot", headers=KEY)
+        return first, not_modified, cached, rebuilt
+
+    first, not_modified, cached, rebuilt = _run(api, scenario)
+    body = first.json()
+    assert first.headers["etag"] == '"ent-1"'
+    assert _ids(body["plans"]["plus"]) == [10, 20]
+    assert _ids(body["plans"]["premium"]) == []
+    assert not_modified.status_code == 304
+    assert cached.content == first.content
+    assert rebuilt.headers["etag"] == '"ent-2"'
+    assert _ids(rebuilt.json()["plans"]["plus"]) == [10, 20, 40]
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import ecdsa
+import httpx
+import pytest
+from fastapi import FastAPI
+from jose import jwt
+from jose.exceptions import JWTError
+
+from app.api.routes import jwks as jwks_route
+from app.core import jwt_keys, security
+from app.core.config import settings
+from app.core.security import create_access_token, decode_token
+
+
+def _pem() -> str:
+    return ecdsa.SigningKey.generate(curve=ecdsa.NIST256p).to_pem().decode()
+
+
+def _public_pem(private_pem: str) -> str:
+    return ecdsa.SigningKey.from_pem(private_pem).get_verifying_key().to_pem().decode()
+
+
+@pytest.fixture
+def es256(monkeypatch):
+    monkeypatch.setattr(settings, "jwt_algorithm", "ES256")
+    monkeypatch.setattr(settings, "jwt_extra_public_keys", "")
+    monkeypatch.setattr(settings, "jwt_accept_legacy_hs", False)
+    monkeypatch.setattr(settings, "jwt_legacy_hs_until", None)
+    monkeypatch.setattr(jwks_route, "_cached", None)
+
+    def use(private_pem: str, extra: str = "") -> None:
+        monkeypatch.setattr(settings, "jwt_private_key", private_pem)
+        monkeypatch.setattr(settings, "jwt_extra_public_keys", extra)
+        jwt_keys.reset_keys()
+        security.clear_token_cache()
+
+    use(_pem())
+    yield use
+    jwt_keys.reset_keys()
+    security.clear_token_cache()
+
+
+def _legacy_token(iat: float) -> str:
+    # Firmado con JWT_SECRET como antes de migrar (iat lo elige quien firma)
+    return jwt.encode({"sub": "u1", "iat": int(iat), "exp": int(time.time()) + 6 * 3600}, settings.jwt_secret, algorithm="HS256")
+
+
+def test_token_kid_matches_jwks(es256):
+    token = create_access_token("u1")
+    kid = jwt.get_unverified_header(token)["kid"]
+    keys = jwt_keys.jwks()["keys"]
+
+    assert [k["kid"] for k in keys] == [kid]
+    assert keys[0]["kty"] == "EC" and keys[0]["use"] == "sig" and keys[0]["alg"] == "ES256"
+    assert "d" not in keys[0]  # nunca la parte privada
+    assert kid == jwt_keys.thumbprint(keys[0])
+    assert decode_token(token)["sub"] == "u1"
+
+
+def test_rotation_keeps_old_tokens_valid(es256):
+    old, new = _pem(), _pem()
+    es256(old)
+    old_token = create_access_token("u1")
+    old_kid = jwt.get_unverified_header(old_token)["kid"]
+
+    # Paso 1: la nueva se publica antes de firmar con ella
+    es256(old, extra=_public_pem(new))
+    assert len(jwt_keys.jwks()["keys"]) == 2
+    assert jwt.get_unverified_header(create_access_token("u1"))["kid"] == old_kid
+
+    # Paso 2: firma la nueva, la vieja queda solo para verificar
+    es256(new, extra=_public_pem(old))
+    new_token = create_access_token("u2")
+    new_kid = jwt.get_unverified_header(new_token)["kid"]
+    assert new_kid != old_kid
+    assert {k["kid"] for k in jwt_keys.jwks()["keys"]} == {old_kid, new_kid}
+    assert decode_token(old_token)["sub"] == "u1"
+    assert decode_token(new_token)["sub"] == "u2"
+
+    # Paso 3: sin la vieja, sus tokens dejan de valer
+    es256(new)
+    with pytest.raises(JWTError):
+        decode_token(old_token)
+    assert decode_token(new_token)["sub"] == "u2"
+
+
+def test_unknown_kid_rejected(es256):
+    other = _pem()
+    forged = jwt.encode({"sub": "u1", "exp": int(time.time()) + 60}, other, algorithm="ES256", headers={"kid": "nope"})
+    with pytest.raises(JWTError, match="Unknown kid"):
+        decode_token(forged)
+
+    # Sin kid tampoco
+    forged = jwt.encode({"sub": "u1", "exp": int(time.time()) + 60}, other, algorithm="ES256")
+    with pytest.raises(JWTError):
+        decode_token(forged)
+
+
+def test_jwks_route_etag(es256):
+    app = FastAPI()
+    app.include_router(jwks_route.router)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            r = await client.get("/.well-known/jwks.json")
+            assert r.status_code == 200
+            assert r.json() == jwt_keys.jwks()
+            assert "max-age=" in r.headers["cache-control"]
+
+            r2 = await client.get("/.well-known/jwks.json", headers={"If-None-Match": r.headers["etag"]})
+            assert r2.status_code == 304 and not r2.content
+
+    asyncio.run(scenario())
+
+
+def test_legacy_hs_rejected_when_disabled(es256):
+    with pytest.raises(JWTError):
+        decode_token(_legacy_token(time.time()))
+
+
+def test_legacy_hs_requires_deadline(es256, monkeypatch):
+    monkeypatch.setattr(settings, "jwt_accept_legacy_hs", True)
+    jwt_keys.reset_keys()
+    with pytest.raises(RuntimeError, match="JWT_LEGACY_HS_UNTIL"):
+        jwt_keys.load_keys()
+    with pytest.raises(JWTError):
+        decode_token(_legacy_token(time.time() - 3600))
+
+
+def test_legacy_hs_accepted_until_deadline(es256, monkeypatch):
+    monkeypatch.setattr(settings, "jwt_accept_legacy_hs", True)
+    monkeypatch.setattr(settings, "jwt_legacy_hs_until", datetime.now(timezone.utc) + timedelta(hours=1))
+    token = _legacy_token(time.time() - 60)
+    assert decode_token(token)["sub"] == "u1"
+    # Los tokens nuevos ya salen firmados con la clave asimétrica
+    assert decode_token(create_access_token("u2"))["sub"] == "u2"
+
+    # Pasado el corte, ni siquiera el que ya estaba en cache sigue valiendo
+    later = time.time() + 2 * 3600
+    monkeypatch.setattr(time, "time", lambda: later)
+    with pytest.raises(JWTError, match="Legacy HS"):
+        decode_token(token)
+
+
+def test_forged_backdated_hs_rejected_after_deadline(es256, monkeypatch):
+    # Quien tenga JWT_SECRET puede poner cualquier iat: el corte es por reloj
+    monkeypatch.setattr(settings, "jwt_accept_legacy_hs", True)
+    monkeypatch.setattr(settings, "jwt_legacy_hs_until", datetime.now(timezone.utc) - timedelta(minutes=1))
+    forged = _legacy_token(time.time() - 86400 * 365)
+    with pytest.raises(JWTError, match="Legacy HS"):
+        decode_token(forged)
@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import threading
+from datetime import timedelta
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from app.services import outbox
+from benchmarks import webhook_stub
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    # benchmarks/webhook_stub.py en un thread: el receptor local de referencia
+    args = argparse.Namespace(secret="s", fail_rate=0.0, delay_ms=0.0, quiet=True)
+    webhook_stub._seen.clear()
+    for key in webhook_stub._stats:
+        webhook_stub._stats[key] = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), webhook_stub.make_handler(args))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(settings, "outbox_webhook_url", f"http://127.0.0.1:{server.server_port}/events")
+    monkeypatch.setattr(settings, "outbox_webhook_secret", "s")
+    monkeypatch.setattr(settings, "outbox_batch_size", 100)
+    monkeypatch.setattr(settings, "outbox_backoff_base_seconds", 1.0)
+    monkeypatch.setattr(settings, "outbox_backoff_max_seconds", 300.0)
+    monkeypatch.setattr(settings, "outbox_max_attempts", 12)
+    monkeypatch.setattr(settings, "outbox_poll_interval_seconds", 5.0)
+    yield args
+    server.shutdown()
+    server.server_close()
+
+
+def _run(coro_fn):
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            await outbox.close_outbox_client()
+    return asyncio.run(main())
+
+
+async def _enqueue(n: int) -> None:
+    await outbox.enqueue([
+        {"type": "plan.activated", "data": {"user_id": str(i)}} for i in range(n)
+    ])
+
+
+def test_batches_drain_in_order(fake_db, stub):
+    async def scenario():
+        await _enqueue(250)
+        sizes = []
+        while n := await outbox.dispatch_once():
+            sizes.append(n)
+        return sizes
+
+    assert _run(scenario) == [100, 100, 50]
+    assert webhook_stub._stats["requests"] == 3
+    assert webhook_stub._stats["events"] == 250
+    assert webhook_stub._stats["bad_signature"] == 0
+
+    async def states():
+        return {
+            s: await fake_db.outbox.count_documents({"status": s})
+            for s in ("pending", "inflight", "delivered", "dead")
+        }
+    assert asyncio.run(states()) == {"pending": 0, "inflight": 0, "delivered": 250, "dead": 0}
+
+
+def test_failed_delivery_backs_off_then_retries(fake_db, stub):
+    async def scenario():
+        await _enqueue(3)
+        stub.fail_rate = 1.0
+        assert await outbox.dispatch_once() == 3
+
+        docs = await fake_db.outbox.find({}).to_list(None)
+        assert {d["status"] for d in docs} == {"pending"}
+        assert {d["attempts"] for d in docs} == {1}
+        for d in docs:
+            delay = (outbox._as_aware_utc(d["next_attempt_at"]) - outbox._now()).total_seconds()
+            assert 0.5 < delay <= 1.2  # base * 2^0 con jitter ±20%
+
+        # Todavía no vencieron: no se reclaman
+        assert await outbox.dispatch_once() == 0
+
+        # Vencido el backoff, el receptor se recupera y entrega
+        past = outbox._now() - timedelta(seconds=1)
+        await fake_db.outbox.update_many({}, {"$set": {"next_attempt_at": past}})
+        stub.fail_rate = 0.0
+        assert await outbox.dispatch_once() == 3
+        return await fake_db.outbox.count_documents({"status": "delivered"})
+
+    assert _run(scenario) == 3
+    assert webhook_stub._stats["failed"] == 1
+    assert webhook_stub._stats["events"] == 3
+
+
+def test_dead_after_max_attempts(fake_db, stub, monkeypatch):
+    monkeypatch.setattr(settings, "outbox_max_attempts", 2)
+    stub.fail_rate = 1.0
+
+    async def scenario():
+        await _enqueue(2)
+        for _ in range(2):
+            past = outbox._now() - timedelta(seconds=1)
+            await fake_db.outbox.update_many({"status": "pending"}, {"$set": {"next_attempt_at": past}})
+            await outbox.dispatch_once()
+        return await fake_db.outbox.find({}).to_list(None)
+
+    docs = _run(scenario)
+    assert {d["status"] for d in docs} == {"dead"}
+    assert {d["attempts"] for d in docs} == {2}
+
+
+def test_backoff_grows_and_caps(monkeypatch):
+    monkeypatch.setattr(settings, "outbox_backoff_base_seconds", 1.0)
+    monkeypatch.setattr(settings, "outbox_backoff_max_seconds", 30.0)
+    assert 0.8 <= outbox._backoff(1) <= 1.2
+    assert 6.4 <= outbox._backoff(4) <= 9.6
+    assert 24.0 <= outbox._backoff(20) <= 36.0
+
+
+def test_loop_drains_on_notify_and_cancels(fake_db, stub):
+    async def scenario():
+        task = asyncio.create_task(outbox.outbox_dispatch_loop())
+        await asyncio.sleep(0.05)
+        await _enqueue(150)
+        outbox.notify()  # sin esperar el poll de 5s
+        for _ in range(100):
+            if await fake_db.outbox.count_documents({"status": "delivered"}) == 150:
+                break
+            await asyncio.sleep(0.02)
+        task.cancel()
+        await asyncio.wait_for(asyncio.gather(task, return_exceptions=True), timeout=2)
+        return await fake_db.outbox.count_documents({"status": "delivered"})
+
+    assert _run(scenario) == 150
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.ratelimit import MemoryBackend, SqliteBackend
+
+IP_WINDOW, IP_LIMIT = 60.0, 30
+EMAIL_WINDOW, EMAIL_LIMIT = 300.0, 10
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    return MemoryBackend() if request.param == "memory" else SqliteBackend(str(tmp_path / "rl.sqlite3"))
+
+
+def test_limit_then_retry_after(backend):
+    now = 1_000_000.0
+    for _ in range(EMAIL_LIMIT):
+        assert backend.hit("email:a", EMAIL_WINDOW, EMAIL_LIMIT, now)[0]
+    allowed, retry = backend.hit("email:a", EMAIL_WINDOW, EMAIL_LIMIT, now)
+    assert not allowed and retry >= 1
+
+
+def test_prune_keeps_keys_with_longer_window(backend):
+    # Empieza casi al final de una ventana de 60s: cuando las IPs rotan ya
+    # pasaron dos ventanas de ip pero sigue viva la ventana de email (300s)
+    now = 1_000_000.0 * 300 + 10
+    for _ in range(EMAIL_LIMIT):
+        assert backend.hit("email:a", EMAIL_WINDOW, EMAIL_LIMIT, now)[0]
+
+    later = now + 150
+    for i in range(1100):  # cruza la poda de cada 1024 hits
+        backend.hit(f"ip:10.0.{i // 256}.{i % 256}", IP_WINDOW, IP_LIMIT, later)
+
+    allowed, retry = backend.hit("email:a", EMAIL_WINDOW, EMAIL_LIMIT, later)
+    assert not allowed and retry >= 1
+
+
+def test_prune_drops_stale_keys(backend):
+    now = 1_000_000.0 * 300
+    backend.hit("ip:1.1.1.1", IP_WINDOW, IP_LIMIT, now)
+    backend.hit("email:b", EMAIL_WINDOW, EMAIL_LIMIT, now)
+
+    later = now + 1000  # > 2 ventanas de ambos
+    for i in range(1100):
+        backend.hit(f"ip:10.1.{i // 256}.{i % 256}", IP_WINDOW, IP_LIMIT, later)
+
+    assert backend.size() <= 1100
+
+
+@pytest.fixture
+def sqlite_limiter(tmp_path, monkeypatch):
+    from app.core import ratelimit
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "login_rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limit_backend", "sqlite")
+    monkeypatch.setattr(settings, "rate_limit_sqlite_path", str(tmp_path / "login.sqlite3"))
+    monkeypatch.setattr(settings, "login_rate_ip_limit", 100)
+    monkeypatch.setattr(settings, "login_rate_email_limit", 3)
+    monkeypatch.setattr(ratelimit, "_backend", None)
+    return ratelimit
+
+
+def test_sqlite_login_attempts_throttle_per_email(sqlite_limiter):
+    async def scenario():
+        results = [await sqlite_limiter.check_login_attempt(f"10.0.0.{i}", "A@x.com ") for i in range(4)]
+        other = await sqlite_limiter.check_login_attempt("10.0.0.9", "b@x.com")
+        return results, other
+
+    results, other = asyncio.run(scenario())
+    assert results[:3] == [None, None, None]
+    assert results[3] is not None and results[3] >= 1
+    assert other is None
+    assert isinstance(sqlite_limiter._backend, SqliteBackend)
+
+
+def test_sqlite_hit_does_not_block_event_loop(sqlite_limiter):
+    async def scenario():
+        backend = sqlite_limiter._get_backend()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        # Otro worker con el archivo tomado: el hit espera en un thread
+        release = threading.Timer(0.3, backend._lock.release)
+        backend._lock.acquire()
+        release.start()
+        task = asyncio.create_task(ticker())
+        result = await sqlite_limiter.check_login_attempt("10.0.0.1", "c@x.com")
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert result is None
+    assert ticks >= 10
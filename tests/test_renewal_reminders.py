@@ -0,0 +1,55 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from app.services import renewal_reminders as rr
+
+
+def test_claim_skips_users_who_renewed_after_the_read(fake_db):
+    async def scenario():
+        now = rr._now()
+        soon, renewed = now + timedelta(hours=12), now + timedelta(days=30)
+        await fake_db.users.insert_many([
+            {"_id": 1, "telegram_id": 11, "plan": "plus", "plan_expires_at": soon, "status": "active"},
+            {"_id": 2, "telegram_id": 22, "plan": "plus", "plan_expires_at": soon, "status": "active"},
+        ])
+        docs = await fake_db.users.find({}, rr._PROJECTION).to_list(None)
+
+        # El usuario 2 renueva entre la lectura y el claim
+        await fake_db.users.update_one({"_id": 2}, {"$set": {"plan_expires_at": renewed}})
+
+        claimed = await rr._claim("1d", docs)
+        u2 = await fake_db.users.find_one({"_id": 2})
+        return [d["_id"] for d in claimed], u2
+
+    claimed, u2 = asyncio.run(scenario())
+    assert claimed == [1]
+    assert "renewal_reminders" not in u2
+
+
+def test_windows_must_be_integers():
+    assert [k for k, _ in rr.parse_windows("3d,36h,expired")] == ["expired", "36h", "3d"]
+    # "1.5d" terminaría en el path anidado renewal_reminders.1.5d y nunca se mandaría
+    with pytest.raises(ValueError):
+        rr.parse_windows("1.5d")
+
+
+def test_every_window_key_roundtrips_through_the_marker_path(fake_db, monkeypatch):
+    monkeypatch.setattr(rr.settings, "renewal_reminder_windows", "3d,36h,12h,expired")
+
+    async def scenario():
+        now = rr._now()
+        docs = []
+        for i, (key, lo, hi) in enumerate(rr._ranges(now)):
+            exp = hi - timedelta(minutes=1)
+            await fake_db.users.insert_one(
+                {"_id": i, "telegram_id": i + 100, "plan": "plus", "plan_expires_at": exp, "status": "active"}
+            )
+            doc = await fake_db.users.find_one({"_id": i}, rr._PROJECTION)
+            docs.append((key, doc))
+        return [(key, [d["_id"] for d in await rr._claim(key, [doc])]) for key, doc in docs]
+
+    results = asyncio.run(scenario())
+    assert [k for k, _ in results] == ["expired", "12h", "36h", "3d"]
+    assert all(claimed == [i] for i, (_, claimed) in enumerate(results))
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.core.config import settings
+from app.services import sessions
+
+
+@pytest.fixture
+def enabled(fake_db, monkeypatch):
+    monkeypatch.setattr(settings, "refresh_tokens_enabled", True)
+    monkeypatch.setattr(settings, "refresh_reuse_grace_seconds", 30.0)
+    monkeypatch.setattr(sessions, "_revoked", {})
+    monkeypatch.setattr(sessions, "_last_sync", None)
+    monkeypatch.setattr(sessions, "_stats", dict.fromkeys(sessions._stats, 0))
+    return fake_db
+
+
+async def _age_rotation(db, sid: str, seconds: float) -> None:
+    # Simula que la última rotación fue hace `seconds`
+    await db.sessions.update_one({"_id": sid}, {"$set": {"rotated_at": sessions._now() - timedelta(seconds=seconds)}})
+
+
+def test_refresh_rotates_secret(enabled):
+    async def scenario():
+        uid = ObjectId()
+        sid, rt1 = await sessions.create_session(uid)
+        user_id, sid2, rt2 = await sessions.rotate_refresh_token(rt1)
+        assert (user_id, sid2) == (uid, sid)
+        assert rt2 != rt1 and rt2.startswith(sid + ".")
+
+        # El nuevo sigue rotando
+        _, _, rt3 = await sessions.rotate_refresh_token(rt2)
+        assert rt3 not in (rt1, rt2)
+        assert not sessions.is_revoked(sid)
+
+    asyncio.run(scenario())
+
+
+def test_reuse_within_grace_is_rejected_without_revoking(enabled):
+    async def scenario():
+        sid, rt1 = await sessions.create_session(ObjectId())
+        _, _, rt2 = await sessions.rotate_refresh_token(rt1)
+
+        # Dos pestañas refrescando a la vez: la perdedora recibe 401, la sesión sigue
+        with pytest.raises(sessions.InvalidRefreshToken):
+            await sessions.rotate_refresh_token(rt1)
+        assert not sessions.is_revoked(sid)
+        await sessions.rotate_refresh_token(rt2)
+
+    asyncio.run(scenario())
+    assert sessions._stats["reuse_detected"] == 0
+
+
+def test_reuse_after_grace_revokes_session(enabled):
+    async def scenario():
+        sid, rt1 = await sessions.create_session(ObjectId())
+        _, _, rt2 = await sessions.rotate_refresh_token(rt1)
+        await _age_rotation(enabled, sid, 120)
+
+        with pytest.raises(sessions.InvalidRefreshToken):
+            await sessions.rotate_refresh_token(rt1)
+        assert sessions.is_revoked(sid)
+
+        # El refresh vigente (posiblemente del atacante) tampoco sirve ya
+        with pytest.raises(sessions.InvalidRefreshToken):
+            await sessions.rotate_refresh_token(rt2)
+
+    asyncio.run(scenario())
+    assert sessions._stats["reuse_detected"] == 1
+
+
+def test_logout_only_accepts_current_refresh(enabled):
+    async def scenario():
+        sid, rt1 = await sessions.create_session(ObjectId())
+        _, _, rt2 = await sessions.rotate_refresh_token(rt1)
+        assert await sessions.session_id_for(rt1) is None
+        assert await sessions.session_id_for("garbage") is None
+        assert await sessions.session_id_for(rt2) == sid
+
+    asyncio.run(scenario())
+
+
+def test_revoke_all_and_sync_from_other_worker(enabled):
+    async def scenario():
+        uid = ObjectId()
+        sids = [(await sessions.create_session(uid))[0] for _ in range(3)]
+        other, _ = await sessions.create_session(ObjectId())
+        assert await sessions.revoke_user_sessions(uid) == 3
+
+        # Otro worker arranca sin nada en memoria y se pone al día desde Mongo
+        sessions._revoked.clear()
+        sessions._last_sync = None
+        assert await sessions.sync_revoked_sessions() == 3
+        return sids, other
+
+    sids, other = asyncio.run(scenario())
+    assert all(sessions.is_revoked(s) for s in sids)
+    assert not sessions.is_revoked(other)
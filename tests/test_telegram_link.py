@@ -0,0 +1,91 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+
+from app.api.routes import telegram
+from app.core.config import settings
+from app.services import telegram_link
+
+SECRET = {"X-TG-SECRET": "tgs"}
+
+
+@pytest.fixture
+def api(fake_db, monkeypatch):
+    monkeypatch.setattr(settings, "telegram_link_secret", "tgs")
+    monkeypatch.setattr(settings, "telegram_link_code_mode", "signed")
+    monkeypatch.setattr(settings, "telegram_link_code_secret", "link-key")
+    app = FastAPI()
+    app.include_router(telegram.router, prefix="/telegram")
+    return app
+
+
+def _run(app, db, scenario):
+    async def main():
+        user_id = ObjectId()
+        await db.users.insert_one({"_id": user_id, "email": "t@x.com", "status": "active"})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await scenario(c, str(user_id))
+    return asyncio.run(main())
+
+
+async def _link(c, code: str, telegram_id: int = 555):
+    return await c.post("/telegram/link", json={"code": code, "telegram_id": telegram_id}, headers=SECRET)
+
+
+def _flip(code: str, index: int) -> str:
+    raw = bytearray(base64.urlsafe_b64decode(code))
+    raw[index] ^= 0x01
+    return base64.urlsafe_b64encode(bytes(raw)).decode()
+
+
+def test_signed_code_redeems_once(api, fake_db):
+    async def scenario(c, uid):
+        code = (await telegram_link.create_link_code(uid))["code"]
+        assert len(code) == telegram_link.SIGNED_CODE_LENGTH
+        first = await _link(c, code)
+        second = await _link(c, code, telegram_id=777)
+        user = await fake_db.users.find_one({"_id": ObjectId(uid)})
+        return first, second, user
+
+    first, second, user = _run(api, fake_db, scenario)
+    assert first.status_code == 200
+    assert second.status_code == 404
+    assert user["telegram_id"] == 555
+
+
+def test_tampered_code_is_rejected(api, fake_db):
+    async def scenario(c, uid):
+        code = (await telegram_link.create_link_code(uid))["code"]
+        other_user = _flip(code, 0)     # user_id distinto con la firma original
+        later_exp = _flip(code, 15)     # vencimiento alterado
+        bad_sig = _flip(code, -1)       # firma alterada
+        results = [(await _link(c, code_)).status_code for code_ in (other_user, later_exp, bad_sig)]
+        redemptions = await fake_db.telegram_link_redemptions.count_documents({})
+        return results, redemptions
+
+    results, redemptions = _run(api, fake_db, scenario)
+    assert results == [404, 404, 404]
+    assert redemptions == 0
+
+
+def test_code_signed_with_other_key_is_rejected(api, fake_db, monkeypatch):
+    async def scenario(c, uid):
+        monkeypatch.setattr(settings, "telegram_link_code_secret", "old-key")
+        code = (await telegram_link.create_link_code(uid))["code"]
+        monkeypatch.setattr(settings, "telegram_link_code_secret", "link-key")
+        return await _link(c, code)
+
+    assert _run(api, fake_db, scenario).status_code == 404
+
+
+def test_expired_code_is_rejected(api, fake_db):
+    async def scenario(c, uid):
+        code = telegram_link.create_signed_link_code(uid, expires_minutes=-1)["code"]
+        return await _link(c, code)
+
+    assert _run(api, fake_db, scenario).status_code == 404
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.config import settings
+from app.deps.auth import get_current_user
+from app.services import token_claims
+from app.services.user_repo import ban_user
+
+
+@pytest.fixture
+def claims(fake_db, monkeypatch):
+    monkeypatch.setattr(settings, "jwt_embed_claims", True)
+    monkeypatch.setattr(token_claims, "_min_versions", {})
+    monkeypatch.setattr(token_claims, "_last_sync", None)
+    return fake_db
+
+
+async def _user(db) -> dict:
+    user = {
+        "_id": ObjectId(),
+        "email": "c@x.com",
+        "plan": "plus",
+        "plan_expires_at": token_claims._now() + timedelta(days=10),
+        "status": "active",
+        "token_version": 0,
+    }
+    await db.users.insert_one(user)
+    return user
+
+
+def _bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+async def _status(token: str):
+    try:
+        user = await get_current_user(_bearer(token))
+    except HTTPException as e:
+        return e.status_code
+    return "claims" if user.get("_from_claims") else "db"
+
+
+def test_fresh_token_uses_claims_fast_path(claims):
+    async def scenario():
+        user = await _user(claims)
+        return await _status(token_claims.issue_access_token(user))
+
+    assert asyncio.run(scenario()) == "claims"
+
+
+def test_token_before_ban_is_rejected_on_this_worker(claims):
+    async def scenario():
+        user = await _user(claims)
+        token = token_claims.issue_access_token(user)
+        await ban_user(user["_id"], None, "abuse")
+        # El bump se anota localmente: los claims viejos no se confían y
+        # el camino normal ve el ban
+        return await _status(token)
+
+    assert asyncio.run(scenario()) == 403
+    assert token_claims._stats["stale_tokens"] >= 1
+
+
+def test_token_before_ban_is_rejected_after_sync_on_other_worker(claims):
+    async def scenario():
+        user = await _user(claims)
+        token = token_claims.issue_access_token(user)
+        await ban_user(user["_id"], None, "abuse")
+
+        # Otro worker: no vio el bump todavía y confía en los claims
+        token_claims._min_versions.clear()
+        before = await _status(token)
+
+        assert await token_claims.sync_revocations() == 1
+        return before, await _status(token)
+
+    assert asyncio.run(scenario()) == ("claims", 403)